@@ -0,0 +1,237 @@
+"""Best-of-N drafting - several Ghostwriter drafts scored side by side."""
+
+from typing import Dict, List, Optional
+from agents.ghostwriter import build_prompt, draft_llm_settings
+from agents.chief_editor import (
+    review_content,
+    areview_content,
+    review_and_polish,
+    areview_and_polish,
+    apply_polish,
+    aapply_polish,
+    editor_llm_settings,
+    build_review_update,
+    polish_skipped
+)
+from tools.groq_llm import generate_content, agenerate_content
+from utils.logger import setup_logger
+from utils.timings import timed_step
+
+logger = setup_logger(__name__)
+
+# Candidates spread their draft temperature this far either side of the
+# request's draft_temperature, so N drafts don't all read the same.
+TEMPERATURE_SPREAD = 0.2
+
+
+def candidate_inputs(state: Dict) -> List[Dict]:
+    """
+    Build the input for each candidate of the current iteration.
+    
+    Candidate i leads with research angle i (the angle list is rotated) and
+    drafts at its own temperature around the request's draft_temperature.
+    Candidate 0 with a single candidate is exactly the plain Ghostwriter input.
+    """
+    count = state['candidates']
+    angles = state.get('research_angles', [])
+    base = state['draft_temperature']
+    
+    inputs = []
+    for index in range(count):
+        offset = 0.0 if count == 1 else TEMPERATURE_SPREAD * (2 * index / (count - 1) - 1)
+        shift = index % len(angles) if angles else 0
+        inputs.append({
+            **state,
+            'candidate_index': index,
+            'research_angles': angles[shift:] + angles[:shift],
+            'draft_temperature': round(min(2.0, max(0.0, base + offset)), 2)
+        })
+    return inputs
+
+
+def candidate_agent(state: Dict) -> Dict:
+    """
+    Write one candidate draft and score it.
+    
+    Args:
+        state: Workflow state plus candidate_index, from candidate_inputs
+    
+    Returns:
+        State update appending this candidate to candidate_results
+    """
+    index = state['candidate_index']
+    logger.info(f"✍️ Candidate {index + 1}/{state['candidates']} drafting")
+    
+    try:
+        with timed_step("draft"):
+            draft = generate_content(build_prompt(state), **draft_llm_settings(state))
+        if state.get('editor_mode') == 'structured':
+            review = review_and_polish(draft, state['platform'], state['topic'], **editor_llm_settings(state))
+            return build_candidate_update(state, draft, review.score, review.feedback, polished=review.polished_content)
+        score, feedback = review_content(draft, state['platform'], state['topic'], **editor_llm_settings(state))
+        return build_candidate_update(state, draft, score, feedback)
+    
+    except Exception as e:
+        logger.error(f"❌ Candidate {index + 1} error: {str(e)}")
+        return build_candidate_update(state, error=str(e))
+
+
+async def acandidate_agent(state: Dict) -> Dict:
+    """Async version of candidate_agent for the async workflow path."""
+    index = state['candidate_index']
+    logger.info(f"✍️ Candidate {index + 1}/{state['candidates']} drafting")
+    
+    try:
+        with timed_step("draft"):
+            draft = await agenerate_content(build_prompt(state), **draft_llm_settings(state))
+        if state.get('editor_mode') == 'structured':
+            review = await areview_and_polish(draft, state['platform'], state['topic'], **editor_llm_settings(state))
+            return build_candidate_update(state, draft, review.score, review.feedback, polished=review.polished_content)
+        score, feedback = await areview_content(draft, state['platform'], state['topic'], **editor_llm_settings(state))
+        return build_candidate_update(state, draft, score, feedback)
+    
+    except Exception as e:
+        logger.error(f"❌ Candidate {index + 1} error: {str(e)}")
+        return build_candidate_update(state, error=str(e))
+
+
+def build_candidate_update(
+    state: Dict,
+    draft: str = '',
+    score: int = 0,
+    feedback: str = '',
+    error: Optional[str] = None,
+    polished: Optional[str] = None
+) -> Dict:
+    """
+    Return the candidate_results entry for one candidate.
+    
+    polished is the structured editor's polished draft, if it wrote one.
+    """
+    result = {
+        'iteration': state.get('iteration_count', 0),
+        'index': state['candidate_index'],
+        'draft_temperature': state['draft_temperature'],
+        'draft': draft,
+        'score': score,
+        'feedback': feedback
+    }
+    if polished is not None:
+        result['polished'] = polished
+    if error is not None:
+        result['error'] = error
+    else:
+        logger.info(f"📊 Candidate {state['candidate_index'] + 1} scored {score}/100")
+    return {'candidate_results': [result]}
+
+
+def best_candidate(state: Dict) -> Optional[Dict]:
+    """
+    Return the highest-scoring candidate of the current iteration.
+    
+    Ties go to the lowest candidate index so results are reproducible.
+    None if every candidate failed.
+    """
+    iteration = state.get('iteration_count', 0)
+    scored = [
+        result for result in state.get('candidate_results', [])
+        if result['iteration'] == iteration and 'error' not in result
+    ]
+    if not scored:
+        return None
+    return min(scored, key=lambda result: (-result['score'], result['index']))
+
+
+def select_candidate_agent(state: Dict) -> Dict:
+    """
+    Keep the best candidate, polishing it if it clears the threshold.
+    
+    Returns:
+        The same draft and review updates the Ghostwriter and Chief Editor
+        produce for a single draft, so the rest of the workflow is unchanged.
+    """
+    best = best_candidate(state)
+    if best is None:
+        return candidates_failed(state)
+    
+    logger.info(f"🏆 Keeping candidate {best['index'] + 1} (score {best['score']})")
+    
+    try:
+        final_polished = None
+        if best['score'] >= state['virality_threshold']:
+            if 'polished' in best:
+                final_polished = best['polished']
+            elif best['score'] < 100 and not polish_skipped(state):
+                logger.info("✨ Applying final polish based on feedback...")
+                final_polished = apply_polish(
+                    best['draft'], best['feedback'], state['platform'], **editor_llm_settings(state)
+                )
+            else:
+                final_polished = best['draft']
+        
+        return build_selection_update(state, best, final_polished)
+    
+    except Exception as e:
+        logger.error(f"❌ Chief Editor error: {str(e)}")
+        return {
+            'error': str(e),
+            'status': 'failed'
+        }
+
+
+async def aselect_candidate_agent(state: Dict) -> Dict:
+    """Async version of select_candidate_agent."""
+    best = best_candidate(state)
+    if best is None:
+        return candidates_failed(state)
+    
+    logger.info(f"🏆 Keeping candidate {best['index'] + 1} (score {best['score']})")
+    
+    try:
+        final_polished = None
+        if best['score'] >= state['virality_threshold']:
+            if 'polished' in best:
+                final_polished = best['polished']
+            elif best['score'] < 100 and not polish_skipped(state):
+                logger.info("✨ Applying final polish based on feedback...")
+                final_polished = await aapply_polish(
+                    best['draft'], best['feedback'], state['platform'],
+                    **editor_llm_settings(state),
+                    stream=state.get('stream_tokens', False),
+                    iteration=state.get('iteration_count', 0)
+                )
+            else:
+                final_polished = best['draft']
+        
+        return build_selection_update(state, best, final_polished)
+    
+    except Exception as e:
+        logger.error(f"❌ Chief Editor error: {str(e)}")
+        return {
+            'error': str(e),
+            'status': 'failed'
+        }
+
+
+def build_selection_update(state: Dict, best: Dict, final_polished: Optional[str]) -> Dict:
+    """Record the kept candidate as this iteration's draft and review."""
+    return {
+        'draft_content': best['draft'],
+        'drafts': state.get('drafts', []) + [best['draft']],
+        **build_review_update(state, best['score'], best['feedback'], final_polished)
+    }
+
+
+def candidates_failed(state: Dict) -> Dict:
+    """State update for an iteration in which every candidate failed."""
+    iteration = state.get('iteration_count', 0)
+    errors = [
+        result['error'] for result in state.get('candidate_results', [])
+        if result['iteration'] == iteration and 'error' in result
+    ]
+    error = errors[0] if errors else "No candidates were produced"
+    logger.error(f"❌ All candidates failed: {error}")
+    return {
+        'error': error,
+        'status': 'failed'
+    }
@@ -20,6 +20,7 @@ try:
     # Import FastAPI app from backend
     from main import app
     from mangum import Mangum
+    from utils.tracing import flush_traces, start_trace
     
     # Create ASGI handler for Vercel
     mangum_handler = Mangum(app, lifespan="off")
@@ -59,8 +60,15 @@ def handler(event, context):
                             print(f"Using original path from headers: {original}", flush=True)
                             event['path'] = original
         
-        # Pass event to Mangum
-        response = mangum_handler(event, context)
+        # Pass event to Mangum, traced as the root span of the request
+        request = event if isinstance(event, dict) else {}
+        with start_trace("vercel handler", (request.get('headers') or {}).get('traceparent'), {
+            'http.method': request.get('httpMethod') or '',
+            'http.route': request.get('path') or ''
+        }) as handler_span:
+            response = mangum_handler(event, context)
+            if isinstance(response, dict):
+                handler_span.set_attribute('http.status_code', response.get('statusCode'))
         
         print(f"Response status: {response.get('statusCode') if isinstance(response, dict) else 'N/A'}", flush=True)
         return response
@@ -70,4 +78,7 @@ def handler(event, context):
         import traceback
         traceback.print_exc()
         raise
+    finally:
+        # The function may be frozen once it returns; export spans first
+        flush_traces()
 
@@ -1,13 +1,70 @@
 """Chief Editor Agent - The Virality Gatekeeper."""
 
+import asyncio
+import contextvars
 import re
-from typing import Dict, Tuple
-from tools.groq_llm import generate_content
-from utils.logger import setup_logger
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from pydantic import BaseModel, Field
 import config
+from tools.groq_llm import (
+    generate_content,
+    agenerate_content,
+    astream_content,
+    generate_json,
+    agenerate_json
+)
+from utils.deadline import call_timeout, skip_polish
+from utils.logger import setup_logger
+from utils.metrics import SPECULATIVE_POLISHES
+from utils.streaming import acollect_stream, emit_draft_delta
+from utils.timings import timed_step
 
 logger = setup_logger(__name__)
 
+# Speculative polish: a passing review counts as minor, so the generic polish
+# can be used as is, at this score or with at most this many feedback items.
+MINOR_FEEDBACK_SCORE = 90
+MINOR_FEEDBACK_ITEMS = 1
+
+SPECULATION_OUTCOMES = ("used", "repolished", "discarded")
+
+# Shared by every sync review. A thread can't be interrupted, so a discarded
+# polish that already started runs on until its call timeout, which is what
+# is left of the request's deadline.
+_speculation_executor: Optional[ThreadPoolExecutor] = None
+_speculation_executor_lock = threading.Lock()
+
+
+def get_speculation_executor() -> ThreadPoolExecutor:
+    """Return the thread pool for sync speculative polishes, sized from SPECULATIVE_POLISH_THREADS."""
+    global _speculation_executor
+    if _speculation_executor is None:
+        with _speculation_executor_lock:
+            if _speculation_executor is None:
+                _speculation_executor = ThreadPoolExecutor(
+                    max_workers=config.SPECULATIVE_POLISH_THREADS or None,
+                    thread_name_prefix="speculative-polish"
+                )
+    return _speculation_executor
+
+
+def shutdown_speculation_executor() -> None:
+    """Stop the speculative polish threads, dropping polishes that haven't started."""
+    global _speculation_executor
+    with _speculation_executor_lock:
+        executor, _speculation_executor = _speculation_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EditorReview(BaseModel):
+    """Structured Chief Editor verdict: score, feedback and polished draft in one reply."""
+    score: int = Field(ge=0, le=100)
+    feedback: str
+    polished_content: str = Field(min_length=1)
+
 
 def chief_editor_agent(state: Dict) -> Dict:
     """
@@ -15,76 +72,369 @@ def chief_editor_agent(state: Dict) -> Dict:
     
     Args:
         state: Current workflow state with draft_content
-        
+    
     Returns:
-        Updated state with virality_score and editor_feedback
+        State update with virality_score and editor_feedback
     """
     draft = state['draft_content']
     platform = state['platform']
-    topic = state['topic']
     
     logger.info(f"⚖️ Chief Editor reviewing {platform} content")
     
     try:
+        if state.get('editor_mode') == 'structured':
+            return structured_review(state)
+        if state.get('speculative_polish'):
+            return speculative_review(state)
+        
         # Get LLM review
-        score, feedback = review_content(draft, platform, topic)
+        score, feedback = review_content(draft, platform, state['topic'], **editor_llm_settings(state))
         
-        logger.info(f"📊 Virality Score: {score}/100")
+        final_polished = None
+        if score >= state['virality_threshold']:
+            # ACTIVE EDITOR: Apply the polish yourself!
+            if score < 100 and not polish_skipped(state):
+                logger.info("✨ Applying final polish based on feedback...")
+                final_polished = apply_polish(draft, feedback, platform, **editor_llm_settings(state))
+            else:
+                final_polished = draft
         
-        # Update history
-        current_scores = state.get('scores', [])
-        current_feedbacks = state.get('feedbacks', [])
-        new_scores = current_scores + [score]
-        new_feedbacks = current_feedbacks + [feedback]
+        return build_review_update(state, score, feedback, final_polished)
+    
+    except Exception as e:
+        logger.error(f"❌ Chief Editor error: {str(e)}")
+        return {
+            'error': str(e),
+            'status': 'failed'
+        }
+
+
+async def achief_editor_agent(state: Dict) -> Dict:
+    """Async version of chief_editor_agent for the async workflow path."""
+    draft = state['draft_content']
+    platform = state['platform']
+    
+    logger.info(f"⚖️ Chief Editor reviewing {platform} content")
+    
+    try:
+        if state.get('editor_mode') == 'structured':
+            return await astructured_review(state)
+        if state.get('speculative_polish'):
+            return await aspeculative_review(state)
         
-        # Determine if approved
-        threshold = config.VIRALITY_THRESHOLD
-        approved = score >= threshold
+        score, feedback = await areview_content(draft, platform, state['topic'], **editor_llm_settings(state))
         
-        if approved:
-            logger.info(f"✅ Content APPROVED (score {score} >= {threshold})")
-            
-            # ACTIVE EDITOR: Apply the polish yourself!
-            if score < 100:
+        final_polished = None
+        if score >= state['virality_threshold']:
+            if score < 100 and not polish_skipped(state):
                 logger.info("✨ Applying final polish based on feedback...")
-                final_polished = apply_polish(draft, feedback, platform)
+                final_polished = await aapply_polish(
+                    draft, feedback, platform,
+                    **editor_llm_settings(state),
+                    stream=state.get('stream_tokens', False),
+                    iteration=state.get('iteration_count', 0)
+                )
             else:
                 final_polished = draft
-                
-            return {
-                **state,
-                'virality_score': score,
-                'scores': new_scores,
-                'editor_feedback': feedback,
-                'feedbacks': new_feedbacks,
-                'final_content': final_polished,
-                'status': 'approved'
-            }
-        else:
-            logger.info(f"❌ Content NEEDS REVISION (score {score} < {threshold})")
-            logger.info(f"Feedback: {feedback[:100]}...")
-            return {
-                **state,
-                'virality_score': score,
-                'scores': new_scores,
-                'editor_feedback': feedback,
-                'feedbacks': new_feedbacks,
-                'status': 'needs_revision'
-            }
         
+        return build_review_update(state, score, feedback, final_polished)
+    
     except Exception as e:
         logger.error(f"❌ Chief Editor error: {str(e)}")
         return {
-            **state,
             'error': str(e),
             'status': 'failed'
         }
 
 
-def apply_polish(draft: str, feedback: str, platform: str) -> str:
-    """Apply specific feedback to polish the content."""
+def polish_agent(state: Dict) -> Dict:
+    """
+    Polish the current draft with editor_feedback, without reviewing it again.
+    
+    Only partial re-runs that start at "polish" reach this node (see
+    workflow.graph.build_rerun_state).
+    
+    Args:
+        state: Workflow state with draft_content and editor_feedback
+    
+    Returns:
+        State update with final_content
+    """
+    logger.info(f"✨ Chief Editor polishing {state['platform']} content")
+    
+    try:
+        polished = apply_polish(
+            state['draft_content'], state['editor_feedback'], state['platform'], **editor_llm_settings(state)
+        )
+        return build_polish_update(polished)
+    
+    except Exception as e:
+        logger.error(f"❌ Chief Editor error: {str(e)}")
+        return {
+            'error': str(e),
+            'status': 'failed'
+        }
+
+
+async def apolish_agent(state: Dict) -> Dict:
+    """Async version of polish_agent for the async workflow path."""
+    logger.info(f"✨ Chief Editor polishing {state['platform']} content")
+    
+    try:
+        polished = await aapply_polish(
+            state['draft_content'], state['editor_feedback'], state['platform'],
+            **editor_llm_settings(state),
+            stream=state.get('stream_tokens', False),
+            iteration=state.get('iteration_count', 0)
+        )
+        return build_polish_update(polished)
+    
+    except Exception as e:
+        logger.error(f"❌ Chief Editor error: {str(e)}")
+        return {
+            'error': str(e),
+            'status': 'failed'
+        }
+
+
+def build_polish_update(polished: str) -> Dict:
+    """State update for a polish-only run."""
+    logger.info(f"✅ Content polished ({len(polished)} chars)")
+    return {
+        'final_content': polished,
+        'status': 'polished'
+    }
+
+
+def structured_review(state: Dict) -> Dict:
+    """
+    Score, critique and polish the draft in a single JSON-mode call.
+    
+    The polished version is written alongside the review, so an approved
+    draft needs no second round-trip and is uploaded once. A reply that
+    doesn't match EditorReview is retried, then fails the node instead of
+    falling back to a default score.
+    """
+    draft = state['draft_content']
+    review = review_and_polish(draft, state['platform'], state['topic'], **editor_llm_settings(state))
+    
+    final_polished = None
+    if review.score >= state['virality_threshold']:
+        final_polished = review.polished_content
+    
+    return build_review_update(state, review.score, review.feedback, final_polished)
+
+
+async def astructured_review(state: Dict) -> Dict:
+    """Async version of structured_review."""
+    draft = state['draft_content']
+    review = await areview_and_polish(draft, state['platform'], state['topic'], **editor_llm_settings(state))
+    
+    final_polished = None
+    if review.score >= state['virality_threshold']:
+        final_polished = review.polished_content
+        if state.get('stream_tokens'):
+            # JSON mode can't stream usefully; send the polish as one chunk
+            await emit_draft_delta('chief_editor', state.get('iteration_count', 0), final_polished)
+    
+    return build_review_update(state, review.score, review.feedback, final_polished)
+
+
+def speculative_review(state: Dict) -> Dict:
+    """
+    Review the draft while a generic polish of it runs in the background.
+    
+    If the draft passes with minor feedback the speculative polish becomes
+    the final content, saving the serial polish call. Otherwise it is
+    re-polished with the feedback (passing draft) or dropped (failing draft).
+    A dropped polish is cancelled if it hasn't started yet; one already
+    running is bounded by the deadline's call timeout, not stopped.
+    """
+    draft = state['draft_content']
+    platform = state['platform']
+    
+    speculation = get_speculation_executor().submit(
+        contextvars.copy_context().run,
+        speculative_polish,
+        draft,
+        platform,
+        **editor_llm_settings(state)
+    )
+    try:
+        score, feedback = review_content(draft, platform, state['topic'], **editor_llm_settings(state))
+        
+        outcome = speculation_outcome(state, score, feedback)
+        final_polished = None
+        if outcome == "used":
+            try:
+                final_polished = speculation.result()
+            except Exception as e:
+                logger.warning(f"⚠️ Speculative polish failed, polishing again: {str(e)}")
+                outcome = "repolished"
+        if outcome == "repolished":
+            if polish_skipped(state):
+                final_polished = draft
+            else:
+                final_polished = apply_polish(draft, feedback, platform, **editor_llm_settings(state))
+        elif outcome == "discarded" and score >= state['virality_threshold']:
+            final_polished = draft
+    finally:
+        speculation.cancel()
+    
+    return build_speculative_update(state, score, feedback, final_polished, outcome)
+
+
+async def aspeculative_review(state: Dict) -> Dict:
+    """Async version of speculative_review; a discarded polish is cancelled."""
+    draft = state['draft_content']
+    platform = state['platform']
+    iteration = state.get('iteration_count', 0)
+    
+    speculation = asyncio.create_task(aspeculative_polish(draft, platform, **editor_llm_settings(state)))
+    try:
+        score, feedback = await areview_content(draft, platform, state['topic'], **editor_llm_settings(state))
+        
+        outcome = speculation_outcome(state, score, feedback)
+        final_polished = None
+        if outcome == "used":
+            try:
+                final_polished = await speculation
+                if state.get('stream_tokens'):
+                    await emit_draft_delta('chief_editor', iteration, final_polished)
+            except Exception as e:
+                logger.warning(f"⚠️ Speculative polish failed, polishing again: {str(e)}")
+                outcome = "repolished"
+        if outcome == "repolished":
+            if polish_skipped(state):
+                final_polished = draft
+            else:
+                final_polished = await aapply_polish(
+                    draft, feedback, platform,
+                    **editor_llm_settings(state),
+                    stream=state.get('stream_tokens', False),
+                    iteration=iteration
+                )
+        elif outcome == "discarded" and score >= state['virality_threshold']:
+            final_polished = draft
+    finally:
+        speculation.cancel()
     
-    polish_prompt = f"""You are an expert Chief Editor. 
+    return build_speculative_update(state, score, feedback, final_polished, outcome)
+
+
+def speculation_outcome(state: Dict, score: int, feedback: str) -> str:
+    """
+    Decide what happens to a speculative polish once the review is in.
+    
+    Returns:
+        "used" for a passing score with minor feedback, "repolished" for a
+        passing score that needs the feedback applied, "discarded" for a
+        failing score or a perfect one (the draft is used as is)
+    """
+    if score < state['virality_threshold'] or score >= 100:
+        return "discarded"
+    if score >= MINOR_FEEDBACK_SCORE or count_feedback_items(feedback) <= MINOR_FEEDBACK_ITEMS:
+        return "used"
+    return "repolished"
+
+
+def count_feedback_items(feedback: str) -> int:
+    """Count the bullet or numbered items in editor feedback."""
+    return len(re.findall(r'^\s*(?:[-*•]|\d+[.)])\s+', feedback, re.MULTILINE))
+
+
+def build_speculative_update(
+    state: Dict,
+    score: int,
+    feedback: str,
+    final_polished: Optional[str],
+    outcome: str
+) -> Dict:
+    """Review update plus the speculation outcome, which is also counted process-wide."""
+    logger.info(f"🔮 Speculative polish {outcome}")
+    SPECULATIVE_POLISHES.inc(outcome, "true" if final_polished is not None else "false")
+    
+    return {
+        **build_review_update(state, score, feedback, final_polished),
+        'speculations': state.get('speculations', []) + [outcome]
+    }
+
+
+def speculation_stats() -> Dict:
+    """
+    Return process-wide speculative polish counters, summed from the
+    speculative_polish_total metric.
+    
+    used/repolished/discarded count reviews by outcome; approved counts the
+    reviews that approved the draft, so used / approved is the share of
+    approved runs on which speculation saved the polish round-trip.
+    """
+    stats = dict.fromkeys(SPECULATION_OUTCOMES, 0)
+    stats['approved'] = 0
+    for (outcome, approved), count in SPECULATIVE_POLISHES.values().items():
+        stats[outcome] += count
+        if approved == "true":
+            stats['approved'] += count
+    return stats
+
+
+def polish_skipped(state: Dict) -> bool:
+    """True when the request's deadline leaves no time to polish an approved draft."""
+    if skip_polish(state):
+        logger.warning("⏱️ Deadline close, approving the draft without polish")
+        return True
+    return False
+
+
+def editor_llm_settings(state: Dict) -> Dict:
+    """LLM settings for reviewing and polishing, taken from the per-request state."""
+    return {
+        'model': state['model'],
+        'temperature': state['editor_temperature'],
+        'max_tokens': state['max_tokens'],
+        'timeout': call_timeout(state)
+    }
+
+
+def build_review_update(state: Dict, score: int, feedback: str, final_polished: str = None) -> Dict:
+    """
+    Record a review in the score/feedback history and return the state update.
+    
+    final_polished is the polished content for approved drafts, None otherwise.
+    """
+    logger.info(f"📊 Virality Score: {score}/100")
+    
+    # Update history
+    new_scores = state.get('scores', []) + [score]
+    new_feedbacks = state.get('feedbacks', []) + [feedback]
+    
+    threshold = state['virality_threshold']
+    
+    if final_polished is not None:
+        logger.info(f"✅ Content APPROVED (score {score} >= {threshold})")
+        return {
+            'virality_score': score,
+            'scores': new_scores,
+            'editor_feedback': feedback,
+            'feedbacks': new_feedbacks,
+            'final_content': final_polished,
+            'status': 'approved'
+        }
+    
+    logger.info(f"❌ Content NEEDS REVISION (score {score} < {threshold})")
+    logger.info(f"Feedback: {feedback[:100]}...")
+    return {
+        'virality_score': score,
+        'scores': new_scores,
+        'editor_feedback': feedback,
+        'feedbacks': new_feedbacks,
+        'status': 'needs_revision'
+    }
+
+
+def build_polish_prompt(draft: str, feedback: str) -> str:
+    """Build the prompt that applies editor feedback to a draft."""
+    return f"""You are an expert Chief Editor. 
     
     TASK: Polish this social media post based on the feedback below.
     
@@ -102,19 +452,219 @@ def apply_polish(draft: str, feedback: str, platform: str) -> str:
     
     Output ONLY the polished content.
     """
+
+
+@timed_step("speculative_polish")
+def speculative_polish(draft: str, platform: str, **llm_settings) -> str:
+    """Generic polish of a draft, written before its review is in."""
+    return generate_content(build_speculative_polish_prompt(draft, platform), **llm_settings)
+
+
+@timed_step("speculative_polish")
+async def aspeculative_polish(draft: str, platform: str, **llm_settings) -> str:
+    """Async version of speculative_polish."""
+    return await agenerate_content(build_speculative_polish_prompt(draft, platform), **llm_settings)
+
+
+def build_speculative_polish_prompt(draft: str, platform: str) -> str:
+    """Build a feedback-free polish prompt that can run before the review is in."""
+    return f"""You are an expert Chief Editor. 
+    
+    TASK: Give this {platform} post a light final polish.
+    
+    CRITICAL RULES:
+    1. DO NOT rewrite the whole thing. Only tighten wording, fix typos and awkward phrasing.
+    2. Maintain the original voice and style (poetic, short lines).
+    3. Ensure NO markdown formatting (no #, no **).
+    4. Keep it clean and professional.
+    
+    ORIGINAL CONTENT:
+    {draft}
+    
+    Output ONLY the polished content.
+    """
+
+
+@timed_step("polish")
+def apply_polish(
+    draft: str,
+    feedback: str,
+    platform: str,
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None
+) -> str:
+    """Apply specific feedback to polish the content."""
+    return generate_content(
+        build_polish_prompt(draft, feedback),
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout
+    )
+
+
+@timed_step("polish")
+async def aapply_polish(
+    draft: str,
+    feedback: str,
+    platform: str,
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None,
+    stream: bool = False,
+    iteration: int = 0
+) -> str:
+    """
+    Async version of apply_polish.
     
-    return generate_content(polish_prompt, temperature=0.3)
+    With stream=True the polished text is forwarded token by token as
+    draft_delta events tagged with the iteration number.
+    """
+    prompt = build_polish_prompt(draft, feedback)
+    if stream:
+        return await acollect_stream(
+            astream_content(prompt, model=model, temperature=temperature, max_tokens=max_tokens, timeout=timeout),
+            node='chief_editor',
+            iteration=iteration
+        )
+    return await agenerate_content(
+        prompt, model=model, temperature=temperature, max_tokens=max_tokens, timeout=timeout
+    )
 
 
-def review_content(draft: str, platform: str, topic: str) -> Tuple[int, str]:
+@timed_step("review")
+def review_content(
+    draft: str,
+    platform: str,
+    topic: str,
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None
+) -> Tuple[int, str]:
     """
     Use LLM to review content and provide virality score + feedback.
     
     Returns:
         Tuple of (score, feedback)
     """
+    response = generate_content(
+        build_review_prompt(draft, platform, topic),
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout
+    )
+    
+    # Parse score and feedback
+    return extract_score(response), extract_feedback(response)
+
+
+@timed_step("review")
+async def areview_content(
+    draft: str,
+    platform: str,
+    topic: str,
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None
+) -> Tuple[int, str]:
+    """Async version of review_content."""
+    response = await agenerate_content(
+        build_review_prompt(draft, platform, topic),
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout
+    )
     
-    review_prompt = f"""You are a Chief Editor evaluating social media content for virality potential.
+    return extract_score(response), extract_feedback(response)
+
+
+@timed_step("review_and_polish")
+def review_and_polish(
+    draft: str,
+    platform: str,
+    topic: str,
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None
+) -> EditorReview:
+    """Review and polish a draft in one schema-validated JSON call."""
+    return generate_json(
+        build_structured_review_prompt(draft, platform, topic),
+        EditorReview,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout
+    )
+
+
+@timed_step("review_and_polish")
+async def areview_and_polish(
+    draft: str,
+    platform: str,
+    topic: str,
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None
+) -> EditorReview:
+    """Async version of review_and_polish."""
+    return await agenerate_json(
+        build_structured_review_prompt(draft, platform, topic),
+        EditorReview,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout
+    )
+
+
+def build_structured_review_prompt(draft: str, platform: str, topic: str) -> str:
+    """Build the combined review + polish prompt, answered as JSON."""
+    return build_review_brief(draft, platform, topic) + """RESPONSE FORMAT (CRITICAL - JSON ONLY):
+Respond with a single JSON object and nothing else:
+{
+  "score": <integer 0-100>,
+  "feedback": "<2-3 SPECIFIC, ACTIONABLE improvements, one per line starting with '- '>",
+  "polished_content": "<the content with your feedback applied>"
+}
+
+Rules for polished_content:
+1. DO NOT rewrite the whole thing. Only fix what the feedback calls out.
+2. Maintain the original voice and style (poetic, short lines).
+3. Ensure NO markdown formatting (no #, no **).
+4. Keep the platform's format (thread separators, line breaks).
+
+Now review and polish the content:"""
+
+
+def build_review_prompt(draft: str, platform: str, topic: str) -> str:
+    """Build the virality review prompt for a draft."""
+    return build_review_brief(draft, platform, topic) + """RESPONSE FORMAT (CRITICAL - FOLLOW EXACTLY):
+SCORE: [number 0-100]
+
+FEEDBACK:
+[Provide 2-3 SPECIFIC, ACTIONABLE improvements. Be direct.]
+
+Examples of good feedback:
+- "Hook is weak. Try starting with: 'Most people think X, but data shows Y...' "
+- "Too many emojis in paragraph 2. Remove 🔥 and keep only one relevant icon"
+- "Thread tweet 3 is 320 chars - cut by 40 chars. Try: [specific rewrite]"
+
+Now review the content:"""
+
+
+def build_review_brief(draft: str, platform: str, topic: str) -> str:
+    """The draft and scoring criteria shared by both review prompts."""
+    return f"""You are a Chief Editor evaluating social media content for virality potential.
 
 PLATFORM: {platform.upper()}
 TOPIC: {topic}
@@ -149,26 +699,7 @@ SCORING CRITERIA (100 points total):
    - LinkedIn: Hook before cutoff, professional tone, story-driven
    - Deduct for poor formatting or wrong tone
 
-RESPONSE FORMAT (CRITICAL - FOLLOW EXACTLY):
-SCORE: [number 0-100]
-
-FEEDBACK:
-[Provide 2-3 SPECIFIC, ACTIONABLE improvements. Be direct.]
-
-Examples of good feedback:
-- "Hook is weak. Try starting with: 'Most people think X, but data shows Y...' "
-- "Too many emojis in paragraph 2. Remove 🔥 and keep only one relevant icon"
-- "Thread tweet 3 is 320 chars - cut by 40 chars. Try: [specific rewrite]"
-
-Now review the content:"""
-
-    response = generate_content(review_prompt, temperature=0.3)
-    
-    # Parse score and feedback
-    score = extract_score(response)
-    feedback = extract_feedback(response)
-    
-    return score, feedback
+"""
 
 
 def extract_score(response: str) -> int:
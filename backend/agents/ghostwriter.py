@@ -1,8 +1,11 @@
 """Ghostwriter Agent - The Hook Master."""
 
 from typing import Dict
-from tools.groq_llm import generate_content
+from tools.groq_llm import generate_content, agenerate_content, astream_content
+from utils.deadline import call_timeout
 from utils.logger import setup_logger
+from utils.streaming import acollect_stream
+from utils.timings import timed_step
 
 logger = setup_logger(__name__)
 
@@ -15,47 +18,91 @@ def ghostwriter_agent(state: Dict) -> Dict:
         state: Current workflow state with research_angles
         
     Returns:
-        Updated state with draft_content
+        State update with draft_content
     """
-    topic = state['topic']
-    platform = state['platform']
-    angles = state['research_angles']
-    feedback = state.get('editor_feedback', '')
-    
-    logger.info(f"✍️ Ghostwriter crafting {platform} content for: {topic}")
+    logger.info(f"✍️ Ghostwriter crafting {state['platform']} content for: {state['topic']}")
     
     try:
-        # Build the prompt based on platform
-        if platform.lower() == 'twitter':
-            prompt = build_twitter_prompt(topic, angles, feedback)
-        else:
-            prompt = build_linkedin_prompt(topic, angles, feedback)
-        
         # Generate content with higher temperature for creativity
-        draft = generate_content(prompt, temperature=0.9, max_tokens=1500)
-        
-        logger.info(f"✅ Draft created ({len(draft)} chars)")
+        with timed_step("draft"):
+            draft = generate_content(build_prompt(state), **draft_llm_settings(state))
         
-        # Update drafts history
-        current_drafts = state.get('drafts', [])
-        new_drafts = current_drafts + [draft]
+        return build_draft_update(state, draft)
         
+    except Exception as e:
+        logger.error(f"❌ Ghostwriter error: {str(e)}")
         return {
-            **state,
-            'draft_content': draft,
-            'drafts': new_drafts,
-            'status': 'drafting_complete'
+            'error': str(e),
+            'status': 'failed'
         }
+
+
+async def aghostwriter_agent(state: Dict) -> Dict:
+    """Async version of ghostwriter_agent for the async workflow path."""
+    logger.info(f"✍️ Ghostwriter crafting {state['platform']} content for: {state['topic']}")
+    
+    try:
+        prompt = build_prompt(state)
+        
+        with timed_step("draft"):
+            if state.get('stream_tokens'):
+                # Forward tokens to the client as they arrive
+                draft = await acollect_stream(
+                    astream_content(prompt, **draft_llm_settings(state)),
+                    node='ghostwriter',
+                    iteration=state.get('iteration_count', 0)
+                )
+            else:
+                draft = await agenerate_content(prompt, **draft_llm_settings(state))
+        
+        return build_draft_update(state, draft)
         
     except Exception as e:
         logger.error(f"❌ Ghostwriter error: {str(e)}")
         return {
-            **state,
             'error': str(e),
             'status': 'failed'
         }
 
 
+def draft_llm_settings(state: Dict) -> Dict:
+    """LLM settings for drafting, taken from the per-request state."""
+    return {
+        'model': state['model'],
+        'temperature': state['draft_temperature'],
+        'max_tokens': state['draft_max_tokens'],
+        # Creative call: re-running a topic should give a fresh draft
+        'cache': False,
+        'timeout': call_timeout(state)
+    }
+
+
+def build_prompt(state: Dict) -> str:
+    """Build the drafting prompt based on platform."""
+    topic = state['topic']
+    angles = state['research_angles']
+    feedback = state.get('editor_feedback', '')
+    
+    if state['platform'].lower() == 'twitter':
+        return build_twitter_prompt(topic, angles, feedback)
+    return build_linkedin_prompt(topic, angles, feedback)
+
+
+def build_draft_update(state: Dict, draft: str) -> Dict:
+    """Record a new draft in the drafts history and return the state update."""
+    logger.info(f"✅ Draft created ({len(draft)} chars)")
+    
+    # Update drafts history
+    current_drafts = state.get('drafts', [])
+    new_drafts = current_drafts + [draft]
+    
+    return {
+        'draft_content': draft,
+        'drafts': new_drafts,
+        'status': 'drafting_complete'
+    }
+
+
 def build_twitter_prompt(topic: str, angles: list, feedback: str = '') -> str:
     """Build prompt for Twitter thread generation."""
     
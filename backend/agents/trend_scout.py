@@ -1,32 +1,202 @@
 """Trend Scout Agent - The Angle Hunter."""
 
-from typing import Dict, List
-from tools.tavily_search import search_trending_content
-from tools.groq_llm import generate_content
+import asyncio
+import contextvars
+import threading
+from typing import Dict, List, Optional, Tuple
+from tools.tavily_search import search_trending_content, asearch_trending_content
+from tools.groq_llm import generate_content, agenerate_content
+from tools.research_cache import get_research_cache
+from utils.deadline import call_timeout
 from utils.logger import setup_logger
+from utils.timings import record_research_cache_hit, timed_step
+import config
 
 logger = setup_logger(__name__)
 
+# Keep references so background refresh tasks are not garbage collected
+_background_refreshes = set()
+
 
 def trend_scout_agent(state: Dict) -> Dict:
     """
     Research trending angles for a topic using Tavily.
     
+    Repeat topics researched with the same model, scout temperature and
+    fan-out are served from the research cache; a stale entry is returned
+    immediately while a background thread refreshes it.
+    
     Args:
         state: Current workflow state
-        
+    
     Returns:
-        Updated state with research_angles populated
+        State update with research_angles populated
     """
     topic = state['topic']
     logger.info(f"🕵️ Trend Scout researching: {topic}")
     
     try:
-        # Search for trending content
-        search_results = search_trending_content(topic, max_results=5)
+        cached = lookup_research(state)
+        if cached is not None:
+            entry, fresh = cached
+            if not fresh and get_research_cache().start_refresh(topic, research_settings(state)):
+                threading.Thread(target=refresh_research, args=(background_state(state),), daemon=True).start()
+            return build_research_update(entry['angles'])
+        
+        search_results, angles = research_topic(state)
+        store_research(state, search_results, angles)
+        return build_research_update(angles)
+    
+    except Exception as e:
+        logger.error(f"❌ Trend Scout error: {str(e)}")
+        return {
+            'error': str(e),
+            'status': 'failed'
+        }
+
+
+async def atrend_scout_agent(state: Dict) -> Dict:
+    """Async version of trend_scout_agent for the async workflow path."""
+    topic = state['topic']
+    logger.info(f"🕵️ Trend Scout researching: {topic}")
+    
+    try:
+        # The research cache may read its SQLite file; keep that off the loop
+        cached = await asyncio.to_thread(lookup_research, state)
+        if cached is not None:
+            entry, fresh = cached
+            if not fresh and get_research_cache().start_refresh(topic, research_settings(state)):
+                # Empty context: the refresh must not report into this run's callbacks
+                task = asyncio.get_running_loop().create_task(
+                    arefresh_research(background_state(state)), context=contextvars.Context()
+                )
+                _background_refreshes.add(task)
+                task.add_done_callback(_background_refreshes.discard)
+            return build_research_update(entry['angles'])
         
-        # Use LLM to analyze and identify the best angles
-        analysis_prompt = f"""You are a viral content researcher. Analyze these search results about "{topic}" and identify 3-5 unique angles that could make this topic go viral on social media.
+        search_results, angles = await aresearch_topic(state)
+        await asyncio.to_thread(store_research, state, search_results, angles)
+        return build_research_update(angles)
+    
+    except Exception as e:
+        logger.error(f"❌ Trend Scout error: {str(e)}")
+        return {
+            'error': str(e),
+            'status': 'failed'
+        }
+
+
+def research_topic(state: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Search for the topic and have the LLM extract viral angles.
+    
+    Returns:
+        Tuple of (search results, parsed angles)
+    """
+    topic = state['topic']
+    
+    # Search for trending content
+    with timed_step("scout_search"):
+        search_results = search_trending_content(
+            topic, max_results=5, width=state['research_fanout'], timeout=call_timeout(state)
+        )
+    
+    # Use LLM to analyze and identify the best angles. The analysis runs hot
+    # for variety, so it bypasses the LLM cache; the research cache serves
+    # repeat topics instead.
+    with timed_step("scout_analysis"):
+        analysis = generate_content(
+            build_analysis_prompt(topic, search_results),
+            model=state['model'],
+            temperature=state['scout_temperature'],
+            max_tokens=state['max_tokens'],
+            cache=False,
+            timeout=call_timeout(state)
+        )
+    
+    return search_results, parse_angles(analysis, search_results)
+
+
+async def aresearch_topic(state: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """Async version of research_topic."""
+    topic = state['topic']
+    
+    with timed_step("scout_search"):
+        search_results = await asearch_trending_content(
+            topic, max_results=5, width=state['research_fanout'], timeout=call_timeout(state)
+        )
+    
+    with timed_step("scout_analysis"):
+        analysis = await agenerate_content(
+            build_analysis_prompt(topic, search_results),
+            model=state['model'],
+            temperature=state['scout_temperature'],
+            max_tokens=state['max_tokens'],
+            cache=False,
+            timeout=call_timeout(state)
+        )
+    
+    return search_results, parse_angles(analysis, search_results)
+
+
+def research_settings(state: Dict) -> Tuple:
+    """The run's settings that shape its research, part of the research cache key."""
+    return (state['model'], state['scout_temperature'], state['research_fanout'])
+
+
+def lookup_research(state: Dict) -> Optional[Tuple[Dict, bool]]:
+    """Return (entry, is_fresh) from the research cache, or None on a miss."""
+    if not config.RESEARCH_CACHE_ENABLED:
+        return None
+    
+    topic = state['topic']
+    cached = get_research_cache().get(topic, research_settings(state))
+    if cached is not None:
+        logger.info(f"📦 Research cache {'hit' if cached[1] else 'hit (stale, refreshing)'} for: {topic}")
+        record_research_cache_hit()
+    return cached
+
+
+def store_research(state: Dict, search_results: List[Dict], angles: List[Dict]) -> None:
+    """Save research in the cache when it is enabled."""
+    if config.RESEARCH_CACHE_ENABLED:
+        get_research_cache().set(state['topic'], search_results, angles, research_settings(state))
+
+
+def background_state(state: Dict) -> Dict:
+    """Copy of the run's state for a background refresh, which has no deadline."""
+    return {**state, 'deadline_at': None}
+
+
+def refresh_research(state: Dict) -> None:
+    """Background refresh of a stale research cache entry."""
+    topic = state['topic']
+    try:
+        search_results, angles = research_topic(state)
+        store_research(state, search_results, angles)
+        logger.info(f"🔄 Research cache refreshed for: {topic}")
+    except Exception as e:
+        logger.warning(f"⚠️ Research refresh failed for '{topic}': {str(e)}")
+    finally:
+        get_research_cache().finish_refresh(topic, research_settings(state))
+
+
+async def arefresh_research(state: Dict) -> None:
+    """Async version of refresh_research."""
+    topic = state['topic']
+    try:
+        search_results, angles = await aresearch_topic(state)
+        await asyncio.to_thread(store_research, state, search_results, angles)
+        logger.info(f"🔄 Research cache refreshed for: {topic}")
+    except Exception as e:
+        logger.warning(f"⚠️ Research refresh failed for '{topic}': {str(e)}")
+    finally:
+        get_research_cache().finish_refresh(topic, research_settings(state))
+
+
+def build_analysis_prompt(topic: str, search_results: List[Dict]) -> str:
+    """Build the LLM prompt that turns search results into viral angles."""
+    return f"""You are a viral content researcher. Analyze these search results about "{topic}" and identify 3-5 unique angles that could make this topic go viral on social media.
 
 Search Results:
 {format_search_results(search_results)}
@@ -49,27 +219,16 @@ SUMMARY: [Brief summary]
 
 ANGLE 2: ...
 """
-        
-        analysis = generate_content(analysis_prompt, temperature=0.8)
-        
-        # Parse the angles
-        angles = parse_angles(analysis, search_results)
-        
-        logger.info(f"✅ Found {len(angles)} viral angles")
-        
-        return {
-            **state,
-            'research_angles': angles,
-            'status': 'researching_complete'
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ Trend Scout error: {str(e)}")
-        return {
-            **state,
-            'error': str(e),
-            'status': 'failed'
-        }
+
+
+def build_research_update(angles: List[Dict]) -> Dict:
+    """Return the state update for a set of research angles."""
+    logger.info(f"✅ Found {len(angles)} viral angles")
+    
+    return {
+        'research_angles': angles,
+        'status': 'researching_complete'
+    }
 
 
 def format_search_results(results: List[Dict]) -> str:
@@ -0,0 +1,259 @@
+"""Admission control for workflow runs: a fixed number of slots and a bounded wait queue."""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set
+
+import config
+from utils.logger import setup_logger
+from utils.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_SLOTS_IN_USE, ADMISSION_WAIT_SECONDS, ADMISSIONS
+
+logger = setup_logger(__name__)
+
+# Weight of the latest run in the average run time behind Retry-After
+RUN_TIME_SMOOTHING = 0.2
+
+MAX_RETRY_AFTER = 120  # seconds
+
+
+class Overloaded(Exception):
+    """No workflow slot is free and none will be in time; the caller should retry later."""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """A workflow slot held by one request; release it once (extra calls are no-ops)."""
+    
+    def __init__(self, controller: "AdmissionController", waited: float):
+        self.controller = controller
+        self.waited = waited
+        self._acquired = time.monotonic()
+        self._released = False
+    
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.controller._release(time.monotonic() - self._acquired)
+
+
+class AdmissionController:
+    """
+    Limits how many workflows run at once in this worker.
+    
+    Up to `slots` requests run; up to `queue_size` more wait, first come
+    first served, for at most `max_wait` seconds each. A request that finds
+    the queue full, or is still waiting when its time is up, is rejected
+    with Overloaded, carrying a Retry-After estimate from the average run
+    time. Past the slots, extra load waits or is shed instead of slowing
+    down every run sharing the Groq quota.
+    
+    Queued jobs take slots too (wait_for_slot), so a worker never runs
+    more than `slots` workflows between its API requests and job workers.
+    
+    Waiters may come from more than one event loop (e.g. tests, or the
+    Mangum handler), so state sits behind a thread lock and each freed
+    slot is handed straight to the next waiter through its own loop.
+    """
+    
+    def __init__(self, slots: int, queue_size: int, max_wait: float):
+        self.slots = slots
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        
+        self.in_use = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._background: Set[asyncio.Future] = set()  # waiters from wait_for_slot
+        self._average_run: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def retry_after(self) -> int:
+        """Seconds until a retry is likely to be admitted."""
+        with self._lock:
+            average = self._average_run if self._average_run is not None else self.max_wait
+            waiting = len(self._waiters)
+        seconds = average * (waiting + 1) / max(self.slots, 1)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(seconds)))
+    
+    async def acquire(self, max_wait: Optional[float] = None) -> AdmissionSlot:
+        """
+        Take a workflow slot, waiting in the queue if all are in use.
+        
+        Args:
+            max_wait: Longest wait in seconds (e.g. what a deadline allows);
+                None uses the controller's max_wait
+        
+        Returns:
+            The slot; release it when the run is over
+        
+        Raises:
+            Overloaded: If the queue is full or the wait ran out
+        """
+        limit = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        
+        with self._lock:
+            if self.slots <= 0 or (self.in_use < self.slots and not self._waiters):
+                return self._admit(0.0)
+            full = len(self._waiters) - len(self._background) >= self.queue_size
+            if full:
+                self.rejected_full += 1
+            else:
+                waiter = self._enqueue()
+        
+        if full:
+            logger.warning(f"🚦 Shedding request: {self.slots} workflow slots busy, {self.queue_size} queued")
+            ADMISSIONS.inc("queue_full")
+            ADMISSION_WAIT_SECONDS.observe(0.0)
+            raise Overloaded("All workflow slots are busy and the queue is full", self.retry_after())
+        
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout=limit)
+        except asyncio.TimeoutError:
+            self._leave_queue(waiter)
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started)
+            logger.warning(f"🚦 Shedding request: no workflow slot after {limit:.1f}s in the queue")
+            with self._lock:
+                self.rejected_timeout += 1
+            ADMISSIONS.inc("queue_timeout")
+            raise Overloaded(f"No workflow slot freed up within {limit:.0f}s", self.retry_after())
+        except asyncio.CancelledError:
+            # The client went away while queued
+            self._leave_queue(waiter)
+            raise
+        
+        waited = time.monotonic() - started
+        ADMISSION_WAIT_SECONDS.observe(waited)
+        return AdmissionSlot(self, waited)
+    
+    async def wait_for_slot(self) -> AdmissionSlot:
+        """
+        Take a workflow slot, waiting as long as it takes.
+        
+        For background work such as queued jobs, which has no client to
+        answer with a 429: it queues in turn with requests but is never
+        shed, and does not count against queue_size.
+        
+        Returns:
+            The slot; release it when the run is over
+        """
+        with self._lock:
+            if self.slots <= 0 or (self.in_use < self.slots and not self._waiters):
+                return self._admit(0.0)
+            waiter = self._enqueue()
+            self._background.add(waiter)
+        
+        started = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self._leave_queue(waiter)
+            raise
+        
+        waited = time.monotonic() - started
+        ADMISSION_WAIT_SECONDS.observe(waited)
+        return AdmissionSlot(self, waited)
+    
+    def _enqueue(self) -> asyncio.Future:
+        """Add a waiter for the next free slot. Caller holds the lock."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        ADMISSION_QUEUE_DEPTH.inc()
+        return waiter
+    
+    def _leave_queue(self, waiter: asyncio.Future) -> None:
+        """Drop a waiter that gave up; a slot already on its way is passed on by _wake."""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._background.discard(waiter)
+                ADMISSION_QUEUE_DEPTH.dec()
+    
+    def _admit(self, waited: float) -> AdmissionSlot:
+        """Count a request that got a slot immediately. Caller holds the lock."""
+        self.in_use += 1
+        self.admitted += 1
+        ADMISSION_SLOTS_IN_USE.inc()
+        ADMISSIONS.inc("admitted")
+        ADMISSION_WAIT_SECONDS.observe(waited)
+        return AdmissionSlot(self, waited)
+    
+    def _release(self, held: float) -> None:
+        with self._lock:
+            if self._average_run is None:
+                self._average_run = held
+            else:
+                self._average_run += RUN_TIME_SMOOTHING * (held - self._average_run)
+            self._hand_off()
+    
+    def _hand_off(self) -> None:
+        """Pass a freed slot to the oldest waiter, or free it. Caller holds the lock."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            self._background.discard(waiter)
+            ADMISSION_QUEUE_DEPTH.dec()
+            if waiter.done():
+                continue
+            # The slot stays in use, now held by the waiter
+            try:
+                waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+            except RuntimeError:
+                # Its event loop is closed
+                continue
+            return
+        self.in_use -= 1
+        ADMISSION_SLOTS_IN_USE.dec()
+    
+    def _wake(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # Cancelled or timed out after it was picked: pass the slot on
+            with self._lock:
+                self._hand_off()
+        else:
+            with self._lock:
+                self.admitted += 1
+            ADMISSIONS.inc("admitted")
+            waiter.set_result(True)
+    
+    def stats(self) -> Dict:
+        """Return slot and queue counters."""
+        with self._lock:
+            return {
+                'slots': self.slots,
+                'in_use': self.in_use,
+                'queue_depth': len(self._waiters),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected_full': self.rejected_full,
+                'rejected_timeout': self.rejected_timeout,
+                'average_run_seconds': round(self._average_run or 0.0, 3)
+            }
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller, configured from config."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    config.WORKFLOW_SLOTS,
+                    config.WORKFLOW_QUEUE_SIZE,
+                    config.WORKFLOW_QUEUE_TIMEOUT
+                )
+    return _controller
@@ -0,0 +1,385 @@
+"""
+Workers that run queued generation jobs (POST /api/jobs) and call their webhooks.
+
+Started with the API when JOB_WORKERS is above 0, or on their own, as many
+processes as needed, all draining the same job store:
+
+    cd backend
+    python -m api.jobs --workers 4
+
+Serverless deployments (Vercel, through Mangum with lifespan off) start no
+workers, so POST /api/jobs answers 503 there unless JOB_EXTERNAL_WORKERS
+says separate worker processes share the job store.
+
+Job store calls run in a thread: they take SQLite write locks that another
+process may be holding, and the workers share the API's event loop.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import os
+import socket
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import config
+from api.admission import AdmissionController, get_admission_controller
+from api.models import GenerateRequest, build_generate_response, build_job_response
+from tools.job_store import JobStore, get_job_store
+from tools.rate_limiter import backoff_delay
+from utils.logger import setup_logger
+from utils.timings import RunTimings
+from workflow.checkpoints import get_checkpointer
+from workflow.graph import astream_workflow
+
+logger = setup_logger(__name__)
+
+# How often idle workers delete finished jobs older than JOB_RETENTION
+PRUNE_INTERVAL = 3600  # seconds
+
+
+class LeaseLost(Exception):
+    """Another worker took over the job after this worker's lease ran out."""
+
+
+def job_progress(node: str, state: Dict) -> Dict:
+    """The partial state stored for a running job after a node finishes."""
+    return {
+        'node': node,
+        'iteration': state.get('iteration_count', 0),
+        'status': state.get('status', 'unknown'),
+        'virality_score': state.get('virality_score', 0),
+        'draft': state.get('draft_content', ''),
+        'research_angles': state.get('research_angles', []),
+        'scores': state.get('scores', []),
+        'feedbacks': state.get('feedbacks', [])
+    }
+
+
+def webhook_signature(body: bytes, secret: str) -> str:
+    """HMAC-SHA256 of the webhook body, sent as X-Webhook-Signature."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def check_webhook_url(url: str) -> None:
+    """
+    Refuse webhook URLs that would make the worker call into its own network.
+    
+    With JOB_WEBHOOK_ALLOWED_HOSTS set, only those hosts are allowed;
+    otherwise the host must resolve to public addresses only (no loopback,
+    private, link-local or cloud metadata addresses). Resolves the host, so
+    call it off the event loop.
+    
+    Raises:
+        ValueError: If the URL may not be used as a webhook
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("Webhook URL must be an http(s) URL with a host")
+    
+    allowed = {name.strip().lower() for name in config.JOB_WEBHOOK_ALLOWED_HOSTS.split(",") if name.strip()}
+    if allowed:
+        if host not in allowed:
+            raise ValueError(f"Webhook host {host} is not in JOB_WEBHOOK_ALLOWED_HOSTS")
+        return
+    
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, ValueError) as e:
+        raise ValueError(f"Webhook host {host} does not resolve ({e})")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            raise ValueError(f"Webhook host {host} resolves to a non-public address ({ip})")
+
+
+async def deliver_webhook(job: Dict, store: JobStore) -> bool:
+    """
+    POST a finished job to its webhook_url, retrying failures with backoff.
+    
+    The body is the job as returned by GET /api/jobs/{id}; with
+    JOB_WEBHOOK_SECRET set it is signed in X-Webhook-Signature. The URL is
+    checked again (check_webhook_url) right before delivery, since its
+    host may resolve differently than when the job was submitted.
+    
+    Returns:
+        True if the webhook answered 2xx
+    """
+    try:
+        await asyncio.to_thread(check_webhook_url, job['webhook_url'])
+    except ValueError as e:
+        logger.warning(f"⚠️ Webhook for job {job['id']} refused: {e}")
+        await asyncio.to_thread(store.set_webhook_status, job['id'], "refused")
+        return False
+    
+    body = build_job_response(job).model_dump_json().encode()
+    headers = {'Content-Type': "application/json", 'X-Job-Id': job['id']}
+    if config.JOB_WEBHOOK_SECRET:
+        headers['X-Webhook-Signature'] = webhook_signature(body, config.JOB_WEBHOOK_SECRET)
+    
+    async with httpx.AsyncClient(timeout=config.JOB_WEBHOOK_TIMEOUT) as client:
+        for attempt in range(config.JOB_WEBHOOK_RETRIES + 1):
+            try:
+                response = await client.post(job['webhook_url'], content=body, headers=headers)
+                if response.is_success:
+                    await asyncio.to_thread(store.set_webhook_status, job['id'], "delivered")
+                    return True
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt < config.JOB_WEBHOOK_RETRIES:
+                await asyncio.sleep(backoff_delay(attempt))
+    
+    logger.warning(f"⚠️ Webhook for job {job['id']} failed ({error})")
+    await asyncio.to_thread(store.set_webhook_status, job['id'], "failed")
+    return False
+
+
+class JobWorkerPool:
+    """
+    A set of asyncio workers draining the job store.
+    
+    Each worker claims one job at a time under a lease, runs the workflow
+    with astream_workflow (saving the partial state, and so renewing the
+    lease, as each node finishes, with a heartbeat in between for long
+    nodes), then records the result and calls the job's webhook. Pools in
+    other processes share the queue through the store, so adding worker
+    processes adds throughput.
+    
+    A claimed job waits for a workflow slot from the process's admission
+    controller, like an API request but without a time limit, so jobs and
+    requests together stay within WORKFLOW_SLOTS.
+    """
+    
+    def __init__(
+        self,
+        store: JobStore,
+        concurrency: int = 2,
+        lease_seconds: float = 60,
+        poll_interval: float = 1.0,
+        name: Optional[str] = None,
+        admission: Optional[AdmissionController] = None
+    ):
+        self.store = store
+        self.admission = admission or get_admission_controller()
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        
+        self.completed = 0
+        self.failed = 0
+        self.lost = 0
+        
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._last_prune = 0.0
+    
+    @property
+    def running(self) -> bool:
+        """True while the workers are started."""
+        return bool(self._tasks) and not self._stopping
+    
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._work(f"{self.name}:{index}"))
+            for index in range(self.concurrency)
+        ]
+        logger.info(f"🧵 Started {self.concurrency} job workers ({self.name})")
+    
+    async def stop(self) -> None:
+        """
+        Stop the workers.
+        
+        Running jobs are cancelled; their leases run out and another worker
+        picks them up again.
+        """
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def run_once(self, worker_id: Optional[str] = None) -> bool:
+        """Claim and run one job; False if the queue was empty."""
+        worker_id = worker_id or f"{self.name}:0"
+        job = await asyncio.to_thread(self.store.claim, worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        await self.run_job(job, worker_id)
+        return True
+    
+    async def _work(self, worker_id: str) -> None:
+        while not self._stopping:
+            try:
+                if not await self.run_once(worker_id):
+                    await self._maybe_prune()
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Job worker {worker_id} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+    
+    async def _maybe_prune(self) -> None:
+        now = time.time()
+        if now - self._last_prune >= PRUNE_INTERVAL:
+            self._last_prune = now
+            pruned = await asyncio.to_thread(self.store.prune, config.JOB_RETENTION)
+            if pruned:
+                logger.info(f"🧹 Pruned {pruned} finished jobs")
+    
+    async def run_job(self, job: Dict, worker_id: str) -> None:
+        """Run a claimed job to completion, then record it and call its webhook."""
+        logger.info(f"🧵 {worker_id} running job {job['id']} (attempt {job['attempts']})")
+        heartbeat = asyncio.create_task(self._heartbeat(job['id'], worker_id, asyncio.current_task()))
+        result, error, slot = None, None, None
+        try:
+            # The heartbeat keeps the lease while the job waits for a slot
+            slot = await self.admission.wait_for_slot()
+            result = await self._run_workflow(job, worker_id)
+        except (asyncio.CancelledError, LeaseLost) as e:
+            if isinstance(e, asyncio.CancelledError):
+                if not heartbeat.done():
+                    # Cancelled from outside (the pool is stopping), not by the heartbeat
+                    raise
+                asyncio.current_task().uncancel()
+            self.lost += 1
+            logger.warning(f"⚠️ {worker_id} lost the lease on job {job['id']}")
+            return
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            heartbeat.cancel()
+            if slot is not None:
+                slot.release()
+        
+        finished = await asyncio.to_thread(self.store.finish, job['id'], worker_id, result, error)
+        if not finished:
+            self.lost += 1
+            logger.warning(f"⚠️ {worker_id} finished job {job['id']} after losing its lease")
+            return
+        
+        if error is None:
+            self.completed += 1
+            logger.info(f"✅ Job {job['id']} succeeded")
+        else:
+            self.failed += 1
+            logger.error(f"❌ Job {job['id']} failed: {error}")
+        
+        if job.get('webhook_url'):
+            await deliver_webhook(await asyncio.to_thread(self.store.get, job['id']), self.store)
+    
+    async def _run_workflow(self, job: Dict, worker_id: str) -> Dict:
+        request = GenerateRequest(**job['request'])
+        timings = RunTimings() if request.include_timings else None
+        start_time = time.time()
+        # A job picked up again after its worker died resumes from the last
+        # node that worker finished
+        run_id = request.run_id
+        if run_id is None and get_checkpointer() is not None:
+            run_id = f"job-{job['id']}"
+        
+        final_state = {}
+        async for kind, data in astream_workflow(
+            request.topic,
+            request.platform,
+            request.settings.model_dump(),
+            deadline_ms=request.deadline_ms,
+            timings=timings,
+            run_id=run_id
+        ):
+            if kind != 'node':
+                continue
+            final_state = data['state']
+            partial = job_progress(data['node'], final_state)
+            saved = await asyncio.to_thread(self.store.save_progress, job['id'], worker_id, partial, self.lease_seconds)
+            if not saved:
+                raise LeaseLost(job['id'])
+        
+        return build_generate_response(
+            final_state,
+            time.time() - start_time,
+            timings.as_dict() if timings is not None else None,
+            run_id
+        ).model_dump()
+    
+    async def _heartbeat(self, job_id: str, worker_id: str, runner: asyncio.Task) -> None:
+        """Renew the lease while a node runs; cancel the run if the lease is lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.store.renew, job_id, worker_id, self.lease_seconds):
+                runner.cancel()
+                return
+    
+    def stats(self) -> Dict:
+        """Return this pool's job counters."""
+        return {
+            'workers': len(self._tasks),
+            'completed': self.completed,
+            'failed': self.failed,
+            'lost': self.lost
+        }
+
+
+_pool: Optional[JobWorkerPool] = None
+
+
+def workers_available() -> bool:
+    """True if job workers drain this process's job store: its own pool, or JOB_EXTERNAL_WORKERS."""
+    return config.JOB_EXTERNAL_WORKERS or (_pool is not None and _pool.running)
+
+
+def get_job_worker_pool() -> JobWorkerPool:
+    """Return the process-wide job worker pool, configured from config."""
+    global _pool
+    if _pool is None:
+        _pool = JobWorkerPool(
+            get_job_store(),
+            concurrency=config.JOB_WORKERS,
+            lease_seconds=config.JOB_LEASE_SECONDS,
+            poll_interval=config.JOB_POLL_INTERVAL
+        )
+    return _pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run job workers against the shared job store.")
+    parser.add_argument("--workers", type=int, default=max(config.JOB_WORKERS, 1), help="concurrent jobs in this process")
+    args = parser.parse_args()
+    
+    config.validate_config()
+    
+    async def serve():
+        pool = JobWorkerPool(
+            get_job_store(),
+            concurrency=args.workers,
+            lease_seconds=config.JOB_LEASE_SECONDS,
+            poll_interval=config.JOB_POLL_INTERVAL
+        )
+        pool.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await pool.stop()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
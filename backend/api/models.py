@@ -1,6 +1,6 @@
 """Pydantic models for API request/response validation."""
 
-from typing import List, Dict, Optional, Literal
+from typing import Any, List, Dict, Optional, Literal
 from pydantic import BaseModel, Field
 
 
@@ -9,6 +9,27 @@ class GenerationSettings(BaseModel):
     model: str = Field(default="meta-llama/llama-4-scout-17b-16e-instruct")
     max_iterations: int = Field(default=3, ge=1, le=5)
     virality_threshold: int = Field(default=85, ge=50, le=100)
+    # Optional overrides; None uses the server default from config
+    scout_temperature: Optional[float] = Field(default=None, ge=0.0, le=2.0)
+    draft_temperature: Optional[float] = Field(default=None, ge=0.0, le=2.0)
+    editor_temperature: Optional[float] = Field(default=None, ge=0.0, le=2.0)
+    max_tokens: Optional[int] = Field(default=None, ge=1, le=8000)
+    draft_max_tokens: Optional[int] = Field(default=None, ge=1, le=8000)
+    research_fanout: Optional[int] = Field(default=None, ge=1, le=4)
+    # Drafts written and scored in parallel per iteration; above 1 runs the
+    # best-of-N workflow and keeps only the top-scoring draft
+    candidates: Optional[int] = Field(default=None, ge=1, le=5)
+    # Start a generic polish alongside the review and keep it if the draft
+    # passes with minor feedback
+    speculative_polish: Optional[bool] = Field(default=None)
+    # "structured" reviews and polishes in one JSON-mode call
+    editor_mode: Optional[Literal["classic", "structured"]] = Field(default=None)
+    # Stop revising when the last convergence_window scores don't beat the
+    # earlier best by convergence_min_improvement, or consecutive drafts are
+    # at least convergence_similarity alike; a window of 0 (the default) is off
+    convergence_window: Optional[int] = Field(default=None, ge=0, le=5)
+    convergence_min_improvement: Optional[int] = Field(default=None, ge=0, le=100)
+    convergence_similarity: Optional[float] = Field(default=None, ge=0.5, le=1.0)
 
 
 class GenerateRequest(BaseModel):
@@ -16,6 +37,31 @@ class GenerateRequest(BaseModel):
     topic: str = Field(..., min_length=1, max_length=500)
     platform: Literal["twitter", "linkedin"] = Field(default="twitter")
     settings: GenerationSettings = Field(default_factory=GenerationSettings)
+    # Latency budget: the response arrives within this many milliseconds,
+    # with the best draft so far and status "deadline_reached" if needed
+    deadline_ms: Optional[int] = Field(default=None, ge=1000, le=900000)
+    # Return a per-node, per-step and per-call timing and token breakdown
+    include_timings: bool = Field(default=False)
+    # Checkpoint key: resending a failed, interrupted or deadline-cut run's
+    # run_id continues it from its last finished node
+    run_id: Optional[str] = Field(default=None, min_length=1, max_length=128, pattern=r"^[\w.:-]+$")
+
+
+class RerunRequest(BaseModel):
+    """Request model for a partial re-run of a checkpointed run."""
+    # Everything before this node is reused from the stored run
+    start_node: Literal["ghostwriter", "chief_editor", "polish"]
+    # Overrides; None (or a setting left out) keeps the stored run's value
+    platform: Optional[Literal["twitter", "linkedin"]] = Field(default=None)
+    settings: GenerationSettings = Field(default_factory=GenerationSettings)
+    # Revision notes for the Ghostwriter, or what the polish should change
+    feedback: Optional[str] = Field(default=None, min_length=1, max_length=4000)
+    # Replaces the stored draft when starting at chief_editor or polish
+    draft: Optional[str] = Field(default=None, min_length=1, max_length=20000)
+    deadline_ms: Optional[int] = Field(default=None, ge=1000, le=900000)
+    include_timings: bool = Field(default=False)
+    # ID the re-run is checkpointed under; generated when not given
+    run_id: Optional[str] = Field(default=None, min_length=1, max_length=128, pattern=r"^[\w.:-]+$")
 
 
 class ResearchAngle(BaseModel):
@@ -26,6 +72,43 @@ class ResearchAngle(BaseModel):
     sources: List[str] = []
 
 
+class SpanTiming(BaseModel):
+    """Wall time of one node invocation or one step within a node."""
+    name: str
+    node: Optional[str] = None
+    iteration: Optional[int] = None
+    start_ms: float
+    duration_ms: float
+    error: Optional[str] = None
+
+
+class CallTiming(BaseModel):
+    """One Groq or Tavily call."""
+    tool: str
+    model: str = ""
+    node: Optional[str] = None
+    iteration: Optional[int] = None
+    step: Optional[str] = None
+    queue_ms: float
+    duration_ms: float
+    attempts: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached: bool = False
+
+
+class Timings(BaseModel):
+    """Timing and token breakdown of one generation."""
+    total_ms: float
+    queue_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+    cache_hits: Dict[str, int]
+    nodes: List[SpanTiming]
+    steps: List[SpanTiming]
+    calls: List[CallTiming]
+
+
 class GenerateResponse(BaseModel):
     """Response model for content generation."""
     final_content: str
@@ -37,6 +120,66 @@ class GenerateResponse(BaseModel):
     research_angles: List[ResearchAngle]
     feedbacks: List[str]
     status: str
+    timings: Optional[Timings] = None
+    # Checkpoint key of the run, to resume or re-run it (see /runs/{run_id}/rerun)
+    run_id: Optional[str] = None
+
+
+def build_generate_response(
+    final_state: Dict,
+    elapsed_time: float,
+    timings: Optional[Dict] = None,
+    run_id: Optional[str] = None
+) -> GenerateResponse:
+    """Build the /generate response from a finished workflow state."""
+    return GenerateResponse(
+        final_content=final_state.get('final_content', '') or final_state.get('draft_content', ''),
+        virality_score=final_state.get('virality_score', 0),
+        iterations=final_state.get('iteration_count', 0),
+        elapsed_time=elapsed_time,
+        drafts=final_state.get('drafts', []),
+        scores=final_state.get('scores', []),
+        research_angles=[
+            ResearchAngle(
+                title=angle.get('title', 'Untitled'),
+                why_viral=angle.get('why_viral', 'N/A'),
+                summary=angle.get('summary', 'N/A'),
+                sources=angle.get('sources', [])
+            )
+            for angle in final_state.get('research_angles', [])
+        ],
+        feedbacks=final_state.get('feedbacks', []),
+        status=final_state.get('status', 'unknown'),
+        timings=timings,
+        run_id=run_id
+    )
+
+
+class JobRequest(GenerateRequest):
+    """Request model for an async generation job."""
+    # POSTed the job (as returned by GET /jobs/{id}) when it finishes; must
+    # be a public host, or one in JOB_WEBHOOK_ALLOWED_HOSTS
+    webhook_url: Optional[str] = Field(default=None, pattern=r"^https?://", max_length=2000)
+
+
+class JobResponse(BaseModel):
+    """An async generation job and, once it has finished, its result."""
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Progress of a running job: last finished node, iteration, draft, score
+    partial: Optional[Dict[str, Any]] = None
+    result: Optional[GenerateResponse] = None
+    error: Optional[str] = None
+    webhook_status: Optional[str] = None
+
+
+def build_job_response(job: Dict) -> JobResponse:
+    """Build the /jobs response from a job store row."""
+    return JobResponse(**{field: job[field] for field in JobResponse.model_fields})
 
 
 class HealthResponse(BaseModel):
@@ -1,19 +1,34 @@
 """API routes for the Viral Content Agent."""
 
+import asyncio
 import time
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, Optional
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import json
 
 from api.models import (
     GenerateRequest,
     GenerateResponse,
     HealthResponse,
+    JobRequest,
+    JobResponse,
     ModelsResponse,
-    ResearchAngle
+    RerunRequest,
+    build_generate_response,
+    build_job_response
 )
-from workflow.graph import run_workflow
+from api.admission import AdmissionSlot, Overloaded, get_admission_controller
+from api.jobs import check_webhook_url, workers_available
+from tools.cassettes import cassette_stats
+from tools.groq_llm import cache_stats, pool_stats, rate_limit_stats
+from tools.job_store import get_job_store
+from tools.research_cache import get_research_cache
+from utils.metrics import REGISTRY
+from utils.timings import RunTimings
+from workflow.checkpoints import get_checkpointer
+from workflow.graph import RunNotFound, arerun_workflow, arun_workflow, astream_workflow
 import config
 
 router = APIRouter()
@@ -45,6 +60,47 @@ async def get_models():
     return ModelsResponse(models=models)
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics for this worker process.
+    
+    Node and upstream call latency histograms, Groq token counters per
+    model, iteration and final score distributions, in-flight runs,
+    upstream errors and speculative polish outcomes, admission queue depth
+    and wait time, plus the cache, client pool, rate limiter, cassette,
+    admission, job queue and checkpoint counters.
+    """
+    snapshots = {
+        'llm_cache': cache_stats(),
+        'llm_pool': pool_stats(),
+        'rate_limiter': rate_limit_stats(),
+        'cassette': cassette_stats(),
+        'admission': get_admission_controller().stats(),
+        **await asyncio.to_thread(file_backed_snapshots)
+    }
+    return PlainTextResponse(
+        REGISTRY.render(snapshots),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def file_backed_snapshots() -> Dict[str, Dict]:
+    """
+    Stats of the subsystems kept in SQLite files, for /metrics.
+    
+    Blocking; run it in a thread. The job queue is only reported where
+    workers serve it, so a serverless host never creates jobs.sqlite.
+    """
+    snapshots = {'research_cache': get_research_cache().stats()}
+    if workers_available():
+        snapshots['jobs'] = get_job_store().stats()
+    checkpointer = get_checkpointer()
+    if checkpointer is not None:
+        snapshots['checkpoints'] = checkpointer.stats()
+    return snapshots
+
+
 @router.post("/generate", response_model=GenerateResponse)
 async def generate_content(request: GenerateRequest):
     """
@@ -55,116 +111,228 @@ async def generate_content(request: GenerateRequest):
     2. Ghostwriter creates content
     3. Chief Editor reviews and scores
     4. Loop until approved or max iterations
+    
+    Runs take one of the worker's workflow slots; when all are busy the
+    request waits in a bounded queue, and gets a 429 with Retry-After if
+    the queue is full or no slot frees up in time.
     """
+    slot = None
     try:
         # Validate config
         config.validate_config()
         
         # Track time
         start_time = time.time()
+        timings = RunTimings() if request.include_timings else None
+        
+        slot = await acquire_slot(request)
         
         # Run workflow
-        final_state = run_workflow(
+        final_state = await arun_workflow(
             request.topic, 
             request.platform,
-            request.settings.max_iterations,
-            request.settings.virality_threshold
+            request.settings.model_dump(),
+            deadline_ms=remaining_deadline_ms(request, slot),
+            timings=timings,
+            run_id=request.run_id
         )
         
         elapsed_time = time.time() - start_time
         
-        # Extract research angles
-        research_angles = []
-        for angle in final_state.get('research_angles', []):
-            research_angles.append(
-                ResearchAngle(
-                    title=angle.get('title', 'Untitled'),
-                    why_viral=angle.get('why_viral', 'N/A'),
-                    summary=angle.get('summary', 'N/A'),
-                    sources=angle.get('sources', [])
-                )
-            )
-        
-        # Build response
-        response = GenerateResponse(
-            final_content=final_state.get('final_content', '') or final_state.get('draft_content', ''),
-            virality_score=final_state.get('virality_score', 0),
-            iterations=final_state.get('iteration_count', 0),
-            elapsed_time=elapsed_time,
-            drafts=final_state.get('drafts', []),
-            scores=final_state.get('scores', []),
-            research_angles=research_angles,
-            feedbacks=final_state.get('feedbacks', []),
-            status=final_state.get('status', 'unknown')
+        return build_generate_response(
+            final_state,
+            elapsed_time,
+            timings.as_dict() if timings is not None else None,
+            request.run_id
         )
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+    finally:
+        if slot is not None:
+            slot.release()
+
+
+@router.post("/runs/{run_id}/rerun", response_model=GenerateResponse)
+async def rerun_content(run_id: str, request: RerunRequest):
+    """
+    Re-run a checkpointed run from a later node, reusing its stored state.
+    
+    start_node "ghostwriter" writes a new draft from the stored research,
+    "chief_editor" reviews the stored draft again (say, against a new
+    threshold or platform) and "polish" only polishes it, so an edit
+    costs no Trend Scout research. Only the overrides sent (platform,
+    settings, feedback, draft) change. The re-run gets its own run_id,
+    returned in the response.
+    """
+    slot = None
+    try:
+        config.validate_config()
+        
+        start_time = time.time()
+        timings = RunTimings() if request.include_timings else None
+        
+        slot = await acquire_slot(request)
         
-        return response
+        new_run_id, final_state = await arerun_workflow(
+            run_id,
+            request.start_node,
+            run_id=request.run_id,
+            platform=request.platform,
+            settings=request.settings.model_dump(exclude_unset=True),
+            feedback=request.feedback,
+            draft=request.draft,
+            deadline_ms=remaining_deadline_ms(request, slot),
+            timings=timings
+        )
         
+        return build_generate_response(
+            final_state,
+            time.time() - start_time,
+            timings.as_dict() if timings is not None else None,
+            new_run_id
+        )
+    
+    except HTTPException:
+        raise
+    except RunNotFound:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Re-run failed: {str(e)}")
+    finally:
+        if slot is not None:
+            slot.release()
+
+
+async def acquire_slot(request: GenerateRequest) -> AdmissionSlot:
+    """
+    Wait for a workflow slot, for no longer than the request's deadline allows.
+    
+    Raises:
+        HTTPException: 429 with Retry-After when the worker is overloaded
+    """
+    max_wait = request.deadline_ms / 1000 if request.deadline_ms else None
+    try:
+        return await get_admission_controller().acquire(max_wait)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={'Retry-After': str(e.retry_after)}
+        )
+
+
+def remaining_deadline_ms(request: GenerateRequest, slot: Optional[AdmissionSlot]) -> Optional[int]:
+    """The request's deadline less the time spent queued for a slot."""
+    if request.deadline_ms is None or slot is None:
+        return request.deadline_ms
+    return max(1, request.deadline_ms - int(slot.waited * 1000))
+
+
+def build_progress_event(node: str, update: Dict, state: Dict) -> Dict:
+    """Build the SSE payload sent when a workflow node finishes."""
+    data = {
+        'iteration': state.get('iteration_count', 0),
+        'status': state.get('status', 'unknown')
+    }
+    
+    if node == 'trend_scout':
+        data['research_angles'] = update.get('research_angles', [])
+    elif node == 'ghostwriter':
+        data['draft'] = update.get('draft_content', '')
+    elif node == 'candidate':
+        candidate = update.get('candidate_results', [{}])[0]
+        data['candidate'] = candidate.get('index')
+        data['draft'] = candidate.get('draft', '')
+        data['score'] = candidate.get('score')
+        if candidate.get('error'):
+            data['error'] = candidate['error']
+    elif node in ('chief_editor', 'select_best'):
+        data['score'] = update.get('virality_score')
+        data['feedback'] = update.get('editor_feedback', '')
+        if 'final_content' in update:
+            data['final_content'] = update['final_content']
+    elif node in ('converge', 'deadline'):
+        data['score'] = update.get('virality_score')
+        data['final_content'] = update.get('final_content', '')
+    elif node == 'checkpoint':
+        # Restored from the run's checkpoints (run_id)
+        data['research_angles'] = state.get('research_angles', [])
+        data['draft'] = state.get('draft_content', '')
+        data['score'] = state.get('virality_score')
+    
+    if update.get('error'):
+        data['error'] = update['error']
+    
+    return {'type': 'progress', 'node': node, 'data': data}
 
 
-async def generate_content_stream(request: GenerateRequest) -> AsyncGenerator[str, None]:
+async def generate_content_stream(request: GenerateRequest, slot: Optional[AdmissionSlot] = None) -> AsyncGenerator[str, None]:
     """
     Stream content generation progress using Server-Sent Events.
     
-    This is an alternative endpoint for real-time updates.
+    Emits a 'progress' event as each workflow node (trend_scout, ghostwriter,
+    chief_editor, increment, converge, deadline; candidate and select_best in
+    best-of-N mode) finishes (preceded by 'checkpoint' when a run_id resumes
+    a stored run), 'draft_delta' events carrying the Ghostwriter draft and Chief
+    Editor polish token by token (tagged with node and iteration; best-of-N
+    candidates are not streamed, only the polish), then a 'complete' event
+    with the same payload as /generate (including timings when
+    include_timings is set).
+    
+    Args:
+        request: The generate request
+        slot: Workflow slot taken for this run, released when the stream ends
     """
     try:
-        # Update config (only model needs global update if used by tools directly)
-        config.GROQ_MODEL = request.settings.model
-        
         # Send initial event
         yield f"data: {json.dumps({'type': 'status', 'message': 'Starting workflow...'})}\n\n"
         
         start_time = time.time()
+        timings = RunTimings() if request.include_timings else None
         
-        # Run workflow (in future, this could be modified to yield progress)
-        final_state = run_workflow(
-            request.topic, 
+        final_state = {}
+        async for kind, data in astream_workflow(
+            request.topic,
             request.platform,
-            request.settings.max_iterations,
-            request.settings.virality_threshold
-        )
+            request.settings.model_dump(),
+            deadline_ms=remaining_deadline_ms(request, slot),
+            timings=timings,
+            run_id=request.run_id
+        ):
+            if kind == 'draft_delta':
+                event = {'type': 'draft_delta', **data}
+            else:
+                final_state = data['state']
+                event = build_progress_event(data['node'], data['update'], data['state'])
+            yield f"data: {json.dumps(event)}\n\n"
         
         elapsed_time = time.time() - start_time
         
-        # Extract research angles
-        research_angles = []
-        for angle in final_state.get('research_angles', []):
-            research_angles.append({
-                'title': angle.get('title', 'Untitled'),
-                'why_viral': angle.get('why_viral', 'N/A'),
-                'summary': angle.get('summary', 'N/A'),
-                'sources': angle.get('sources', [])
-            })
-        
-        # Send final result
-        result = {
-            'type': 'complete',
-            'data': {
-                'final_content': final_state.get('final_content', '') or final_state.get('draft_content', ''),
-                'virality_score': final_state.get('virality_score', 0),
-                'iterations': final_state.get('iteration_count', 0),
-                'elapsed_time': elapsed_time,
-                'drafts': final_state.get('drafts', []),
-                'scores': final_state.get('scores', []),
-                'research_angles': research_angles,
-                'feedbacks': final_state.get('feedbacks', []),
-                'status': final_state.get('status', 'unknown')
-            }
-        }
-        
-        yield f"data: {json.dumps(result)}\n\n"
-        
+        # Send final result, the same payload /generate returns
+        response = build_generate_response(
+            final_state,
+            elapsed_time,
+            timings.as_dict() if timings is not None else None,
+            request.run_id
+        )
+        yield f"data: {json.dumps({'type': 'complete', 'data': response.model_dump()})}\n\n"
+    
     except Exception as e:
         error_data = {
             'type': 'error',
             'message': str(e)
         }
         yield f"data: {json.dumps(error_data)}\n\n"
+    finally:
+        if slot is not None:
+            slot.release()
 
 
 @router.post("/generate/stream")
@@ -172,8 +340,52 @@ async def generate_content_streaming(request: GenerateRequest):
     """
     Stream content generation with real-time updates.
     Uses Server-Sent Events (SSE) for progress updates.
+    
+    The workflow slot is taken before the stream starts, so an overloaded
+    worker answers 429 with Retry-After instead of an SSE error event.
     """
+    slot = await acquire_slot(request)
     return StreamingResponse(
-        generate_content_stream(request),
-        media_type="text/event-stream"
+        generate_content_stream(request, slot),
+        media_type="text/event-stream",
+        # Also frees the slot if the client disconnects before the stream starts
+        background=BackgroundTask(slot.release)
+    )
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue a generation job and return its ID at once.
+    
+    The job runs on a job worker (see api.jobs), so it survives client
+    disconnects and request timeouts. Poll GET /jobs/{id} for its
+    status, partial state and result, or pass webhook_url to have the
+    finished job POSTed there. Without a worker to run the job (e.g. on
+    a serverless deployment) the request gets a 503 instead.
+    """
+    if not workers_available():
+        raise HTTPException(
+            status_code=503,
+            detail="No job workers run here; start them with JOB_WORKERS or python -m api.jobs (JOB_EXTERNAL_WORKERS)"
+        )
+    try:
+        config.validate_config()
+        if request.webhook_url:
+            await asyncio.to_thread(check_webhook_url, request.webhook_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job = await asyncio.to_thread(
+        get_job_store().submit, request.model_dump(exclude={'webhook_url'}), request.webhook_url
     )
+    return build_job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Status of a job: partial state while it runs, the result once it has finished."""
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return build_job_response(job)
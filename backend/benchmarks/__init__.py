@@ -0,0 +1 @@
+"""Benchmarks for the Viral Content Agent backend."""
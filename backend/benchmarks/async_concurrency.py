@@ -0,0 +1,98 @@
+"""
+Benchmark: N concurrent workflows on one event loop.
+
+Groq and Tavily are replaced at the network boundary by fixed-latency fakes,
+so the numbers measure our own orchestration, not the providers. The async
+path (arun_workflow) should finish N runs in roughly the time of one; the
+sync path called from the event loop serializes them.
+
+Usage (from backend/):
+    python -m benchmarks.async_concurrency --concurrency 8 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import time
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+
+import config
+from workflow.graph import run_workflow, arun_workflow
+
+FAKE_REVIEW = "SCORE: 95\n\nFEEDBACK:\n- Tighten the hook."
+FAKE_RESULTS = {'results': [{'title': 'Result', 'url': 'https://example.com', 'content': 'Body', 'score': 1.0}]}
+
+
+def _fake_backends(latency: float):
+    """Patch ChatGroq and Tavily with fakes that sleep for `latency` seconds."""
+
+    def invoke(self, prompt, *args, **kwargs):
+        time.sleep(latency)
+        return AIMessage(content=FAKE_REVIEW)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        await asyncio.sleep(latency)
+        return AIMessage(content=FAKE_REVIEW)
+
+    def search(self, *args, **kwargs):
+        time.sleep(latency)
+        return FAKE_RESULTS
+
+    async def asearch(self, *args, **kwargs):
+        await asyncio.sleep(latency)
+        return FAKE_RESULTS
+
+    return [
+        mock.patch("langchain_groq.ChatGroq.invoke", invoke),
+        mock.patch("langchain_groq.ChatGroq.ainvoke", ainvoke),
+        mock.patch("tavily.TavilyClient.search", search),
+        mock.patch("tavily.AsyncTavilyClient.search", asearch),
+    ]
+
+
+async def _run_sync_on_loop(n: int) -> float:
+    """Old behaviour: blocking run_workflow called from async handlers."""
+
+    async def handler(i):
+        return run_workflow(f"topic {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(n)))
+    return time.perf_counter() - start
+
+
+async def _run_async(n: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(arun_workflow(f"topic {i}") for i in range(n)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake per-call latency in seconds")
+    args = parser.parse_args()
+
+    config.GROQ_API_KEY = config.GROQ_API_KEY or "benchmark"
+    config.TAVILY_API_KEY = config.TAVILY_API_KEY or "benchmark"
+    config.RATE_LIMIT_ENABLED = False
+
+    patches = _fake_backends(args.latency)
+    for p in patches:
+        p.start()
+    try:
+        single = asyncio.run(_run_async(1))
+        sync_n = asyncio.run(_run_sync_on_loop(args.concurrency))
+        async_n = asyncio.run(_run_async(args.concurrency))
+    finally:
+        for p in patches:
+            p.stop()
+
+    print(f"single run:                     {single:.2f}s")
+    print(f"{args.concurrency} runs, sync on event loop:   {sync_n:.2f}s")
+    print(f"{args.concurrency} runs, async (arun_workflow): {async_n:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
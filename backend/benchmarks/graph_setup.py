@@ -0,0 +1,43 @@
+"""
+Micro-benchmark: per-request graph setup overhead.
+
+Compares building and compiling the LangGraph on every request (what
+run_workflow used to do) with fetching the process-wide compiled graph.
+
+Usage (from backend/):
+    python -m benchmarks.graph_setup --requests 200
+"""
+
+import argparse
+import logging
+import time
+
+from workflow.graph import create_workflow, get_workflow
+
+
+def _per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    # Keep compile log lines out of the timing
+    logging.getLogger("workflow.graph").setLevel(logging.WARNING)
+
+    before = _per_call(create_workflow, args.requests)
+    get_workflow()  # first request pays the compile once
+    after = _per_call(get_workflow, args.requests)
+
+    print(f"compile per request: {before * 1e3:8.3f} ms")
+    print(f"cached graph:        {after * 1e6:8.3f} us")
+    print(f"saved per request:   {(before - after) * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: LLM response cache latency.
+
+Times agenerate_content on a cache miss (fake Groq with fixed latency),
+a memory-tier hit and a disk-tier hit, and prints the cache hit rate.
+
+Usage (from backend/):
+    python -m benchmarks.llm_cache --latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+
+import config
+from tools import groq_llm, llm_cache
+
+PROMPT = "You are a Chief Editor evaluating social media content for virality potential."
+
+
+async def _timed(n: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        await groq_llm.agenerate_content(PROMPT, temperature=0.3)
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="fake Groq latency in seconds")
+    parser.add_argument("--hits", type=int, default=1000)
+    args = parser.parse_args()
+
+    async def ainvoke(self, prompt, *a, **k):
+        await asyncio.sleep(args.latency)
+        return AIMessage(content="SCORE: 88\n\nFEEDBACK:\n- Cut tweet 4.")
+
+    config.GROQ_API_KEY = config.GROQ_API_KEY or "benchmark"
+    config.LLM_CACHE_ENABLED = True
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch("langchain_groq.ChatGroq.ainvoke", ainvoke):
+        path = os.path.join(tmp, "llm_cache.sqlite")
+        llm_cache._cache = llm_cache.LLMCache(path=path)
+
+        miss = asyncio.run(_timed())
+        memory_hit = asyncio.run(_timed(args.hits))
+
+        # Fresh process view: empty memory tier, same SQLite file
+        llm_cache._cache = llm_cache.LLMCache(path=path)
+        disk_hit = asyncio.run(_timed())
+
+        stats = groq_llm.cache_stats()
+
+    print(f"miss (fake Groq):  {miss * 1e3:10.3f} ms")
+    print(f"memory-tier hit:   {memory_hit * 1e6:10.3f} us")
+    print(f"disk-tier hit:     {disk_hit * 1e6:10.3f} us")
+    print(f"cache stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
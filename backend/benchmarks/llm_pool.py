@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: per-call LLM client overhead.
+
+Compares constructing a new ChatGroq for every call (what generate_content
+used to do) with fetching a pooled client. No requests are sent; this is
+the fixed cost paid before each Groq call.
+
+Usage (from backend/):
+    python -m benchmarks.llm_pool --calls 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_groq import ChatGroq
+
+import config
+from tools.llm_pool import LLMClientPool
+
+# The call mix of one run: scout, 3 drafts, 3 reviews, polish
+CALLS_PER_RUN = [(0.8, 2000)] + [(0.9, 1500)] * 3 + [(0.3, 2000)] * 4
+
+
+def _fresh(n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        temperature, max_tokens = CALLS_PER_RUN[i % len(CALLS_PER_RUN)]
+        ChatGroq(api_key=config.GROQ_API_KEY, model=config.GROQ_MODEL,
+                 temperature=temperature, max_tokens=max_tokens)
+    return (time.perf_counter() - start) / n
+
+
+async def _pooled(pool: LLMClientPool, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        temperature, max_tokens = CALLS_PER_RUN[i % len(CALLS_PER_RUN)]
+        pool.get(config.GROQ_MODEL, temperature, max_tokens)
+    elapsed = (time.perf_counter() - start) / n
+    # Async clients live with the event loop, so read the stats before it closes
+    print(f"pool stats: {pool.stats()}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    config.GROQ_API_KEY = config.GROQ_API_KEY or "benchmark"
+
+    fresh = _fresh(args.calls)
+    pool = LLMClientPool()
+    pooled = asyncio.run(_pooled(pool, args.calls))
+
+    print(f"new ChatGroq per call: {fresh * 1e3:8.3f} ms")
+    print(f"pooled client:         {pooled * 1e3:8.3f} ms")
+    print(f"per run ({len(CALLS_PER_RUN)} calls):     {(fresh - pooled) * len(CALLS_PER_RUN) * 1e3:8.1f} ms saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark: Trend Scout latency with the research cache.
+
+Runs the async Trend Scout node for a cold topic, a fresh repeat (with
+different casing and punctuation) and a stale repeat that is served
+immediately while a background refresh runs. Tavily and Groq are fakes
+with fixed latency.
+
+Usage (from backend/):
+    python -m benchmarks.research_cache --latency 1.0
+"""
+
+import argparse
+import asyncio
+import time
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+
+import config
+from agents import trend_scout
+from tools import research_cache
+from workflow.graph import build_initial_state
+
+ANALYSIS = "ANGLE 1: Hook\nWHY VIRAL: Relatable\nSUMMARY: Everyone has felt this"
+
+
+async def _scout(topic: str) -> float:
+    start = time.perf_counter()
+    await trend_scout.atrend_scout_agent(build_initial_state(topic))
+    return time.perf_counter() - start
+
+
+async def _run():
+    cold = await _scout("Database Normalization")
+    fresh = await _scout("  database normalization!! ")
+
+    # Age the entry past its TTL
+    research_cache.get_research_cache().ttl = 0
+    stale = await _scout("Database normalization")
+    await asyncio.gather(*trend_scout._background_refreshes)
+    return cold, fresh, stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="fake Tavily/Groq latency in seconds")
+    args = parser.parse_args()
+
+    async def ainvoke(self, prompt, *a, **k):
+        await asyncio.sleep(args.latency)
+        return AIMessage(content=ANALYSIS)
+
+    async def asearch(self, *a, **k):
+        await asyncio.sleep(args.latency)
+        return {'results': [{'title': 'Normal forms', 'url': 'https://example.com', 'content': 'Body', 'score': 1.0}]}
+
+    config.GROQ_API_KEY = config.GROQ_API_KEY or "benchmark"
+    config.TAVILY_API_KEY = config.TAVILY_API_KEY or "benchmark"
+    config.RATE_LIMIT_ENABLED = False
+    config.LLM_CACHE_ENABLED = False
+    config.RESEARCH_CACHE_ENABLED = True
+    research_cache._cache = research_cache.ResearchCache(path=None)
+
+    with mock.patch("langchain_groq.ChatGroq.ainvoke", ainvoke), \
+            mock.patch("tavily.AsyncTavilyClient.search", asearch):
+        cold, fresh, stale = asyncio.run(_run())
+
+    print(f"cold topic:             {cold * 1e3:10.3f} ms")
+    print(f"fresh hit:              {fresh * 1e3:10.3f} ms")
+    print(f"stale hit (+refresh):   {stale * 1e3:10.3f} ms")
+    print(f"cache stats: {research_cache.get_research_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
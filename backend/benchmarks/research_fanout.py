@@ -0,0 +1,62 @@
+"""
+Benchmark: Trend Scout search fan-out width.
+
+For each width, times asearch_trending_content against a fake Tavily with
+fixed per-query latency and reports how many distinct sources came back.
+Every fake query returns some pages shared with the other queries (with
+tracking parameters and www. variations) plus some of its own.
+
+Usage (from backend/):
+    python -m benchmarks.research_fanout --latency 1.0
+"""
+
+import argparse
+import asyncio
+import time
+from unittest import mock
+
+import config
+from tools.tavily_search import QUERY_TEMPLATES, asearch_trending_content
+
+
+def _fake_results(query: str):
+    shared = [
+        {'title': 'Overview', 'url': 'https://www.example.com/overview/?utm_source=x', 'content': 'Overview', 'score': 0.9},
+        {'title': 'Analysis', 'url': 'https://example.com/analysis', 'content': 'Analysis', 'score': 0.8},
+    ]
+    own = [
+        {'title': f'{query} #{i}', 'url': f'https://example.com/{abs(hash(query))}/{i}', 'content': query, 'score': 0.5}
+        for i in range(4)
+    ]
+    return {'results': own[:2] + shared + own[2:]}
+
+
+async def _run(width: int, max_results: int):
+    start = time.perf_counter()
+    results = await asearch_trending_content("remote work", max_results=max_results, width=width)
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="fake Tavily latency in seconds")
+    parser.add_argument("--max-results", type=int, default=5)
+    args = parser.parse_args()
+
+    async def asearch(self, query, *a, **k):
+        await asyncio.sleep(args.latency)
+        return _fake_results(query)
+
+    config.TAVILY_API_KEY = config.TAVILY_API_KEY or "benchmark"
+    config.RATE_LIMIT_ENABLED = False
+
+    with mock.patch("tavily.AsyncTavilyClient.search", asearch):
+        for width in range(1, len(QUERY_TEMPLATES) + 1):
+            elapsed, results = asyncio.run(_run(width, args.max_results))
+            queries = {r['content'] for r in results if r['title'] not in ('Overview', 'Analysis')}
+            print(f"width {width}: {elapsed * 1e3:8.1f} ms, {len(results)} results, "
+                  f"{len(queries)} query-specific sources, top: {results[0]['title']}")
+
+
+if __name__ == "__main__":
+    main()
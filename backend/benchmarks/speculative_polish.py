@@ -0,0 +1,64 @@
+"""
+Benchmark: Chief Editor review + polish, serial vs speculative.
+
+Times achief_editor_agent on an approved draft against a fake Groq with
+fixed latency, with and without speculative polish, for minor feedback
+(speculation used) and heavier feedback (re-polished), and prints the
+speculation counters.
+
+Usage (from backend/):
+    python -m benchmarks.speculative_polish --latency 1.0
+"""
+
+import argparse
+import asyncio
+import time
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+
+import config
+from agents.chief_editor import achief_editor_agent, speculation_stats
+from workflow.graph import build_initial_state
+
+MINOR = "SCORE: 88\n\nFEEDBACK:\n- Cut tweet 4."
+MAJOR = "SCORE: 86\n\nFEEDBACK:\n- Hook is generic.\n- Too many emojis.\n- Tweet 6 is too long."
+
+
+async def _timed(review: str, speculative: bool, latency: float) -> float:
+    async def ainvoke(self, prompt, *a, **k):
+        await asyncio.sleep(latency)
+        if "evaluating social media content" in prompt:
+            return AIMessage(content=review)
+        return AIMessage(content="Polished post")
+
+    state = build_initial_state("remote work", settings={'speculative_polish': speculative})
+    state['draft_content'] = "1/3 Remote work is not dead.\n---\n2/3 ...\n---\n3/3 ..."
+
+    with mock.patch("langchain_groq.ChatGroq.ainvoke", ainvoke):
+        start = time.perf_counter()
+        update = await achief_editor_agent(state)
+        elapsed = time.perf_counter() - start
+    assert update['status'] == 'approved', update
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="fake Groq latency in seconds")
+    args = parser.parse_args()
+
+    config.GROQ_API_KEY = config.GROQ_API_KEY or "benchmark"
+    config.LLM_CACHE_ENABLED = False
+    config.RATE_LIMIT_ENABLED = False
+
+    for label, review in (("minor feedback", MINOR), ("major feedback", MAJOR)):
+        serial = asyncio.run(_timed(review, False, args.latency))
+        speculative = asyncio.run(_timed(review, True, args.latency))
+        print(f"{label}: serial {serial * 1e3:8.1f} ms, speculative {speculative * 1e3:8.1f} ms")
+
+    print(f"speculation stats: {speculation_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Benchmark suite: end-to-end latency, throughput and memory on fake backends.
+
+Runs against the deterministic fake Groq and Tavily (tools.fake_backends),
+so results are reproducible and cost no quota, or replays a cassette of
+recorded traffic (tools.cassettes) for production-like outputs and timing:
+
+- workflow: run_workflow in-process, one run after another
+- http_c<N>: POST /api/generate over real HTTP (uvicorn on a local port)
+  with N requests in flight, for each --concurrency level
+- sse_c<N>: POST /api/generate/stream at the highest concurrency level,
+  timing the first event, the first progress event and the first draft token
+
+Each scenario reports p50/p95/p99 latency, requests per second, upstream
+calls per run (Groq attempts include retried 429s) and the peak RSS so far,
+as JSON. With --baseline, the results are compared against a stored run and
+the exit status is 1 if any metric regressed by more than --tolerance.
+
+Usage (from backend/):
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --settings '{"editor_mode": "structured"}' --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --record traffic.jsonl.gz --topics topics.txt --scenarios workflow  # real APIs
+    python -m benchmarks.suite --replay traffic.jsonl.gz --topics topics.txt
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import platform
+import resource
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+import config
+from main import app
+from tools.cassettes import reset_cassette
+from tools.fake_backends import reset_fake_backends
+from utils.metrics import REGISTRY, TOOL_SECONDS, UPSTREAM_ERRORS
+from workflow.graph import run_workflow
+
+# Topics from --topics; empty: "benchmark topic <i>"
+TOPICS: List[str] = []
+
+# Metrics where lower is better; everything else compared (rps) is higher-better
+LOWER_IS_BETTER = ("_ms", "calls_per_run", "errors", "peak_rss_mb")
+
+# p95/p99 of a few dozen runs are noisy: they may regress by this multiple of --tolerance
+TAIL_TOLERANCE_FACTOR = 2
+
+# Absolute slack so near-zero metrics don't flag on noise (e.g. 2 ms -> 3 ms)
+ABSOLUTE_SLACK = {'ms': 5.0, 'calls_per_run': 0.5, 'errors': 0, 'peak_rss_mb': 10.0, 'rps': 0.05}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """The q-th percentile (0-100) of values, interpolating between ranks."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def upstream_counts() -> Dict[str, float]:
+    """Groq and Tavily call attempts and 429s so far, from the metrics registry."""
+    counts = {'groq': 0, 'tavily': 0, 'throttled': 0}
+    for (name, labels), value in REGISTRY.collect().items():
+        if name == TOOL_SECONDS.name and labels[0] in counts:
+            counts[labels[0]] += value[-1]
+        elif name == UPSTREAM_ERRORS.name and labels[1] == "rate_limited":
+            counts['throttled'] += value
+    return counts
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def configure_backends(args) -> None:
+    """
+    Point the app at the fake backends with this run's latency profile, at
+    a cassette to replay, or at the real APIs while recording a cassette.
+    """
+    if args.record or args.replay:
+        config.CASSETTE_MODE = "record" if args.record else "replay"
+        config.CASSETTE_PATH = args.record or args.replay
+        config.CASSETTE_LATENCY_SCALE = args.latency_scale
+        reset_cassette()
+    config.FAKE_GROQ = not args.record
+    config.FAKE_TAVILY = not args.record
+    config.FAKE_SEED = args.seed
+    config.FAKE_GROQ_LATENCY_MS = args.groq_latency_ms
+    config.FAKE_TAVILY_LATENCY_MS = args.tavily_latency_ms
+    config.FAKE_TAIL_RATE = args.tail_rate
+    config.FAKE_429_RATE = args.rate_429
+    config.FAKE_429_RETRY_AFTER = min(config.FAKE_429_RETRY_AFTER, args.groq_latency_ms / 1000)
+    
+    # Measure the workflow, not the quota: rate limits and caches are opt-in
+    config.RATE_LIMIT_ENABLED = args.rate_limit
+    config.RATE_LIMIT_PATH = ""
+    config.LLM_CACHE_ENABLED = args.cache
+    config.RESEARCH_CACHE_ENABLED = args.cache
+    config.TRACE_SAMPLE_RATE = args.trace_sample_rate
+
+
+class Scenario:
+    """Collects per-request latencies and upstream call counts for one scenario."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.marks: Dict[str, List[float]] = {}
+        self.errors = 0
+        
+        reset_fake_backends()
+        self._counts = upstream_counts()
+        self._started = time.perf_counter()
+    
+    def record(self, elapsed: float, ok: bool = True, **marks: Optional[float]) -> None:
+        if not ok:
+            self.errors += 1
+            return
+        self.latencies.append(elapsed)
+        for mark, value in marks.items():
+            if value is not None:
+                self.marks.setdefault(mark, []).append(value)
+    
+    def report(self, **extra) -> Dict:
+        wall = time.perf_counter() - self._started
+        runs = len(self.latencies) + self.errors
+        counts = upstream_counts()
+        calls = {tool: counts[tool] - self._counts[tool] for tool in counts}
+        result = {
+            'runs': runs,
+            'errors': self.errors,
+            'wall_s': round(wall, 3),
+            'rps': round(len(self.latencies) / wall, 3) if wall else 0.0,
+            **_summary("latency", self.latencies),
+            'llm_calls_per_run': round(calls['groq'] / max(runs, 1), 2),
+            'search_calls_per_run': round(calls['tavily'] / max(runs, 1), 2),
+            'throttled_calls': calls['throttled'],
+            'peak_rss_mb': peak_rss_mb(),
+            **extra
+        }
+        for mark, values in self.marks.items():
+            result.update(_summary(mark, values))
+        return result
+
+
+def _summary(prefix: str, seconds: List[float]) -> Dict:
+    return {
+        f"{prefix}_{name}_ms": round(percentile(seconds, q) * 1000, 1)
+        for name, q in (("p50", 50), ("p95", 95), ("p99", 99))
+    }
+
+
+def topic(i: int) -> str:
+    """Topic of the i-th request: from --topics (cycled) or a generated one."""
+    return TOPICS[i % len(TOPICS)] if TOPICS else f"benchmark topic {i}"
+
+
+def bench_workflow(runs: int, settings: Dict) -> Dict:
+    """run_workflow in-process, one run at a time."""
+    scenario = Scenario("workflow")
+    for i in range(runs):
+        start = time.perf_counter()
+        try:
+            state = run_workflow(topic(i), settings=settings)
+            ok = state.get('status') != 'failed'
+        except Exception:
+            ok = False
+        scenario.record(time.perf_counter() - start, ok)
+    return scenario.report()
+
+
+class LocalServer:
+    """The FastAPI app served by uvicorn from a background thread."""
+    
+    def __init__(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="benchmark-server", daemon=True)
+    
+    def __enter__(self) -> "LocalServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+async def _drive(concurrency: int, requests: int, send: Callable) -> None:
+    """Send `requests` requests with at most `concurrency` in flight."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(i)
+        
+        async def worker():
+            while not queue.empty():
+                await send(client, queue.get_nowait())
+        
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def bench_http(url: str, concurrency: int, requests: int, settings: Dict) -> Dict:
+    """POST /api/generate over HTTP with `concurrency` requests in flight."""
+    scenario = Scenario(f"http_c{concurrency}")
+    
+    async def send(client, i):
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/api/generate", json={'topic': topic(i), 'settings': settings})
+            ok = response.status_code == 200 and response.json().get('status') != 'failed'
+        except httpx.HTTPError:
+            ok = False
+        scenario.record(time.perf_counter() - start, ok)
+    
+    asyncio.run(_drive(concurrency, requests, send))
+    return scenario.report(concurrency=concurrency)
+
+
+def bench_sse(url: str, concurrency: int, requests: int, settings: Dict) -> Dict:
+    """POST /api/generate/stream, timing the first event, progress event and draft token."""
+    scenario = Scenario(f"sse_c{concurrency}")
+    
+    async def send(client, i):
+        start = time.perf_counter()
+        first = {'first_event': None, 'first_progress': None, 'first_token': None}
+        ok = False
+        try:
+            body = {'topic': topic(i), 'settings': settings}
+            async with client.stream("POST", f"{url}/api/generate/stream", json=body) as response:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    elapsed = time.perf_counter() - start
+                    event = json.loads(line[6:])
+                    kind = event.get('type')
+                    first['first_event'] = first['first_event'] or elapsed
+                    if kind == 'progress':
+                        first['first_progress'] = first['first_progress'] or elapsed
+                    elif kind == 'draft_delta':
+                        first['first_token'] = first['first_token'] or elapsed
+                    elif kind == 'complete':
+                        ok = event['data'].get('status') != 'failed'
+                    elif kind == 'error':
+                        break
+        except httpx.HTTPError:
+            pass
+        scenario.record(time.perf_counter() - start, ok, **first)
+    
+    asyncio.run(_drive(concurrency, requests, send))
+    return scenario.report(concurrency=concurrency)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare each scenario's metrics with the baseline.
+    
+    Returns:
+        One line per metric that got worse by more than `tolerance`
+        (relative; twice that for p95/p99) and its absolute slack
+    """
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for metric, value in current.items():
+            old = previous.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or metric in ('runs', 'wall_s', 'concurrency', 'throttled_calls'):
+                continue
+            slack = next((s for key, s in ABSOLUTE_SLACK.items() if metric.endswith(key)), 0.0)
+            allowed = tolerance * TAIL_TOLERANCE_FACTOR if metric.endswith(("p95_ms", "p99_ms")) else tolerance
+            if metric.endswith(LOWER_IS_BETTER):
+                worse = value > old * (1 + allowed) + slack
+            else:
+                worse = value < old * (1 - allowed) - slack
+            if worse:
+                regressions.append(f"{name}.{metric}: {old} -> {value}")
+    return regressions
+
+
+def run_suite(args) -> Dict:
+    configure_backends(args)
+    if args.topics:
+        with open(args.topics) as f:
+            TOPICS[:] = [line.strip() for line in f if line.strip()]
+    # One model on every path (the API's default differs from GROQ_MODEL),
+    # so a single cassette serves all scenarios
+    settings = {'model': config.GROQ_MODEL, **json.loads(args.settings)}
+    scenarios = {}
+    
+    if "workflow" in args.scenarios:
+        scenarios['workflow'] = bench_workflow(args.runs, settings)
+        print(f"workflow: {_line(scenarios['workflow'])}", file=sys.stderr)
+    
+    if "http" in args.scenarios or "sse" in args.scenarios:
+        with LocalServer() as server:
+            if "http" in args.scenarios:
+                for concurrency in args.concurrency:
+                    name = f"http_c{concurrency}"
+                    scenarios[name] = bench_http(server.url, concurrency, max(args.runs, concurrency), settings)
+                    print(f"{name}: {_line(scenarios[name])}", file=sys.stderr)
+            if "sse" in args.scenarios:
+                concurrency = max(args.concurrency)
+                name = f"sse_c{concurrency}"
+                scenarios[name] = bench_sse(server.url, concurrency, max(args.runs, concurrency), settings)
+                print(f"{name}: {_line(scenarios[name])}", file=sys.stderr)
+    
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': settings,
+            'seed': args.seed,
+            'groq_latency_ms': args.groq_latency_ms,
+            'tavily_latency_ms': args.tavily_latency_ms,
+            'tail_rate': args.tail_rate,
+            'rate_429': args.rate_429,
+            'rate_limit': args.rate_limit,
+            'cache': args.cache,
+            'cassette': args.replay or args.record
+        },
+        'scenarios': scenarios
+    }
+
+
+def _line(result: Dict) -> str:
+    return (
+        f"p50 {result['latency_p50_ms']:.0f} ms, p95 {result['latency_p95_ms']:.0f} ms, "
+        f"p99 {result['latency_p99_ms']:.0f} ms, {result['rps']:.2f} rps, "
+        f"{result['llm_calls_per_run']} LLM calls/run, {result['errors']} errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", nargs="+", default=["workflow", "http", "sse"], choices=["workflow", "http", "sse"])
+    parser.add_argument("--runs", type=int, default=20, help="runs per scenario (at least the concurrency)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="HTTP concurrency levels")
+    parser.add_argument("--settings", default="{}", help="JSON request settings, e.g. '{\"candidates\": 3}'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--groq-latency-ms", type=float, default=50)
+    parser.add_argument("--tavily-latency-ms", type=float, default=25)
+    parser.add_argument("--tail-rate", type=float, default=0.01)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="chance a call starts a burst of 429s")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the shared rate limiter on")
+    parser.add_argument("--cache", action="store_true", help="keep the LLM and research caches on")
+    parser.add_argument("--topics", help="file with one topic per line, cycled over the runs")
+    parser.add_argument("--record", metavar="CASSETTE", help="call the real APIs and record them to this cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="serve Groq and Tavily from this cassette")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="scale of replayed latencies (0: none)")
+    parser.add_argument("--trace-sample-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="show the app's logs (on stdout: use with --output)")
+    args = parser.parse_args()
+    
+    if not args.verbose:
+        # Failed runs are counted in the results instead
+        logging.disable(logging.CRITICAL)
+    
+    # Keep stdout for the JSON results
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run_suite(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,123 @@ GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "3"))
 VIRALITY_THRESHOLD = int(os.getenv("VIRALITY_THRESHOLD", "85"))
 
+# Generation Defaults (can be overridden per request)
+SCOUT_TEMPERATURE = float(os.getenv("SCOUT_TEMPERATURE", "0.8"))
+DRAFT_TEMPERATURE = float(os.getenv("DRAFT_TEMPERATURE", "0.9"))
+EDITOR_TEMPERATURE = float(os.getenv("EDITOR_TEMPERATURE", "0.3"))
+MAX_TOKENS = int(os.getenv("MAX_TOKENS", "2000"))
+DRAFT_MAX_TOKENS = int(os.getenv("DRAFT_MAX_TOKENS", "1500"))
+
+# LLM Client Pool
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "30"))
+LLM_POOL_MAX_CLIENTS = int(os.getenv("LLM_POOL_MAX_CLIENTS", "32"))
+LLM_POOL_PREWARM = os.getenv("LLM_POOL_PREWARM", "false").lower() == "true"
+LLM_POOL_PREWARM_CONNECTIONS = int(os.getenv("LLM_POOL_PREWARM_CONNECTIONS", "2"))
+
+# LLM Response Cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # unset: temp dir, empty: memory only
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "10000"))
+
+# Trend Scout Research
+RESEARCH_FANOUT = int(os.getenv("RESEARCH_FANOUT", "1"))  # parallel Tavily queries per topic; more: better research, more quota
+
+# Best-of-N Drafting
+CANDIDATES = int(os.getenv("CANDIDATES", "1"))  # drafts written and scored per iteration
+
+# Speculative Polish (Chief Editor polishes while it reviews)
+SPECULATIVE_POLISH = os.getenv("SPECULATIVE_POLISH", "false").lower() == "true"
+SPECULATIVE_POLISH_THREADS = int(os.getenv("SPECULATIVE_POLISH_THREADS", "0"))  # sync runs' polish threads; 0: min(32, CPUs + 4)
+
+# Chief Editor Mode: "classic" (review, then polish) or "structured" (one JSON call)
+EDITOR_MODE = os.getenv("EDITOR_MODE", "classic")
+
+# Convergence (stop revising once scores plateau or drafts stop changing)
+CONVERGENCE_WINDOW = int(os.getenv("CONVERGENCE_WINDOW", "0"))  # reviews; 0: convergence off
+CONVERGENCE_MIN_IMPROVEMENT = int(os.getenv("CONVERGENCE_MIN_IMPROVEMENT", "2"))  # points over the window
+CONVERGENCE_SIMILARITY = float(os.getenv("CONVERGENCE_SIMILARITY", "0.95"))  # consecutive draft similarity
+
+# Deadlines (requests with deadline_ms): time a step needs before it is started
+DEADLINE_REVISION_RESERVE_MS = int(os.getenv("DEADLINE_REVISION_RESERVE_MS", "15000"))  # draft + review
+DEADLINE_POLISH_RESERVE_MS = int(os.getenv("DEADLINE_POLISH_RESERVE_MS", "5000"))
+
+# Admission Control (per worker process): workflow slots and the wait queue behind them
+WORKFLOW_SLOTS = int(os.getenv("WORKFLOW_SLOTS", "16"))  # concurrent runs; 0: unlimited
+WORKFLOW_QUEUE_SIZE = int(os.getenv("WORKFLOW_QUEUE_SIZE", "32"))  # requests waiting; more get a 429
+WORKFLOW_QUEUE_TIMEOUT = float(os.getenv("WORKFLOW_QUEUE_TIMEOUT", "30"))  # seconds a request may wait; then a 429
+
+# Async Jobs (POST /api/jobs): durable queue in SQLite, drained by leased workers
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH")  # SQLite file shared by every worker on the host; unset: temp dir
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # workers started with the API; 0: run them with python -m api.jobs
+JOB_EXTERNAL_WORKERS = os.getenv("JOB_EXTERNAL_WORKERS", "false").lower() == "true"  # python -m api.jobs processes share the store
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # a job whose worker stops renewing is retried after this
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # claims before an abandoned job is failed
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds between claims when the queue is empty
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "604800"))  # seconds finished jobs are kept
+JOB_WEBHOOK_SECRET = os.getenv("JOB_WEBHOOK_SECRET", "")  # signs webhook bodies (X-Webhook-Signature) when set
+JOB_WEBHOOK_ALLOWED_HOSTS = os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "")  # comma-separated; unset: any host with public addresses
+JOB_WEBHOOK_TIMEOUT = float(os.getenv("JOB_WEBHOOK_TIMEOUT", "10"))  # seconds per attempt
+JOB_WEBHOOK_RETRIES = int(os.getenv("JOB_WEBHOOK_RETRIES", "3"))
+
+# Checkpoints (requests with a run_id resume from their last finished node)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")  # "sqlite", "memory" or empty (off)
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH")  # SQLite file shared by every worker on the host; unset: temp dir
+CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", "2"))  # newest checkpoints kept per run
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", "86400"))  # seconds an idle run's checkpoints are kept
+
+# Rate Limits (token buckets shared by all workers on the host) and Retries
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH")  # unset: temp dir, empty: this process only
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))  # requests per minute, per model and key
+GROQ_TPM = int(os.getenv("GROQ_TPM", "30000"))  # tokens per minute, per model and key
+GROQ_MODEL_LIMITS = os.getenv("GROQ_MODEL_LIMITS", "")  # JSON: {"model": {"rpm": 60, "tpm": 60000}}
+TAVILY_RPM = int(os.getenv("TAVILY_RPM", "100"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))  # on 429s and transient errors
+RATE_LIMIT_BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "0.5"))  # seconds
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv("RATE_LIMIT_BACKOFF_MAX", "30"))
+
+# Trend Scout Research Cache
+RESEARCH_CACHE_ENABLED = os.getenv("RESEARCH_CACHE_ENABLED", "true").lower() == "true"
+RESEARCH_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH")  # unset: temp dir, empty: memory only
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", "3600"))
+RESEARCH_CACHE_MAX_STALE = float(os.getenv("RESEARCH_CACHE_MAX_STALE", "86400"))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "1000"))
+
+# Tracing (spans per request, node and upstream call)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))  # share of requests traced; 0: tracing off
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "jsonl")  # "jsonl" (local file) or "otlp" (OTLP/HTTP JSON)
+TRACE_PATH = os.getenv("TRACE_PATH")  # jsonl file; unset: temp dir
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "viral-content-agent")
+
+# Fake Backends (deterministic offline Groq/Tavily for load and latency benchmarks)
+FAKE_GROQ = os.getenv("FAKE_GROQ", "false").lower() == "true"
+FAKE_TAVILY = os.getenv("FAKE_TAVILY", "false").lower() == "true"
+FAKE_SEED = int(os.getenv("FAKE_SEED", "0"))
+FAKE_GROQ_LATENCY_MS = float(os.getenv("FAKE_GROQ_LATENCY_MS", "800"))  # median per call
+FAKE_TAVILY_LATENCY_MS = float(os.getenv("FAKE_TAVILY_LATENCY_MS", "400"))
+FAKE_LATENCY_SIGMA = float(os.getenv("FAKE_LATENCY_SIGMA", "0.35"))  # log-normal spread around the median
+FAKE_TAIL_RATE = float(os.getenv("FAKE_TAIL_RATE", "0.01"))  # share of calls that are tail outliers
+FAKE_TAIL_FACTOR = float(os.getenv("FAKE_TAIL_FACTOR", "8"))  # latency multiplier of an outlier
+FAKE_429_RATE = float(os.getenv("FAKE_429_RATE", "0"))  # chance a call starts a burst of 429s
+FAKE_429_BURST = int(os.getenv("FAKE_429_BURST", "3"))  # consecutive calls rejected per burst
+FAKE_429_RETRY_AFTER = float(os.getenv("FAKE_429_RETRY_AFTER", "1"))  # seconds, sent by the fake Groq
+
+# Cassettes (record real Groq/Tavily traffic, replay it offline)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "")  # "record", "replay" or empty (off)
+CASSETTE_PATH = os.getenv("CASSETTE_PATH")  # JSON lines, gzipped if it ends in .gz; unset: temp dir
+CASSETTE_REPLAY_LATENCY = os.getenv("CASSETTE_REPLAY_LATENCY", "true").lower() == "true"  # wait out recorded latencies
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0"))
+
 # Validation
 def validate_config():
     """Validate that required configuration is present."""
-    if not GROQ_API_KEY:
+    if not GROQ_API_KEY and not FAKE_GROQ and CASSETTE_MODE != "replay":
         raise ValueError("GROQ_API_KEY not found in environment variables")
-    if not TAVILY_API_KEY:
+    if not TAVILY_API_KEY and not FAKE_TAVILY and CASSETTE_MODE != "replay":
         raise ValueError("TAVILY_API_KEY not found in environment variables")
     return True
@@ -2,7 +2,11 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from agents.chief_editor import shutdown_speculation_executor
+from api.jobs import get_job_worker_pool
 from api.routes import router
+from tools.llm_pool import get_llm_pool
+from utils.tracing import TraceMiddleware
 import config
 
 # Initialize FastAPI app
@@ -25,6 +29,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Trace each request (TRACE_SAMPLE_RATE); the trace ID is returned as X-Trace-Id
+app.add_middleware(TraceMiddleware)
+
 # Include API routes
 app.include_router(router, prefix="/api")
 
@@ -49,6 +56,36 @@ async def startup_event():
         print(f"❌ Configuration error: {e}")
         # Don't raise in serverless - log instead
         # raise
+    
+    if config.LLM_POOL_PREWARM:
+        await prewarm_llm_pool()
+    
+    if config.JOB_WORKERS > 0:
+        get_job_worker_pool().start()
+
+
+async def prewarm_llm_pool():
+    """Build LLM clients for the default settings and open keep-alive connections."""
+    try:
+        await get_llm_pool().aprewarm(
+            [
+                (config.GROQ_MODEL, config.SCOUT_TEMPERATURE, config.MAX_TOKENS),
+                (config.GROQ_MODEL, config.DRAFT_TEMPERATURE, config.DRAFT_MAX_TOKENS),
+                (config.GROQ_MODEL, config.EDITOR_TEMPERATURE, config.MAX_TOKENS),
+            ],
+            connections=config.LLM_POOL_PREWARM_CONNECTIONS
+        )
+    except Exception as e:
+        print(f"⚠️ LLM pool pre-warm failed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the job workers, the speculative polish threads and pooled HTTP connections."""
+    if config.JOB_WORKERS > 0:
+        await get_job_worker_pool().stop()
+    shutdown_speculation_executor()
+    await get_llm_pool().aclose()
 
 
 if __name__ == "__main__":
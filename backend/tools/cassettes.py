@@ -0,0 +1,439 @@
+"""
+Record/replay cassettes of Groq and Tavily traffic.
+
+With CASSETTE_MODE=record, every Groq and Tavily call made through groq_llm
+and tavily_search is appended to a cassette file: the prompt or query, the
+response, token counts and the observed latency (and for streams, the time
+to the first chunk). Failed attempts are recorded too, so a 429 that was
+retried in production is retried again on replay.
+
+With CASSETTE_MODE=replay, the same calls are served from the cassette
+without any network access: each (model, prompt) or query gets its recorded
+responses in the order they were recorded, optionally after waiting out the
+recorded latency (CASSETTE_REPLAY_LATENCY, scaled by CASSETTE_LATENCY_SCALE).
+A workflow run replays exactly as recorded, since every later prompt is
+built from the earlier replayed responses.
+"""
+
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import groq
+import httpx
+from langchain_core.messages import AIMessage, AIMessageChunk
+from tavily.errors import UsageLimitExceededError
+
+import config
+from tools.fake_backends import FIRST_CHUNK_SHARE, GROQ_URL, stream_chunks
+from tools.rate_limiter import error_kind, estimate_tokens, retry_after
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class CassetteMiss(LookupError):
+    """A replayed call that was never recorded."""
+
+
+def groq_key(model: str, prompt: str, json_mode: bool = False) -> str:
+    """Cassette key of a Groq call."""
+    text = f"{model}\x00{int(json_mode)}\x00{prompt}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def tavily_key(query: str, max_results: int) -> str:
+    """Cassette key of a Tavily search."""
+    return hashlib.sha256(f"{query}\x00{max_results}".encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    One cassette file: JSON lines, gzip-compressed when the path ends in .gz.
+    
+    In record mode entries are appended (and flushed) as calls finish, so a
+    cassette survives a crash or a serverless freeze. In replay mode the file
+    is loaded once and each key's entries are handed out in recorded order;
+    once they run out, its successful entries are served again in a cycle.
+    """
+    
+    def __init__(self, path: str, mode: str):
+        self.path = path
+        self.mode = mode
+        
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        
+        self._entries: Dict[str, List[Dict]] = {}
+        self._served: Dict[str, int] = {}
+        self._writer = None
+        self._lock = threading.Lock()
+        
+        if mode == "replay":
+            self._load()
+    
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+    
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.warning(f"⚠️ Cassette {self.path} not found, every call will miss")
+            return
+        with self._open("r") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry['key'], []).append(entry)
+            except (EOFError, json.JSONDecodeError):
+                # Recording process killed before closing the file: every
+                # flushed entry is complete, only the tail is lost
+                logger.warning(f"⚠️ Cassette {self.path} is truncated, replaying the calls before the cut")
+        logger.info(f"📼 Loaded {sum(len(e) for e in self._entries.values())} calls from cassette {self.path}")
+    
+    def record(self, entry: Dict) -> None:
+        """Append one call to the cassette."""
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                if self._writer is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._writer = self._open("a")
+                self._writer.write(line)
+                self._writer.flush()
+                self.recorded += 1
+            except OSError as e:
+                logger.warning(f"⚠️ Writing to cassette {self.path} failed: {str(e)}")
+    
+    def next(self, key: str, what: str) -> Dict:
+        """
+        The next recorded entry for a key.
+        
+        Raises:
+            CassetteMiss: If the call was never recorded
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"{what} is not in cassette {self.path}")
+            
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            self.replayed += 1
+            if served < len(entries):
+                return entries[served]
+            successes = [entry for entry in entries if not entry.get('error')] or entries
+            return successes[(served - len(entries)) % len(successes)]
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'recorded': self.recorded,
+                'replayed': self.replayed,
+                'misses': self.misses
+            }
+
+
+def default_cassette_path() -> str:
+    """Writable default location, including on serverless hosts (/tmp)."""
+    return os.path.join(tempfile.gettempdir(), "viral_content_agent", "cassette.jsonl.gz")
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Return the process-wide cassette, configured from config."""
+    global _cassette
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(config.CASSETTE_PATH or default_cassette_path(), config.CASSETTE_MODE)
+                # Finish the gzip stream when the process exits
+                atexit.register(_cassette.close)
+    return _cassette
+
+
+def reset_cassette() -> None:
+    """Close the cassette so the next call opens it afresh (e.g. after switching modes)."""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is not None:
+            _cassette.close()
+        _cassette = None
+
+
+def cassette_stats() -> Dict:
+    """Return recorded/replayed/miss counters of the cassette in use."""
+    return _cassette.stats() if _cassette is not None else {}
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _error_fields(error: BaseException) -> Dict:
+    return {'error': error_kind(error), 'retry_after': retry_after(error), 'message': str(error)[:200]}
+
+
+def _replay_delay(entry: Dict, field: str = 'latency_ms') -> float:
+    if not config.CASSETTE_REPLAY_LATENCY:
+        return 0.0
+    return entry.get(field, 0.0) / 1000 * config.CASSETTE_LATENCY_SCALE
+
+
+def _replay_error(entry: Dict, tool: str) -> BaseException:
+    """Rebuild a recorded failure as the error the provider raised."""
+    request = httpx.Request("POST", GROQ_URL)
+    kind = entry['error']
+    if kind == "rate_limited":
+        if tool == "tavily":
+            return UsageLimitExceededError(entry.get('message', "Too many requests"))
+        headers = {'retry-after': str(entry['retry_after'])} if entry.get('retry_after') is not None else {}
+        response = httpx.Response(429, headers=headers, request=request)
+        return groq.RateLimitError(entry.get('message', "Rate limited"), response=response, body=None)
+    if kind == "timeout":
+        return groq.APITimeoutError(request=request) if tool == "groq" else TimeoutError(entry.get('message', ""))
+    if kind == "transient":
+        response = httpx.Response(503, request=request)
+        return groq.InternalServerError(entry.get('message', "Service unavailable"), response=response, body=None)
+    return RuntimeError(entry.get('message', "Recorded call failed"))
+
+
+class RecordingChatGroq:
+    """Wraps a chat model and records every call it makes to the cassette."""
+    
+    def __init__(self, llm, model: str, json_mode: bool = False):
+        self.llm = llm
+        self.model = model
+        self.json_mode = json_mode
+    
+    def bind(self, response_format: Optional[Dict] = None, **kwargs) -> "RecordingChatGroq":
+        json_mode = (response_format or {}).get('type') == "json_object"
+        return RecordingChatGroq(self.llm.bind(response_format=response_format, **kwargs), self.model, json_mode)
+    
+    def _record(self, prompt: str, started: float, response=None, error: BaseException = None, first_chunk: float = None) -> None:
+        entry = {
+            'tool': "groq",
+            'key': groq_key(self.model, prompt, self.json_mode),
+            'model': self.model,
+            'json_mode': self.json_mode,
+            'prompt': prompt,
+            'latency_ms': _ms(time.perf_counter() - started),
+            'recorded_at': time.time()
+        }
+        if first_chunk is not None:
+            entry['first_chunk_ms'] = _ms(first_chunk - started)
+        if error is not None:
+            entry.update(_error_fields(error))
+        else:
+            content = response if isinstance(response, str) else response.content
+            usage = getattr(response, 'usage_metadata', None)
+            entry['response'] = content
+            entry['prompt_tokens'] = usage['input_tokens'] if usage else estimate_tokens(prompt)
+            entry['completion_tokens'] = usage['output_tokens'] if usage else estimate_tokens(content)
+        get_cassette().record(entry)
+    
+    def invoke(self, prompt: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.llm.invoke(prompt, **kwargs)
+        except Exception as e:
+            self._record(prompt, started, error=e)
+            raise
+        self._record(prompt, started, response)
+        return response
+    
+    async def ainvoke(self, prompt: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.llm.ainvoke(prompt, **kwargs)
+        except Exception as e:
+            self._record(prompt, started, error=e)
+            raise
+        self._record(prompt, started, response)
+        return response
+    
+    def stream(self, prompt: str, **kwargs) -> Iterator:
+        started = time.perf_counter()
+        first_chunk = None
+        parts = []
+        try:
+            for chunk in self.llm.stream(prompt, **kwargs):
+                first_chunk = first_chunk or time.perf_counter()
+                parts.append(chunk.content)
+                yield chunk
+        except Exception as e:
+            self._record(prompt, started, error=e)
+            raise
+        self._record(prompt, started, "".join(parts), first_chunk=first_chunk)
+    
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator:
+        started = time.perf_counter()
+        first_chunk = None
+        parts = []
+        try:
+            async for chunk in self.llm.astream(prompt, **kwargs):
+                first_chunk = first_chunk or time.perf_counter()
+                parts.append(chunk.content)
+                yield chunk
+        except Exception as e:
+            self._record(prompt, started, error=e)
+            raise
+        self._record(prompt, started, "".join(parts), first_chunk=first_chunk)
+
+
+class ReplayChatGroq:
+    """Serves Groq calls from the cassette, in the shape ChatGroq returns them."""
+    
+    def __init__(self, model: str, json_mode: bool = False):
+        self.model = model
+        self.json_mode = json_mode
+    
+    def bind(self, response_format: Optional[Dict] = None, **kwargs) -> "ReplayChatGroq":
+        return ReplayChatGroq(self.model, (response_format or {}).get('type') == "json_object")
+    
+    def _entry(self, prompt: str) -> Dict:
+        return get_cassette().next(groq_key(self.model, prompt, self.json_mode), f"Groq {self.model} call")
+    
+    def _message(self, entry: Dict) -> AIMessage:
+        if entry.get('error'):
+            raise _replay_error(entry, "groq")
+        return AIMessage(content=entry['response'], usage_metadata={
+            'input_tokens': entry['prompt_tokens'],
+            'output_tokens': entry['completion_tokens'],
+            'total_tokens': entry['prompt_tokens'] + entry['completion_tokens']
+        })
+    
+    def invoke(self, prompt: str, **kwargs) -> AIMessage:
+        entry = self._entry(prompt)
+        time.sleep(_replay_delay(entry))
+        return self._message(entry)
+    
+    async def ainvoke(self, prompt: str, **kwargs) -> AIMessage:
+        entry = self._entry(prompt)
+        await asyncio.sleep(_replay_delay(entry))
+        return self._message(entry)
+    
+    def _stream_plan(self, entry: Dict):
+        """(seconds to the first chunk, seconds between later chunks, chunks)."""
+        if entry.get('error'):
+            raise _replay_error(entry, "groq")
+        total = _replay_delay(entry)
+        first = _replay_delay(entry, 'first_chunk_ms') if 'first_chunk_ms' in entry else total * FIRST_CHUNK_SHARE
+        chunks = stream_chunks(entry['response'])
+        return first, max(0.0, total - first) / len(chunks), chunks
+    
+    def stream(self, prompt: str, **kwargs) -> Iterator[AIMessageChunk]:
+        entry = self._entry(prompt)
+        if entry.get('error'):
+            time.sleep(_replay_delay(entry))
+        first, gap, chunks = self._stream_plan(entry)
+        time.sleep(first)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(gap)
+            yield AIMessageChunk(content=chunk)
+    
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        entry = self._entry(prompt)
+        if entry.get('error'):
+            await asyncio.sleep(_replay_delay(entry))
+        first, gap, chunks = self._stream_plan(entry)
+        await asyncio.sleep(first)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            yield AIMessageChunk(content=chunk)
+
+
+def _record_search(query: str, max_results: int, started: float, response: Dict = None, error: BaseException = None) -> None:
+    entry = {
+        'tool': "tavily",
+        'key': tavily_key(query, max_results),
+        'query': query,
+        'max_results': max_results,
+        'latency_ms': _ms(time.perf_counter() - started),
+        'recorded_at': time.time()
+    }
+    if error is not None:
+        entry.update(_error_fields(error))
+    else:
+        entry['response'] = response
+    get_cassette().record(entry)
+
+
+def _replayed_search(entry: Dict) -> Dict:
+    if entry.get('error'):
+        raise _replay_error(entry, "tavily")
+    return entry['response']
+
+
+class RecordingTavilyClient:
+    """Wraps a Tavily client and records every search to the cassette."""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict:
+        started = time.perf_counter()
+        try:
+            response = self.client.search(query=query, max_results=max_results, **kwargs)
+        except Exception as e:
+            _record_search(query, max_results, started, error=e)
+            raise
+        _record_search(query, max_results, started, response)
+        return response
+
+
+class RecordingAsyncTavilyClient:
+    """Async version of RecordingTavilyClient."""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    async def search(self, query: str, max_results: int = 5, **kwargs) -> Dict:
+        started = time.perf_counter()
+        try:
+            response = await self.client.search(query=query, max_results=max_results, **kwargs)
+        except Exception as e:
+            _record_search(query, max_results, started, error=e)
+            raise
+        _record_search(query, max_results, started, response)
+        return response
+
+
+class ReplayTavilyClient:
+    """Serves Tavily searches from the cassette."""
+    
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict:
+        entry = get_cassette().next(tavily_key(query, max_results), f"Tavily search '{query}'")
+        time.sleep(_replay_delay(entry))
+        return _replayed_search(entry)
+
+
+class ReplayAsyncTavilyClient:
+    """Async version of ReplayTavilyClient."""
+    
+    async def search(self, query: str, max_results: int = 5, **kwargs) -> Dict:
+        entry = get_cassette().next(tavily_key(query, max_results), f"Tavily search '{query}'")
+        await asyncio.sleep(_replay_delay(entry))
+        return _replayed_search(entry)
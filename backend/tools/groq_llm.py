@@ -1,17 +1,199 @@
 """Groq LLM integration for content generation using LangChain."""
 
+import asyncio
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
 from langchain_groq import ChatGroq
+from pydantic import BaseModel, ValidationError
 import config
+from tools.cassettes import RecordingChatGroq, ReplayChatGroq
+from tools.fake_backends import FakeChatGroq
+from tools.llm_cache import cache_key, get_llm_cache
+from tools.llm_pool import get_llm_pool
+from tools.rate_limiter import (
+    Limit,
+    acall_with_limits,
+    astream_with_limits,
+    call_with_limits,
+    estimate_tokens,
+    get_rate_limiter,
+    groq_limits,
+    stream_with_limits
+)
 from utils.logger import setup_logger
+from utils.metrics import LLM_TOKENS
+from utils.timings import begin_call, record_llm_cache_hit
+from utils.tracing import traced
 
 logger = setup_logger(__name__)
 
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
 
+# Groq JSON mode: the model must answer with a single JSON object
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Extra attempts when a JSON reply doesn't match the schema
+JSON_RETRIES = 1
+
+
+def _get_llm(model: str, temperature: float, max_tokens: int) -> ChatGroq:
+    """
+    Get a pooled ChatGroq client for these settings.
+    
+    FAKE_GROQ swaps in the offline fake; CASSETTE_MODE records the client's
+    calls to a cassette or serves them from one instead.
+    """
+    if config.CASSETTE_MODE == "replay":
+        return ReplayChatGroq(model)
+    if config.FAKE_GROQ:
+        llm = FakeChatGroq(model, temperature, max_tokens)
+    else:
+        llm = get_llm_pool().get(model, temperature, max_tokens)
+    if config.CASSETTE_MODE == "record":
+        return RecordingChatGroq(llm, model)
+    return llm
+
+
+def pool_stats() -> Dict:
+    """Return LLM client pool hit/miss counters."""
+    return get_llm_pool().stats()
+
+
+def cache_stats() -> Dict:
+    """Return LLM response cache hit/miss counters."""
+    return get_llm_cache().stats()
+
+
+def _call_options(timeout: Optional[float]) -> Dict:
+    """Per-call Groq request options; the timeout is passed through to the API client."""
+    return {} if timeout is None else {'timeout': timeout}
+
+
+async def _within(chunks: AsyncIterator, timeout: Optional[float]) -> AsyncIterator:
+    """
+    Re-yield an async stream, raising TimeoutError once `timeout` seconds have
+    passed in total. Only the wait for the next chunk is timed, so a slow
+    consumer of this stream is never cancelled.
+    """
+    if timeout is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+    
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + timeout
+    iterator = chunks.__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(anext(iterator), max(0.0, expires - loop.time()))
+        except StopAsyncIteration:
+            return
+        yield chunk
+
+
+def _token_usage(prompt: str, response) -> Tuple[int, int]:
+    """
+    Prompt and completion tokens of a call, from the response's usage
+    metadata or, for streams and cached text, estimated from the text.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage:
+        return usage['input_tokens'], usage['output_tokens']
+    content = response if isinstance(response, str) else response.content
+    return estimate_tokens(prompt), estimate_tokens(content)
+
+
+def _count_usage(limits: List[Limit], model: str, prompt: str, response, timing: Dict) -> Optional[Tuple[Limit, float]]:
+    """
+    Count a call's tokens (metrics and the request's timings).
+    
+    Returns:
+        (TPM limit, unused tokens) to refund, or None without a TPM bucket
+    """
+    prompt_tokens, completion_tokens = _token_usage(prompt, response)
+    LLM_TOKENS.inc(model, "prompt", amount=prompt_tokens)
+    LLM_TOKENS.inc(model, "completion", amount=completion_tokens)
+    timing['prompt_tokens'] = prompt_tokens
+    timing['completion_tokens'] = completion_tokens
+    
+    if len(limits) < 2:
+        return None
+    tpm = limits[1]
+    return tpm, tpm[1] - prompt_tokens - completion_tokens
+
+
+def _record_usage(limits: List[Limit], model: str, prompt: str, response, timing: Dict) -> None:
+    """Count a call's tokens and return the unused part of its TPM reservation."""
+    refund = _count_usage(limits, model, prompt, response, timing)
+    if refund is not None:
+        get_rate_limiter().refund(*refund)
+
+
+async def _arecord_usage(limits: List[Limit], model: str, prompt: str, response, timing: Dict) -> None:
+    """Async version of _record_usage."""
+    refund = _count_usage(limits, model, prompt, response, timing)
+    if refund is not None:
+        await get_rate_limiter().arefund(*refund)
+
+
+def rate_limit_stats() -> Dict:
+    """Return rate limiter counters (calls let through, queued, blocked)."""
+    return get_rate_limiter().stats()
+
+
+def _cache_lookup(
+    prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    cache: bool
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Look a call up in the response cache.
+    
+    Returns:
+        Tuple of (cache key, cached response). The key is None when caching
+        is off for this call; the response is None on a miss.
+    """
+    if not (cache and config.LLM_CACHE_ENABLED):
+        return None, None
+    
+    key = cache_key(model, prompt, temperature, max_tokens)
+    cached = get_llm_cache().get(key)
+    _note_cache_hit(model, cached)
+    return key, cached
+
+
+async def _acache_lookup(
+    prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    cache: bool
+) -> Tuple[Optional[str], Optional[str]]:
+    """Async version of _cache_lookup; the disk tier is read off the event loop."""
+    if not (cache and config.LLM_CACHE_ENABLED):
+        return None, None
+    
+    key = cache_key(model, prompt, temperature, max_tokens)
+    cached = await get_llm_cache().aget(key)
+    _note_cache_hit(model, cached)
+    return key, cached
+
+
+def _note_cache_hit(model: str, cached: Optional[str]) -> None:
+    if cached is not None:
+        logger.info(f"Cache hit for {model} ({len(cached)} characters)")
+        record_llm_cache_hit(model)
+
+
+@traced("generate_content")
 def generate_content(
     prompt: str,
     model: str = None,
     temperature: float = 0.7,
-    max_tokens: int = 2000
+    max_tokens: int = 2000,
+    cache: bool = True,
+    timeout: Optional[float] = None
 ) -> str:
     """
     Generate content using Groq's LLM via LangChain.
@@ -21,7 +203,11 @@ def generate_content(
         model: Model name (defaults to config.GROQ_MODEL)
         temperature: Creativity level (0.0-2.0)
         max_tokens: Maximum tokens in response
-        
+        cache: Serve identical calls from the response cache. Pass False
+            for creative calls that should produce a fresh answer each time.
+        timeout: Seconds the call may take (e.g. what is left of a request's
+            deadline); None uses the client default
+    
     Returns:
         Generated text from the LLM
     """
@@ -29,25 +215,293 @@ def generate_content(
         if model is None:
             model = config.GROQ_MODEL
         
+        key, cached = _cache_lookup(prompt, model, temperature, max_tokens, cache)
+        if cached is not None:
+            return cached
+        
         logger.info(f"Generating content with model: {model}")
         
-        # Initialize ChatGroq from langchain-groq
-        llm = ChatGroq(
-            api_key=config.GROQ_API_KEY,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
+        llm = _get_llm(model, temperature, max_tokens)
+        limits = groq_limits(model, prompt, max_tokens)
+        timing = begin_call("groq", model)
         
-        # Invoke the LLM
-        response = llm.invoke(prompt)
+        # Invoke the LLM (queued behind the rate limits, retried on 429s)
+        response = call_with_limits(
+            lambda left: llm.invoke(prompt, **_call_options(left)),
+            limits, timeout, what=f"Groq {model}", tool="groq", model=model, timing=timing
+        )
+        _record_usage(limits, model, prompt, response, timing)
         
         # Extract content from response
         content = response.content
         logger.info(f"Generated {len(content)} characters")
         
+        if key is not None:
+            get_llm_cache().set(key, content)
+        
         return content
+    
+    except Exception as e:
+        logger.error(f"Error generating content with Groq: {str(e)}")
+        raise
+
+
+@traced("agenerate_content")
+async def agenerate_content(
+    prompt: str,
+    model: str = None,
+    temperature: float = 0.7,
+    max_tokens: int = 2000,
+    cache: bool = True,
+    timeout: Optional[float] = None
+) -> str:
+    """
+    Async version of generate_content.
+    
+    Uses ChatGroq's native ainvoke so the event loop stays free while
+    waiting on Groq. Arguments and return value match generate_content.
+    """
+    try:
+        if model is None:
+            model = config.GROQ_MODEL
         
+        key, cached = await _acache_lookup(prompt, model, temperature, max_tokens, cache)
+        if cached is not None:
+            return cached
+        
+        logger.info(f"Generating content (async) with model: {model}")
+        
+        llm = _get_llm(model, temperature, max_tokens)
+        limits = groq_limits(model, prompt, max_tokens)
+        timing = begin_call("groq", model)
+        
+        # Invoke the LLM without blocking the event loop; wait_for enforces
+        # what is left of the timeout on each attempt
+        response = await acall_with_limits(
+            lambda left: asyncio.wait_for(llm.ainvoke(prompt, **_call_options(left)), left),
+            limits, timeout, what=f"Groq {model}", tool="groq", model=model, timing=timing
+        )
+        await _arecord_usage(limits, model, prompt, response, timing)
+        
+        content = response.content
+        logger.info(f"Generated {len(content)} characters")
+        
+        if key is not None:
+            await get_llm_cache().aset(key, content)
+        
+        return content
+    
     except Exception as e:
         logger.error(f"Error generating content with Groq: {str(e)}")
         raise
+
+
+def stream_content(
+    prompt: str,
+    model: str = None,
+    temperature: float = 0.7,
+    max_tokens: int = 2000,
+    cache: bool = True,
+    timeout: Optional[float] = None
+) -> Iterator[str]:
+    """
+    Stream content from Groq's LLM as it is generated.
+    
+    Arguments match generate_content. Yields text chunks; joining them
+    gives the same text generate_content would return. A cache hit is
+    yielded as a single chunk.
+    """
+    try:
+        if model is None:
+            model = config.GROQ_MODEL
+        
+        key, cached = _cache_lookup(prompt, model, temperature, max_tokens, cache)
+        if cached is not None:
+            yield cached
+            return
+        
+        logger.info(f"Streaming content with model: {model}")
+        
+        llm = _get_llm(model, temperature, max_tokens)
+        
+        limits = groq_limits(model, prompt, max_tokens)
+        timing = begin_call("groq", model)
+        
+        parts = []
+        for chunk in stream_with_limits(
+            lambda left: llm.stream(prompt, **_call_options(left)),
+            limits, timeout, what=f"Groq {model} stream", tool="groq", model=model, timing=timing
+        ):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        
+        content = "".join(parts)
+        logger.info(f"Streamed {len(content)} characters")
+        _record_usage(limits, model, prompt, content, timing)
+        
+        if key is not None:
+            get_llm_cache().set(key, content)
+    
+    except Exception as e:
+        logger.error(f"Error streaming content with Groq: {str(e)}")
+        raise
+
+
+async def astream_content(
+    prompt: str,
+    model: str = None,
+    temperature: float = 0.7,
+    max_tokens: int = 2000,
+    cache: bool = True,
+    timeout: Optional[float] = None
+) -> AsyncIterator[str]:
+    """Async version of stream_content using ChatGroq's astream."""
+    try:
+        if model is None:
+            model = config.GROQ_MODEL
+        
+        key, cached = await _acache_lookup(prompt, model, temperature, max_tokens, cache)
+        if cached is not None:
+            yield cached
+            return
+        
+        logger.info(f"Streaming content (async) with model: {model}")
+        
+        llm = _get_llm(model, temperature, max_tokens)
+        
+        limits = groq_limits(model, prompt, max_tokens)
+        timing = begin_call("groq", model)
+        
+        parts = []
+        async for chunk in astream_with_limits(
+            lambda left: _within(llm.astream(prompt, **_call_options(left)), left),
+            limits, timeout, what=f"Groq {model} stream", tool="groq", model=model, timing=timing
+        ):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        
+        content = "".join(parts)
+        logger.info(f"Streamed {len(content)} characters")
+        await _arecord_usage(limits, model, prompt, content, timing)
+        
+        if key is not None:
+            await get_llm_cache().aset(key, content)
+    
+    except Exception as e:
+        logger.error(f"Error streaming content with Groq: {str(e)}")
+        raise
+
+
+@traced("generate_json")
+def generate_json(
+    prompt: str,
+    schema: Type[SchemaT],
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    cache: bool = True,
+    timeout: Optional[float] = None
+) -> SchemaT:
+    """
+    Generate a schema-validated JSON object using Groq's JSON mode.
+    
+    The prompt must ask for JSON matching the schema. A reply that fails
+    validation is retried (uncached) up to JSON_RETRIES times; only
+    validated replies are cached.
+    
+    Args:
+        prompt: The prompt to send to the LLM
+        schema: Pydantic model the reply is validated against
+        model, temperature, max_tokens, cache, timeout: As for generate_content
+    
+    Returns:
+        The validated schema instance
+    
+    Raises:
+        ValidationError: If every attempt returned invalid JSON
+    """
+    if model is None:
+        model = config.GROQ_MODEL
+    
+    key, cached = _cache_lookup(prompt, model, temperature, max_tokens, cache)
+    if cached is not None:
+        return schema.model_validate_json(cached)
+    
+    logger.info(f"Generating JSON with model: {model}")
+    
+    llm = _get_llm(model, temperature, max_tokens).bind(response_format=JSON_RESPONSE_FORMAT)
+    
+    for attempt in range(JSON_RETRIES + 1):
+        try:
+            limits = groq_limits(model, prompt, max_tokens)
+            timing = begin_call("groq", model)
+            response = call_with_limits(
+                lambda left: llm.invoke(prompt, **_call_options(left)),
+                limits, timeout, what=f"Groq {model}", tool="groq", model=model, timing=timing
+            )
+            _record_usage(limits, model, prompt, response, timing)
+            content = response.content
+            result = schema.model_validate_json(content)
+            break
+        except ValidationError as e:
+            logger.warning(f"Invalid {schema.__name__} JSON (attempt {attempt + 1}): {str(e)[:200]}")
+            if attempt == JSON_RETRIES:
+                raise
+        except Exception as e:
+            logger.error(f"Error generating JSON with Groq: {str(e)}")
+            raise
+    
+    if key is not None:
+        get_llm_cache().set(key, content)
+    
+    return result
+
+
+@traced("agenerate_json")
+async def agenerate_json(
+    prompt: str,
+    schema: Type[SchemaT],
+    model: str = None,
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    cache: bool = True,
+    timeout: Optional[float] = None
+) -> SchemaT:
+    """Async version of generate_json."""
+    if model is None:
+        model = config.GROQ_MODEL
+    
+    key, cached = await _acache_lookup(prompt, model, temperature, max_tokens, cache)
+    if cached is not None:
+        return schema.model_validate_json(cached)
+    
+    logger.info(f"Generating JSON (async) with model: {model}")
+    
+    llm = _get_llm(model, temperature, max_tokens).bind(response_format=JSON_RESPONSE_FORMAT)
+    
+    for attempt in range(JSON_RETRIES + 1):
+        try:
+            limits = groq_limits(model, prompt, max_tokens)
+            timing = begin_call("groq", model)
+            response = await acall_with_limits(
+                lambda left: asyncio.wait_for(llm.ainvoke(prompt, **_call_options(left)), left),
+                limits, timeout, what=f"Groq {model}", tool="groq", model=model, timing=timing
+            )
+            await _arecord_usage(limits, model, prompt, response, timing)
+            content = response.content
+            result = schema.model_validate_json(content)
+            break
+        except ValidationError as e:
+            logger.warning(f"Invalid {schema.__name__} JSON (attempt {attempt + 1}): {str(e)[:200]}")
+            if attempt == JSON_RETRIES:
+                raise
+        except Exception as e:
+            logger.error(f"Error generating JSON with Groq: {str(e)}")
+            raise
+    
+    if key is not None:
+        await get_llm_cache().aset(key, content)
+    
+    return result
@@ -0,0 +1,211 @@
+"""Durable queue of generation jobs in SQLite, claimed by workers under leases."""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import config
+
+# Job statuses (the workflow's own status is in the result)
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+JSON_COLUMNS = ("request", "partial", "result")
+
+
+class JobStore:
+    """
+    Generation jobs and their state transitions, in a SQLite (WAL) file.
+    
+    Every worker process on the host opens the same file. A worker takes
+    a job with claim(), which hands it a lease: while the worker runs the
+    job it keeps calling renew() (or save_progress()), and a job whose
+    lease has run out (its worker crashed or hung) is claimed again by
+    another worker, up to max_attempts times. Writes from a worker that
+    lost its lease are refused, so a job only ever finishes once.
+    """
+    
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = self._open(path)
+    
+    def submit(self, request: Dict, webhook_url: Optional[str] = None) -> Dict:
+        """Queue a job for a generate request and return it."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, request, webhook_url, attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (job_id, QUEUED, json.dumps(request), webhook_url, now, now)
+            )
+        return self.get(job_id)
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a job, or None if there is no such job."""
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return self._row(cursor, row) if row is not None else None
+    
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict]:
+        """
+        Take the oldest queued job, or one whose lease has expired.
+        
+        Args:
+            worker_id: Identifies the claiming worker (host, process, task)
+            lease_seconds: How long the job is ours without a renewal
+        
+        Returns:
+            The claimed job, or None if there is nothing to run
+        """
+        now = time.time()
+        with self._lock, _Transaction(self._db):
+            # Jobs abandoned too often are failed rather than retried forever
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_expires = NULL, "
+                "finished_at = ?, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "Job was abandoned by its worker too many times", now, now, RUNNING, now, self.max_attempts)
+            )
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "started_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, worker_id, now + lease_seconds, now, now, row[0])
+            )
+            cursor = self._db.execute("SELECT * FROM jobs WHERE id = ?", (row[0],))
+            return self._row(cursor, cursor.fetchone())
+    
+    def renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False if the worker no longer holds the job."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (now + lease_seconds, now, job_id, worker_id, RUNNING)
+            )
+            return cursor.rowcount == 1
+    
+    def save_progress(self, job_id: str, worker_id: str, partial: Dict, lease_seconds: float) -> bool:
+        """Store a running job's partial state and extend its lease; False if the lease was lost."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET partial = ?, lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (json.dumps(partial), now + lease_seconds, now, job_id, worker_id, RUNNING)
+            )
+            return cursor.rowcount == 1
+    
+    def finish(self, job_id: str, worker_id: str, result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        """
+        Record a job's outcome: succeeded with a result, or failed with an error.
+        
+        Returns:
+            False if the worker lost the job to another worker meanwhile
+        """
+        now = time.time()
+        status = FAILED if error is not None else SUCCEEDED
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, worker = NULL, lease_expires = NULL, "
+                "finished_at = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, now, job_id, worker_id, RUNNING)
+            )
+            return cursor.rowcount == 1
+    
+    def set_webhook_status(self, job_id: str, status: str) -> None:
+        """Record how the completion webhook went ("delivered" or "failed")."""
+        with self._lock:
+            self._db.execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (status, job_id))
+    
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs that finished more than older_than seconds ago."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (SUCCEEDED, FAILED, time.time() - older_than)
+            )
+            return cursor.rowcount
+    
+    def stats(self) -> Dict:
+        """Return job counts by status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        counts.update(dict(rows))
+        return counts
+    
+    @staticmethod
+    def _row(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+        job = {column[0]: value for column, value in zip(cursor.description, row)}
+        for column in JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+    
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, webhook_url TEXT, "
+            "partial TEXT, result TEXT, error TEXT, attempts INTEGER NOT NULL, worker TEXT, "
+            "lease_expires REAL, webhook_status TEXT, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, updated_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)")
+        return db
+
+
+class _Transaction:
+    """Write-locking SQLite transaction, so two workers never claim the same job."""
+    
+    __slots__ = ("db",)
+    
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+    
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def default_job_store_path() -> str:
+    """JOB_STORE_PATH, or a file in the system temp dir."""
+    return config.JOB_STORE_PATH or os.path.join(tempfile.gettempdir(), "viral_content_agent", "jobs.sqlite")
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Return the process-wide job store, configured from config."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore(default_job_store_path(), max_attempts=config.JOB_MAX_ATTEMPTS)
+    return _store
@@ -0,0 +1,225 @@
+"""Content-addressed LLM response cache: in-memory LRU in front of SQLite."""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, TypeVar
+
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+
+def cache_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+    """Hash of everything that determines an LLM response."""
+    payload = json.dumps([model, prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier response cache keyed by cache_key().
+    
+    Memory tier: LRU of recent responses, served in microseconds.
+    Disk tier: SQLite file shared by every process on the host, survives
+    restarts. Both tiers expire entries after ttl seconds; the disk tier
+    is also trimmed to max_disk_entries, least recently used first.
+    
+    A cache is not worth waiting for: the disk tier gives up after
+    busy_timeout seconds on a locked file, and any SQLite error counts as a
+    miss (reads) or a skipped write, so the call goes to the network.
+    
+    Pass path=None to run memory-only.
+    """
+    
+    # Trim the disk tier once every this many writes
+    TRIM_EVERY = 50
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 86400,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 10000,
+        busy_timeout: float = 1.0
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        
+        if path:
+            self._db = self._open(path, busy_timeout)
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+            
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None and row[1] > now:
+                        self._db.execute(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._remember(key, row[1], row[0])
+                        self.disk_hits += 1
+                        return row[0]
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    logger.warning(f"⚠️ LLM disk cache read failed, treating as a miss: {e}")
+            
+            self.misses += 1
+            return None
+    
+    async def aget(self, key: str) -> Optional[str]:
+        """Async version of get; the disk tier is read in a thread."""
+        return await self._offload(self.get, key)
+    
+    def set(self, key: str, value: str) -> None:
+        """Store a response in both tiers."""
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, value, expires_at, now)
+                    )
+                    self._writes += 1
+                    if self._writes % self.TRIM_EVERY == 0:
+                        self._trim_disk(now)
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    logger.warning(f"⚠️ LLM disk cache write skipped: {e}")
+    
+    async def aset(self, key: str, value: str) -> None:
+        """Async version of set; the disk tier is written in a thread."""
+        await self._offload(self.set, key, value)
+    
+    def clear(self) -> None:
+        """Drop every cached response from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+    
+    def stats(self) -> Dict:
+        """Return hit/miss counters and the overall hit rate."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)
+            }
+    
+    async def _offload(self, func: Callable[..., T], *args) -> T:
+        """Run a cache operation in a thread if it touches the shared file."""
+        if self._db is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+    
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        """Put an entry in the memory LRU (caller holds the lock)."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+    
+    def _trim_disk(self, now: float) -> None:
+        """Delete expired rows and keep at most max_disk_entries (caller holds the lock)."""
+        expired = self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        overflow = self._db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        ).rowcount
+        self.evictions += expired + overflow
+    
+    @staticmethod
+    def _open(path: str, busy_timeout: float) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        return db
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def default_cache_path() -> str:
+    """Writable default location, including on serverless hosts (/tmp)."""
+    return os.path.join(tempfile.gettempdir(), "viral_content_agent", "llm_cache.sqlite")
+
+
+def get_llm_cache() -> LLMCache:
+    """Return the process-wide LLM cache, configured from config."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = config.LLM_CACHE_PATH
+                if path is None:
+                    path = default_cache_path()
+                try:
+                    _cache = LLMCache(
+                        path=path or None,
+                        ttl=config.LLM_CACHE_TTL,
+                        max_memory_entries=config.LLM_CACHE_MEMORY_ENTRIES,
+                        max_disk_entries=config.LLM_CACHE_DISK_ENTRIES
+                    )
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"⚠️ LLM disk cache unavailable ({e}), using memory only")
+                    _cache = LLMCache(
+                        path=None,
+                        ttl=config.LLM_CACHE_TTL,
+                        max_memory_entries=config.LLM_CACHE_MEMORY_ENTRIES
+                    )
+    return _cache
@@ -0,0 +1,263 @@
+"""Pooled ChatGroq clients sharing one keep-alive HTTP connection pool."""
+
+import asyncio
+import threading
+import weakref
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+
+import groq
+import httpx
+from langchain_groq import ChatGroq
+
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+GROQ_BASE_URL = "https://api.groq.com"
+
+ClientKey = Tuple[str, float, int]
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Return the running event loop, or None when called from sync code."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LLMClientPool:
+    """
+    Reusable ChatGroq clients keyed by (model, temperature, max_tokens).
+    
+    Every client shares the same Groq SDK clients and therefore the same
+    keep-alive httpx connection pool, so a call skips client construction
+    and, while a connection is alive, the TLS handshake.
+    
+    httpx async connections belong to the event loop that opened them, so
+    async connection pools (and the ChatGroq objects using them) are kept
+    per event loop and closed on that loop when it shuts down (asyncio.run
+    and uvicorn shut down async generators before closing a loop). Sync
+    callers share one pool.
+    
+    The SDK's own retries are off: tools.rate_limiter retries 429s and
+    transient errors for every provider in one place.
+    """
+    
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        max_clients: int = 32
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.max_clients = max_clients
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._completions = None
+        self._sync_clients: "OrderedDict[ClientKey, ChatGroq]" = OrderedDict()
+        self._unbound_async_completions = None
+        self._loop_scopes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopScope]" = (
+            weakref.WeakKeyDictionary()
+        )
+    
+    def get(self, model: str, temperature: float, max_tokens: int) -> ChatGroq:
+        """Return a pooled ChatGroq for these settings, creating it on a miss."""
+        key = (model, temperature, max_tokens)
+        loop = _running_loop()
+        
+        with self._lock:
+            if loop is None:
+                clients = self._sync_clients
+            else:
+                clients = self._loop_scope(loop).clients
+            
+            llm = clients.get(key)
+            if llm is not None:
+                clients.move_to_end(key)
+                self.hits += 1
+                return llm
+            
+            self.misses += 1
+            llm = ChatGroq(
+                api_key=config.GROQ_API_KEY,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                client=self._sync_completions(),
+                async_client=self._async_completions(loop)
+            )
+            clients[key] = llm
+            
+            if len(clients) > self.max_clients:
+                clients.popitem(last=False)
+                self.evictions += 1
+            
+            return llm
+    
+    def stats(self) -> Dict:
+        """Return pool hit/miss counters and sizes."""
+        with self._lock:
+            loop_clients = sum(len(scope.clients) for scope in self._loop_scopes.values())
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'clients': len(self._sync_clients) + loop_clients,
+                'event_loops': len(self._loop_scopes)
+            }
+    
+    async def aprewarm(self, settings: Iterable[ClientKey], connections: int = 2) -> None:
+        """
+        Build clients for common settings and open keep-alive connections.
+        
+        Meant for app startup, so the first real request does not pay for
+        client construction or the TLS handshake.
+        """
+        for model, temperature, max_tokens in settings:
+            self.get(model, temperature, max_tokens)
+        
+        with self._lock:
+            http_client = self._loop_scope(asyncio.get_running_loop()).http_client
+        headers = {"Authorization": f"Bearer {config.GROQ_API_KEY}"}
+        results = await asyncio.gather(
+            *(http_client.get(f"{GROQ_BASE_URL}/openai/v1/models", headers=headers)
+              for _ in range(connections)),
+            return_exceptions=True
+        )
+        opened = sum(1 for r in results if not isinstance(r, Exception))
+        logger.info(f"🔥 LLM pool pre-warmed: {opened}/{connections} connections, stats={self.stats()}")
+    
+    async def aclose(self) -> None:
+        """Close the sync pool and every event loop's async pool."""
+        with self._lock:
+            scopes = list(self._loop_scopes.items())
+            self._loop_scopes.clear()
+        
+        current = asyncio.get_running_loop()
+        for loop, scope in scopes:
+            if loop is current:
+                await scope.aclose()
+            elif loop.is_running():
+                # Connections can only be closed on the loop that opened them
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(scope.aclose(), loop))
+        
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._completions = None
+            self._sync_clients.clear()
+    
+    def _sync_completions(self):
+        """Shared sync Groq client (caller holds the lock)."""
+        if self._completions is None:
+            self._http_client = httpx.Client(limits=self.limits)
+            self._completions = groq.Groq(
+                api_key=config.GROQ_API_KEY,
+                http_client=self._http_client,
+                max_retries=0
+            ).chat.completions
+        return self._completions
+    
+    def _async_completions(self, loop: Optional[asyncio.AbstractEventLoop]):
+        """Async Groq client for an event loop (caller holds the lock)."""
+        if loop is not None:
+            return self._loop_scope(loop).completions
+        
+        # Sync callers never use it, but ChatGroq would otherwise build its
+        # own; an AsyncClient that has not sent anything is not bound to a loop.
+        if self._unbound_async_completions is None:
+            self._unbound_async_completions = groq.AsyncGroq(
+                api_key=config.GROQ_API_KEY,
+                http_client=httpx.AsyncClient(limits=self.limits),
+                max_retries=0
+            ).chat.completions
+        return self._unbound_async_completions
+    
+    def _loop_scope(self, loop: asyncio.AbstractEventLoop) -> "_LoopScope":
+        """Async connection pool and clients for an event loop (caller holds the lock)."""
+        scope = self._loop_scopes.get(loop)
+        if scope is None:
+            scope = _LoopScope(self.limits, self._drop_scope)
+            self._loop_scopes[loop] = scope
+        return scope
+    
+    def _drop_scope(self, scope: "_LoopScope") -> None:
+        """Forget a loop's scope once it is closed."""
+        with self._lock:
+            for loop, candidate in list(self._loop_scopes.items()):
+                if candidate is scope:
+                    del self._loop_scopes[loop]
+
+
+class _LoopScope:
+    """
+    Async httpx pool, Groq client and ChatGroq clients owned by one event loop.
+    
+    Must be created on its loop. It parks an async generator there, which
+    the loop's shutdown_asyncgens() closes, closing the pool on the loop
+    while it can still run the close.
+    """
+    
+    __slots__ = ("http_client", "completions", "clients", "_on_close", "_guard")
+    
+    def __init__(self, limits: httpx.Limits, on_close: Callable[["_LoopScope"], None]):
+        self.http_client = httpx.AsyncClient(limits=limits)
+        self.completions = groq.AsyncGroq(
+            api_key=config.GROQ_API_KEY,
+            http_client=self.http_client,
+            max_retries=0
+        ).chat.completions
+        self.clients: "OrderedDict[ClientKey, ChatGroq]" = OrderedDict()
+        self._on_close = on_close
+        
+        # The first step registers the generator with the running loop and
+        # stops at its yield without awaiting anything
+        self._guard = self._close_at_shutdown()
+        try:
+            self._guard.__anext__().send(None)
+        except StopIteration:
+            pass
+    
+    async def aclose(self) -> None:
+        """Close the pool now (on the scope's loop)."""
+        await self._guard.aclose()
+    
+    async def _close_at_shutdown(self) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            self._on_close(self)
+            await self.http_client.aclose()
+
+
+_pool: Optional[LLMClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMClientPool:
+    """Return the process-wide LLM client pool, configured from config."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = LLMClientPool(
+                    max_connections=config.LLM_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.LLM_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=config.LLM_POOL_KEEPALIVE_EXPIRY,
+                    max_clients=config.LLM_POOL_MAX_CLIENTS
+                )
+    return _pool
@@ -0,0 +1,639 @@
+"""Shared token-bucket rate limits and retry policy for Groq and Tavily calls."""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import groq
+import httpx
+import requests
+from tavily.errors import UsageLimitExceededError
+
+import config
+from utils.deadline import MIN_CALL_TIMEOUT, DeadlineExceeded
+from utils.logger import setup_logger
+from utils.metrics import TOOL_SECONDS, UPSTREAM_ERRORS
+from utils.tracing import span
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# (bucket name, cost of this call, bucket capacity, refill per second)
+Limit = Tuple[str, float, float, float]
+
+# Sleep at most this long between checks while queued, so a bucket another
+# worker refunded or a lifted block is noticed promptly
+MAX_QUEUE_SLEEP = 1.0
+
+
+class RateLimitTimeout(TimeoutError):
+    """Waiting for rate-limit quota would overrun the call's timeout."""
+
+
+class RateLimiter:
+    """
+    Token buckets shared by every worker process on the host.
+    
+    Each bucket holds up to `capacity` tokens and refills at `rate` tokens
+    per second; a call takes `cost` tokens from each of its buckets at once
+    (e.g. one request from the model's RPM bucket and its estimated tokens
+    from the TPM bucket) or waits until all of them have enough. A bucket
+    can also be blocked until a time, e.g. after a 429 with Retry-After.
+    
+    State lives in a SQLite file so uvicorn workers draw from the same
+    quota; pass path=None to keep it in memory for this process only.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        
+        self.acquired = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.blocks = 0
+        
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Tuple[float, float, float]] = {}  # name -> (tokens, updated_at, blocked_until)
+        self._db: Optional[sqlite3.Connection] = None
+        
+        if path:
+            self._db = self._open(path)
+    
+    def try_acquire(self, limits: List[Limit]) -> float:
+        """
+        Take tokens from every bucket if all of them have enough.
+        
+        Returns:
+            0.0 if the tokens were taken, otherwise the seconds to wait
+            before trying again
+        """
+        if not limits:
+            return 0.0
+        
+        now = time.time()
+        with self._lock:
+            with self._transaction():
+                rows = self._load([name for name, *_ in limits])
+                
+                wait = 0.0
+                refilled = {}
+                for name, cost, capacity, rate in limits:
+                    tokens, updated_at, blocked_until = rows.get(name, (capacity, now, 0.0))
+                    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+                    refilled[name] = (tokens, blocked_until)
+                    
+                    # A call bigger than the bucket waits for a full bucket
+                    cost = min(cost, capacity)
+                    if blocked_until > now:
+                        wait = max(wait, blocked_until - now)
+                    elif tokens < cost:
+                        wait = max(wait, (cost - tokens) / rate)
+                
+                if wait == 0.0:
+                    for name, cost, capacity, _ in limits:
+                        tokens, blocked_until = refilled[name]
+                        refilled[name] = (tokens - min(cost, capacity), blocked_until)
+                
+                self._save({name: (tokens, now, blocked) for name, (tokens, blocked) in refilled.items()})
+        return wait
+    
+    def acquire(self, limits: List[Limit], timeout: Optional[float] = None) -> None:
+        """
+        Wait (queue) until the tokens are taken.
+        
+        Raises:
+            RateLimitTimeout: If the quota can't be had within timeout seconds
+        """
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(limits)
+            if wait == 0.0:
+                self._record_acquired(time.monotonic() - started)
+                return
+            sleep = self._queue_sleep(wait, started, timeout)
+            time.sleep(sleep)
+    
+    async def aacquire(self, limits: List[Limit], timeout: Optional[float] = None) -> None:
+        """
+        Async version of acquire; queued calls don't block the event loop.
+        
+        With the shared file, each try runs in a thread: another worker's
+        transaction can keep it waiting for the SQLite lock.
+        """
+        started = time.monotonic()
+        while True:
+            wait = await self._offload(self.try_acquire, limits)
+            if wait == 0.0:
+                self._record_acquired(time.monotonic() - started)
+                return
+            sleep = self._queue_sleep(wait, started, timeout)
+            await asyncio.sleep(sleep)
+    
+    def refund(self, limit: Limit, amount: float) -> None:
+        """Give back tokens a call reserved but didn't use (e.g. unused max_tokens)."""
+        if amount <= 0:
+            return
+        name, _, capacity, _ = limit
+        with self._lock:
+            with self._transaction():
+                row = self._load([name]).get(name)
+                if row is not None:
+                    tokens, updated_at, blocked_until = row
+                    self._save({name: (min(capacity, tokens + amount), updated_at, blocked_until)})
+    
+    async def arefund(self, limit: Limit, amount: float) -> None:
+        """Async version of refund."""
+        if amount > 0:
+            await self._offload(self.refund, limit, amount)
+    
+    def block(self, names: List[str], seconds: float) -> None:
+        """Hold back every call on these buckets for `seconds`, in every worker."""
+        now = time.time()
+        with self._lock:
+            with self._transaction():
+                rows = self._load(names)
+                blocked = {}
+                for name in names:
+                    # Buckets are created by acquire, so a missing one starts empty
+                    tokens, updated_at, blocked_until = rows.get(name, (0.0, now, 0.0))
+                    blocked[name] = (tokens, updated_at, max(blocked_until, now + seconds))
+                self._save(blocked)
+            self.blocks += 1
+    
+    async def ablock(self, names: List[str], seconds: float) -> None:
+        """Async version of block."""
+        await self._offload(self.block, names, seconds)
+    
+    def stats(self) -> Dict:
+        """Return counters for calls let through, queued and blocked."""
+        with self._lock:
+            return {
+                'acquired': self.acquired,
+                'queued': self.queued,
+                'wait_seconds': round(self.wait_seconds, 3),
+                'blocks': self.blocks
+            }
+    
+    async def _offload(self, func: Callable[..., T], *args) -> T:
+        """Run a bucket operation in a thread if it touches the shared file."""
+        if self._db is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+    
+    def _queue_sleep(self, wait: float, started: float, timeout: Optional[float]) -> float:
+        """How long to sleep before retrying an acquire; raises past the timeout."""
+        if timeout is not None and time.monotonic() - started + wait > timeout:
+            raise RateLimitTimeout(f"Rate limit wait of {wait:.1f}s exceeds the {timeout:.1f}s timeout")
+        # Jitter so queued workers don't all retry at the same instant
+        return min(wait, MAX_QUEUE_SLEEP) + random.uniform(0, 0.05)
+    
+    def _record_acquired(self, waited: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            if waited > 0.001:
+                self.queued += 1
+                self.wait_seconds += waited
+    
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT on the shared file (caller holds the lock)."""
+        return _Transaction(self._db)
+    
+    def _load(self, names: List[str]) -> Dict[str, Tuple[float, float, float]]:
+        """Read bucket rows (caller holds the lock, inside a transaction)."""
+        if self._db is None:
+            return {name: self._memory[name] for name in names if name in self._memory}
+        placeholders = ",".join("?" * len(names))
+        rows = self._db.execute(
+            f"SELECT name, tokens, updated_at, blocked_until FROM rate_buckets WHERE name IN ({placeholders})",
+            names
+        ).fetchall()
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+    
+    def _save(self, rows: Dict[str, Tuple[float, float, float]]) -> None:
+        """Write bucket rows (caller holds the lock, inside a transaction)."""
+        if self._db is None:
+            self._memory.update(rows)
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?)",
+            [(name, *row) for name, row in rows.items()]
+        )
+    
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated_at REAL NOT NULL, blocked_until REAL NOT NULL)"
+        )
+        return db
+
+
+class _Transaction:
+    """Write-locking SQLite transaction, or a no-op for the memory backend."""
+    
+    __slots__ = ("db",)
+    
+    def __init__(self, db: Optional[sqlite3.Connection]):
+        self.db = db
+    
+    def __enter__(self):
+        if self.db is not None:
+            self.db.execute("BEGIN IMMEDIATE")
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.db is not None:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def key_id(api_key: Optional[str]) -> str:
+    """Short, non-reversible id for an API key, safe to store in bucket names."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def groq_model_limits(model: str) -> Tuple[float, float]:
+    """(requests per minute, tokens per minute) for a Groq model."""
+    overrides = json.loads(config.GROQ_MODEL_LIMITS) if config.GROQ_MODEL_LIMITS else {}
+    limits = overrides.get(model, {})
+    return limits.get('rpm', config.GROQ_RPM), limits.get('tpm', config.GROQ_TPM)
+
+
+def groq_limits(model: str, prompt: str, max_tokens: int) -> List[Limit]:
+    """
+    RPM and TPM buckets for one Groq call, per model and API key.
+    
+    The TPM cost reserves the prompt plus max_tokens; refund the unused
+    part once the real usage is known.
+    """
+    if not config.RATE_LIMIT_ENABLED:
+        return []
+    rpm, tpm = groq_model_limits(model)
+    prefix = f"groq:{key_id(config.GROQ_API_KEY)}:{model}"
+    return [
+        (f"{prefix}:rpm", 1, rpm, rpm / 60),
+        (f"{prefix}:tpm", estimate_tokens(prompt) + max_tokens, tpm, tpm / 60),
+    ]
+
+
+def tavily_limits() -> List[Limit]:
+    """RPM bucket for one Tavily search, per API key."""
+    if not config.RATE_LIMIT_ENABLED:
+        return []
+    rpm = config.TAVILY_RPM
+    return [(f"tavily:{key_id(config.TAVILY_API_KEY)}:rpm", 1, rpm, rpm / 60)]
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a rate-limit reset/retry header: "7.66s", "2m59.56s", "120ms" or "30"."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts:
+        return None
+    units = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def error_response(error: BaseException) -> Optional[Union[httpx.Response, requests.Response]]:
+    """The HTTP response behind a Groq, httpx or requests (sync Tavily) error, if any."""
+    response = getattr(error, 'response', None)
+    return response if isinstance(response, (httpx.Response, requests.Response)) else None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for a provider 429 (Groq RateLimitError, Tavily "Too many requests")."""
+    if isinstance(error, groq.RateLimitError):
+        return True
+    if isinstance(error, UsageLimitExceededError):
+        return True
+    response = error_response(error)
+    return response is not None and response.status_code == 429
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for errors worth retrying: 5xx responses, connection failures and timeouts."""
+    if isinstance(error, (groq.APIConnectionError, groq.InternalServerError, httpx.TransportError)):
+        return True
+    # The sync Tavily client is built on requests
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = error_response(error)
+    return response is not None and response.status_code >= 500
+
+
+def error_kind(error: BaseException) -> str:
+    """Classify a failed call for the upstream error counter."""
+    if is_rate_limited(error):
+        return "rate_limited"
+    if isinstance(error, (TimeoutError, groq.APITimeoutError)):
+        return "timeout"
+    if is_transient(error):
+        return "transient"
+    return "other"
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait, from Retry-After or the
+    x-ratelimit-reset-* headers of a 429 response.
+    """
+    response = error_response(error)
+    if response is None:
+        return None
+    headers = response.headers
+    for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if header in headers:
+            seconds = parse_duration(headers[header])
+            if seconds is not None:
+                return seconds
+    return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    ceiling = min(config.RATE_LIMIT_BACKOFF_MAX, config.RATE_LIMIT_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def _retry_delay(error: Exception, attempt: int, expires: Optional[float], what: str) -> Optional[float]:
+    """Seconds to back off before retrying a failed call, or None to give up."""
+    if attempt >= config.RATE_LIMIT_MAX_RETRIES:
+        return None
+    
+    rate_limited = is_rate_limited(error)
+    if rate_limited:
+        hinted = retry_after(error)
+        delay = hinted if hinted is not None else backoff_delay(attempt)
+    elif is_transient(error):
+        delay = backoff_delay(attempt)
+    else:
+        return None
+    
+    if expires is not None and time.monotonic() + delay + MIN_CALL_TIMEOUT >= expires:
+        return None
+    
+    logger.warning(f"⏳ {what} failed ({type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+    return delay
+
+
+def _retry_plan(error: Exception, attempt: int, limits: List[Limit], expires: Optional[float], what: str) -> Optional[float]:
+    """
+    Decide whether to retry a failed call.
+    
+    Returns:
+        Seconds to sleep before the next attempt (0 when a bucket block
+        already makes the next acquire wait), or None to give up
+    """
+    delay = _retry_delay(error, attempt, expires, what)
+    if delay is not None and limits and is_rate_limited(error):
+        # Every worker on the host backs off, not just this call
+        get_rate_limiter().block([name for name, *_ in limits], delay)
+        return 0.0
+    return delay
+
+
+async def _aretry_plan(error: Exception, attempt: int, limits: List[Limit], expires: Optional[float], what: str) -> Optional[float]:
+    """Async version of _retry_plan."""
+    delay = _retry_delay(error, attempt, expires, what)
+    if delay is not None and limits and is_rate_limited(error):
+        await get_rate_limiter().ablock([name for name, *_ in limits], delay)
+        return 0.0
+    return delay
+
+
+def _record_attempt(
+    started: float,
+    entered: float,
+    tool: str,
+    model: str,
+    timing: Optional[Dict],
+    call_span,
+    error: Optional[Exception] = None
+) -> None:
+    """Record one finished call attempt in the metrics, the request's timings and its trace."""
+    now = time.perf_counter()
+    TOOL_SECONDS.observe(now - started, tool, model)
+    if error is not None:
+        call_span.record_error(error)
+        call_span.set_attribute('error.kind', error_kind(error))
+    call_span.end()
+    if timing is not None:
+        timing['attempts'] += 1
+        timing['duration_ms'] = round(timing['duration_ms'] + (now - started) * 1000, 1)
+        timing['queue_ms'] = max(0.0, round((now - entered) * 1000 - timing['duration_ms'], 1))
+
+
+def _time_left(expires: Optional[float]) -> Optional[float]:
+    """
+    Seconds left of a call's timeout, None without one.
+    
+    Raises:
+        DeadlineExceeded: If too little time is left to start a call
+    """
+    if expires is None:
+        return None
+    remaining = expires - time.monotonic()
+    if remaining <= MIN_CALL_TIMEOUT:
+        raise DeadlineExceeded(f"Timeout reached ({remaining:.1f}s left)")
+    return remaining
+
+
+def call_with_limits(
+    call: Callable[[Optional[float]], T],
+    limits: List[Limit],
+    timeout: Optional[float] = None,
+    what: str = "Call",
+    tool: str = "upstream",
+    model: str = "",
+    timing: Optional[Dict] = None
+) -> T:
+    """
+    Run a provider call under rate limits, retrying 429s and transient errors.
+    
+    Args:
+        call: Makes the call, given the seconds left of the timeout (or None)
+        limits: Buckets to draw from before each attempt (see groq_limits)
+        timeout: Overall budget for queueing, attempts and backoff; no
+            attempt starts with MIN_CALL_TIMEOUT or less of it left
+        what: Label for log messages
+        tool, model: Labels for the tool_call_seconds and upstream_errors
+            metrics (e.g. "groq" and the model name)
+        timing: Per-request timing entry (see utils.timings.begin_call)
+            that gets the attempts, call time and time spent queued or
+            backing off
+    
+    Returns:
+        Whatever call returns
+    
+    Raises:
+        DeadlineExceeded: If the timeout runs out before an attempt starts
+    """
+    expires = None if timeout is None else time.monotonic() + timeout
+    entered = time.perf_counter()
+    attempt = 0
+    while True:
+        get_rate_limiter().acquire(limits, _time_left(expires))
+        left = _time_left(expires)
+        started = time.perf_counter()
+        call_span = span(f"{tool} call", tool=tool, model=model, attempt=attempt)
+        try:
+            result = call(left)
+            _record_attempt(started, entered, tool, model, timing, call_span)
+            return result
+        except Exception as e:
+            _record_attempt(started, entered, tool, model, timing, call_span, e)
+            UPSTREAM_ERRORS.inc(tool, error_kind(e))
+            sleep = _retry_plan(e, attempt, limits, expires, what)
+            if sleep is None:
+                raise
+            time.sleep(sleep)
+            attempt += 1
+
+
+async def acall_with_limits(
+    call: Callable[[Optional[float]], Awaitable[T]],
+    limits: List[Limit],
+    timeout: Optional[float] = None,
+    what: str = "Call",
+    tool: str = "upstream",
+    model: str = "",
+    timing: Optional[Dict] = None
+) -> T:
+    """Async version of call_with_limits."""
+    expires = None if timeout is None else time.monotonic() + timeout
+    entered = time.perf_counter()
+    attempt = 0
+    while True:
+        await get_rate_limiter().aacquire(limits, _time_left(expires))
+        left = _time_left(expires)
+        started = time.perf_counter()
+        call_span = span(f"{tool} call", tool=tool, model=model, attempt=attempt)
+        try:
+            result = await call(left)
+            _record_attempt(started, entered, tool, model, timing, call_span)
+            return result
+        except Exception as e:
+            _record_attempt(started, entered, tool, model, timing, call_span, e)
+            UPSTREAM_ERRORS.inc(tool, error_kind(e))
+            sleep = await _aretry_plan(e, attempt, limits, expires, what)
+            if sleep is None:
+                raise
+            await asyncio.sleep(sleep)
+            attempt += 1
+
+
+def stream_with_limits(
+    open_stream: Callable[[Optional[float]], Iterator[T]],
+    limits: List[Limit],
+    timeout: Optional[float] = None,
+    what: str = "Stream",
+    tool: str = "upstream",
+    model: str = "",
+    timing: Optional[Dict] = None
+) -> Iterator[T]:
+    """
+    Streaming version of call_with_limits.
+    
+    A stream is only retried if it fails before its first chunk; after
+    that, chunks have already gone to the caller and the error is raised.
+    """
+    expires = None if timeout is None else time.monotonic() + timeout
+    entered = time.perf_counter()
+    attempt = 0
+    while True:
+        get_rate_limiter().acquire(limits, _time_left(expires))
+        left = _time_left(expires)
+        started = time.perf_counter()
+        call_span = span(f"{tool} call", tool=tool, model=model, attempt=attempt)
+        streaming = False
+        try:
+            for chunk in open_stream(left):
+                streaming = True
+                yield chunk
+            _record_attempt(started, entered, tool, model, timing, call_span)
+            return
+        except Exception as e:
+            _record_attempt(started, entered, tool, model, timing, call_span, e)
+            UPSTREAM_ERRORS.inc(tool, error_kind(e))
+            sleep = None if streaming else _retry_plan(e, attempt, limits, expires, what)
+            if sleep is None:
+                raise
+            time.sleep(sleep)
+            attempt += 1
+
+
+async def astream_with_limits(
+    open_stream: Callable[[Optional[float]], AsyncIterator[T]],
+    limits: List[Limit],
+    timeout: Optional[float] = None,
+    what: str = "Stream",
+    tool: str = "upstream",
+    model: str = "",
+    timing: Optional[Dict] = None
+) -> AsyncIterator[T]:
+    """Async version of stream_with_limits."""
+    expires = None if timeout is None else time.monotonic() + timeout
+    entered = time.perf_counter()
+    attempt = 0
+    while True:
+        await get_rate_limiter().aacquire(limits, _time_left(expires))
+        left = _time_left(expires)
+        started = time.perf_counter()
+        call_span = span(f"{tool} call", tool=tool, model=model, attempt=attempt)
+        streaming = False
+        try:
+            async for chunk in open_stream(left):
+                streaming = True
+                yield chunk
+            _record_attempt(started, entered, tool, model, timing, call_span)
+            return
+        except Exception as e:
+            _record_attempt(started, entered, tool, model, timing, call_span, e)
+            UPSTREAM_ERRORS.inc(tool, error_kind(e))
+            sleep = None if streaming else await _aretry_plan(e, attempt, limits, expires, what)
+            if sleep is None:
+                raise
+            await asyncio.sleep(sleep)
+            attempt += 1
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, configured from config."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                path = config.RATE_LIMIT_PATH
+                if path is None:
+                    path = os.path.join(tempfile.gettempdir(), "viral_content_agent", "rate_limits.sqlite")
+                try:
+                    _limiter = RateLimiter(path=path or None)
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"⚠️ Shared rate-limit state unavailable ({e}), limiting this process only")
+                    _limiter = RateLimiter(path=None)
+    return _limiter
@@ -0,0 +1,235 @@
+"""In-process metrics registry with a Prometheus text exposition."""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PREFIX = "viral_agent_"
+
+# Histogram bucket upper bounds (a +Inf bucket is always added)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+WORKFLOW_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+ITERATION_BUCKETS = (0, 1, 2, 3, 4, 5, 7, 10)
+SCORE_BUCKETS = (10, 20, 30, 40, 50, 60, 70, 80, 85, 90, 95, 100)
+WAIT_BUCKETS = (0, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Registry:
+    """
+    Holds every metric and renders them for /api/metrics.
+    
+    Updates are lock-free: each thread writes to its own shard (a plain dict
+    only that thread mutates), and a scrape sums the shards. On the event loop
+    all tasks share the loop thread's shard, which is safe because an update
+    never awaits. The lock is only taken when a thread writes its first sample
+    and when scraping.
+    """
+    
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._shards: List[Tuple[threading.Thread, Dict]] = []
+        self._retired: Dict[Tuple, object] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def shard(self) -> Dict:
+        """Return the calling thread's shard, creating it on first use."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            with self._lock:
+                self._retire_dead_threads()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            return shard
+    
+    def register(self, metric: "_Metric") -> "_Metric":
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+    
+    def collect(self) -> Dict[Tuple, object]:
+        """Sum the shards into {(metric name, label values): value}."""
+        with self._lock:
+            self._retire_dead_threads()
+            shards = [self._retired] + [shard.copy() for _, shard in self._shards]
+        
+        totals: Dict[Tuple, object] = {}
+        for shard in shards:
+            _merge(totals, shard)
+        return totals
+    
+    def _retire_dead_threads(self) -> None:
+        """
+        Fold the shards of finished threads (e.g. short-lived executor
+        threads) into one, so the shard list doesn't grow without bound.
+        Caller holds the lock.
+        """
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _merge(self._retired, shard)
+        self._shards = alive
+    
+    def render(self, snapshots: Optional[Dict[str, Dict]] = None) -> str:
+        """
+        Render every metric in the Prometheus text format.
+        
+        Args:
+            snapshots: Extra {subsystem: stats dict} pairs, e.g. the LLM
+                cache's stats(); their numeric values are exported as
+                untyped samples named <prefix><subsystem>_<key>
+        """
+        totals = self.collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(totals))
+        for subsystem, stats in (snapshots or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{PREFIX}{subsystem}_{key}"
+                lines.append(f"# TYPE {name} untyped")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _Metric:
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), registry: Optional[Registry] = None):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+    
+    def _samples(self, totals: Dict[Tuple, object]) -> List[Tuple[Tuple, object]]:
+        return sorted(
+            ((key[1], value) for key, value in totals.items() if key[0] == self.name),
+            key=lambda sample: sample[0]
+        )
+    
+    def _label_text(self, values: Tuple, extra: str = "") -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    def values(self) -> Dict[Tuple, object]:
+        """Return this metric's current totals by label values."""
+        return dict(self._samples(self.registry.collect()))
+    
+    def render(self, totals: Dict[Tuple, object]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self._samples(totals):
+            lines.append(f"{self.name}{self._label_text(values)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up (calls, tokens, errors)."""
+    
+    kind = "counter"
+    
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self.registry.shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down (e.g. workflows in flight)."""
+    
+    kind = "gauge"
+    
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self.registry.shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0) + amount
+    
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Counts observations (latencies, scores) into fixed buckets."""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS, registry: Optional[Registry] = None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labels, registry)
+    
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self.registry.shard()
+        key = (self.name, labels)
+        counts = shard.get(key)
+        if counts is None:
+            # One slot per bucket plus +Inf, then sum and count
+            counts = shard[key] = [0] * (len(self.buckets) + 3)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+    
+    def render(self, totals: Dict[Tuple, object]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, counts in self._samples(totals):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket = 'le="' + le + '"'
+                lines.append(f"{self.name}_bucket{self._label_text(values, bucket)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_number(counts[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {counts[-1]}")
+        return lines
+
+
+def _merge(totals: Dict[Tuple, object], shard: Dict[Tuple, object]) -> None:
+    """Add one shard's samples into totals."""
+    for key, value in shard.items():
+        if isinstance(value, list):
+            # Histogram: per-bucket counts, then sum and count
+            total = totals.setdefault(key, [0] * len(value))
+            for i, item in enumerate(value):
+                total[i] += item
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# Workflow
+NODE_SECONDS = Histogram("node_seconds", "Wall time of each workflow node.", ["node"])
+WORKFLOW_SECONDS = Histogram("workflow_seconds", "Wall time of whole workflow runs.", buckets=WORKFLOW_BUCKETS)
+WORKFLOWS = Counter("workflows_total", "Finished workflow runs by final status.", ["status"])
+WORKFLOWS_IN_FLIGHT = Gauge("workflows_in_flight", "Workflow runs currently in progress.")
+ITERATIONS = Histogram("workflow_iterations", "Revision iterations per finished run.", buckets=ITERATION_BUCKETS)
+FINAL_SCORES = Histogram("workflow_final_score", "Virality score of each finished run.", buckets=SCORE_BUCKETS)
+RERUNS = Counter("reruns_total", "Partial re-runs of stored runs by the node they started at.", ["start_node"])
+SPECULATIVE_POLISHES = Counter("speculative_polish_total", "Speculative polish outcomes (used, repolished, discarded) by whether the review approved the draft.", ["outcome", "approved"])
+
+# Upstream calls (Groq, Tavily)
+TOOL_SECONDS = Histogram("tool_call_seconds", "Wall time of each upstream call attempt, excluding rate-limit queueing.", ["tool", "model"])
+LLM_TOKENS = Counter("llm_tokens_total", "Groq tokens by model and type (prompt or completion).", ["model", "type"])
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed upstream call attempts by tool and kind.", ["tool", "kind"])
+
+# Admission control (workflow slots and wait queue)
+ADMISSION_SLOTS_IN_USE = Gauge("admission_slots_in_use", "Workflow slots currently held.")
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Requests waiting for a workflow slot.")
+ADMISSION_WAIT_SECONDS = Histogram("admission_wait_seconds", "Time requests spent waiting for a workflow slot.", buckets=WAIT_BUCKETS)
+ADMISSIONS = Counter("admissions_total", "Admission decisions by outcome (admitted, queue_full, queue_timeout).", ["outcome"])
@@ -0,0 +1,44 @@
+"""Token streaming helpers for forwarding LLM output to workflow clients."""
+
+from typing import AsyncIterator
+from langchain_core.callbacks import adispatch_custom_event
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DRAFT_DELTA_EVENT = "draft_delta"
+
+
+async def emit_draft_delta(node: str, iteration: int, delta: str) -> None:
+    """
+    Dispatch a draft_delta custom event to whoever is streaming the workflow.
+    
+    Outside a LangGraph run there is no parent run to attach the event to,
+    so the chunk is silently dropped.
+    """
+    try:
+        await adispatch_custom_event(
+            DRAFT_DELTA_EVENT,
+            {'node': node, 'iteration': iteration, 'delta': delta}
+        )
+    except RuntimeError:
+        pass
+
+
+async def acollect_stream(chunks: AsyncIterator[str], node: str, iteration: int) -> str:
+    """
+    Join streamed text chunks, forwarding each one as a draft_delta event.
+    
+    Args:
+        chunks: Async iterator of text chunks (e.g. from astream_content)
+        node: Workflow node producing the text ("ghostwriter" or "chief_editor")
+        iteration: Current iteration number, used by clients to group chunks
+        
+    Returns:
+        The full assembled text
+    """
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        await emit_draft_delta(node, iteration, chunk)
+    return "".join(parts)
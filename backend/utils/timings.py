@@ -0,0 +1,205 @@
+"""Per-request timing and token breakdown, collected through contextvars."""
+
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class RunTimings:
+    """
+    Timing and token breakdown of one workflow run.
+    
+    Created by the caller and passed to run_workflow / arun_workflow /
+    astream_workflow, which make it the current collector for the run.
+    Nodes, steps and upstream calls report into whichever collector is
+    current in their context, so concurrent runs never share one.
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes: List[Dict] = []
+        self.steps: List[Dict] = []
+        self.calls: List[Dict] = []
+        self.research_cache_hits = 0
+        
+        # Parallel branches and the sync Tavily fan-out report from threads
+        self._lock = threading.Lock()
+    
+    def offset_ms(self, moment: float) -> float:
+        """Milliseconds from the start of the run to a perf_counter() moment."""
+        return _ms(moment - self.started)
+    
+    def add(self, kind: str, entry: Dict) -> None:
+        """Append an entry to nodes, steps or calls."""
+        with self._lock:
+            getattr(self, kind).append(entry)
+    
+    def count_research_cache_hit(self) -> None:
+        """Count research served from the research cache."""
+        with self._lock:
+            self.research_cache_hits += 1
+    
+    def as_dict(self) -> Dict:
+        """The timings block returned with the response."""
+        with self._lock:
+            calls = [dict(call) for call in self.calls]
+            nodes = list(self.nodes)
+            steps = list(self.steps)
+            research_hits = self.research_cache_hits
+        
+        return {
+            'total_ms': self.offset_ms(time.perf_counter()),
+            'queue_ms': round(sum(call['queue_ms'] for call in calls), 1),
+            'prompt_tokens': sum(call['prompt_tokens'] for call in calls),
+            'completion_tokens': sum(call['completion_tokens'] for call in calls),
+            'cache_hits': {
+                'llm': sum(1 for call in calls if call['cached']),
+                'research': research_hits
+            },
+            'nodes': nodes,
+            'steps': steps,
+            'calls': calls
+        }
+
+
+_current_run: ContextVar[Optional[RunTimings]] = ContextVar("run_timings", default=None)
+
+# (node, iteration, step) the code running in this context belongs to
+_location: ContextVar[Tuple[Optional[str], Optional[int], Optional[str]]] = ContextVar(
+    "timing_location", default=(None, None, None)
+)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class collect_timings:
+    """Make `timings` the current collector inside the with block (None: no-op)."""
+    
+    def __init__(self, timings: Optional[RunTimings]):
+        self.timings = timings
+    
+    def __enter__(self):
+        self._token = _current_run.set(self.timings) if self.timings is not None else None
+        return self.timings
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            try:
+                _current_run.reset(self._token)
+            except ValueError:
+                # An async generator (astream_workflow) closed from another context
+                pass
+
+
+class _Span:
+    """Times a with block as a node invocation or a step within a node."""
+    
+    def __init__(self, kind: str, name: str, iteration: Optional[int] = None):
+        self.kind = kind
+        self.name = name
+        self.iteration = iteration
+    
+    def __enter__(self):
+        node, iteration, _ = _location.get()
+        if self.kind == 'nodes':
+            location = (self.name, self.iteration, None)
+        else:
+            location = (node, iteration, self.name)
+        self._token = _location.set(location)
+        self._started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        finished = time.perf_counter()
+        node, iteration, step = _location.get()
+        _location.reset(self._token)
+        
+        run = _current_run.get()
+        if run is None:
+            return
+        entry = {
+            'name': self.name,
+            'node': node,
+            'iteration': iteration,
+            'start_ms': run.offset_ms(self._started),
+            'duration_ms': _ms(finished - self._started)
+        }
+        if exc_type is not None:
+            entry['error'] = exc_type.__name__
+        run.add(self.kind, entry)
+    
+    def __call__(self, func: Callable) -> Callable:
+        """Use as a decorator: every call of func gets its own span."""
+        kind, name, iteration = self.kind, self.name, self.iteration
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _Span(kind, name, iteration):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(kind, name, iteration):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def node_timing(node: str, iteration: int) -> _Span:
+    """Time one invocation of a workflow node."""
+    return _Span('nodes', node, iteration)
+
+
+def timed_step(name: str) -> _Span:
+    """
+    Time a step within a node (scout_search, draft, review, polish, ...).
+    
+    Use as a context manager or as a decorator on sync or async functions;
+    upstream calls made inside are tagged with the step.
+    """
+    return _Span('steps', name)
+
+
+def begin_call(tool: str, model: str = "") -> Dict:
+    """
+    Start the timing entry for one upstream call.
+    
+    The rate limiter's call wrappers add queue and call time to it and
+    groq_llm adds the token counts. Outside a timed run the entry is
+    simply discarded.
+    """
+    node, iteration, step = _location.get()
+    entry = {
+        'tool': tool,
+        'model': model,
+        'node': node,
+        'iteration': iteration,
+        'step': step,
+        'queue_ms': 0.0,
+        'duration_ms': 0.0,
+        'attempts': 0,
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+        'cached': False
+    }
+    run = _current_run.get()
+    if run is not None:
+        run.add('calls', entry)
+    return entry
+
+
+def record_llm_cache_hit(model: str) -> None:
+    """Record a Groq call served from the LLM response cache."""
+    begin_call("groq", model)['cached'] = True
+
+
+def record_research_cache_hit() -> None:
+    """Record Trend Scout research served from the research cache."""
+    run = _current_run.get()
+    if run is not None:
+        run.count_research_cache_hit()
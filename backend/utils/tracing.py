@@ -0,0 +1,397 @@
+"""Request-scoped tracing: spans per request, workflow node and upstream call."""
+
+import asyncio
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Spans waiting for the exporter thread; beyond this, new spans are dropped
+MAX_QUEUED_SPANS = 10000
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL = 1.0  # seconds
+
+
+class Span:
+    """
+    One timed operation in a trace.
+    
+    Use as a context manager: the span becomes the current span (the
+    parent of spans started inside the block) and ends on exit, recording
+    the exception if one is raised.
+    """
+    
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "error", "_token")
+    
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[Dict] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._token = None
+    
+    @property
+    def sampled(self) -> bool:
+        return True
+    
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+    
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+    
+    def end(self) -> None:
+        """Finish the span and hand it to the exporter (once)."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _exporter().submit(self)
+    
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_error(exc)
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Ended from another context (an async generator closed late)
+            pass
+        self.end()
+    
+    def as_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': 'error' if self.error else 'ok',
+            'error': self.error
+        }
+
+
+class _UnsampledSpan:
+    """
+    Stand-in for a span that isn't recorded: a request that wasn't
+    sampled (it still has a trace ID for correlation) or anything outside
+    a trace. Every method is a no-op.
+    """
+    
+    sampled = False
+    
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id
+        self._token = None
+    
+    def set_attribute(self, key: str, value) -> None:
+        pass
+    
+    def record_error(self, error: BaseException) -> None:
+        pass
+    
+    def end(self) -> None:
+        pass
+    
+    def __enter__(self):
+        if self.trace_id is not None:
+            self._token = _current_span.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                pass
+
+
+NOOP_SPAN = _UnsampledSpan()
+
+_current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+def tracing_enabled() -> bool:
+    """Tracing is on when any share of requests is sampled."""
+    return config.TRACE_SAMPLE_RATE > 0
+
+
+def parse_traceparent(header: Optional[str]):
+    """
+    Parse a W3C traceparent header ("00-<trace id>-<span id>-<flags>").
+    
+    Returns:
+        Tuple of (trace id, parent span id, sampled), or None if invalid
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, attributes: Optional[Dict] = None):
+    """
+    Start the root span of a request, or a child if a trace is already
+    current (e.g. the FastAPI middleware running under the Mangum handler).
+    
+    The sampling decision is made here, once per request: an incoming
+    traceparent's sampled flag is honoured, otherwise TRACE_SAMPLE_RATE
+    decides. Unsampled requests still get a trace ID.
+    
+    Args:
+        name: Span name, e.g. "POST /api/generate"
+        traceparent: Incoming W3C traceparent header, if any
+        attributes: Span attributes
+    
+    Returns:
+        A Span, or a no-op span when tracing is off or not sampled
+    """
+    if not tracing_enabled():
+        return NOOP_SPAN
+    
+    parent = _current_span.get()
+    if parent is not None:
+        return span(name, **(attributes or {}))
+    
+    incoming = parse_traceparent(traceparent)
+    if incoming is not None:
+        trace_id, parent_id, sampled = incoming
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = random.random() < config.TRACE_SAMPLE_RATE
+    
+    if not sampled:
+        return _UnsampledSpan(trace_id)
+    return Span(name, trace_id, parent_id, attributes)
+
+
+def span(name: str, **attributes):
+    """
+    Start a child of the current span (a context manager).
+    
+    Outside a sampled trace this returns the shared no-op span, so an
+    untraced request pays one ContextVar lookup per span.
+    """
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, attributes)
+
+
+def traced(name: str) -> Callable:
+    """Decorator: run each call of a sync or async function in a span."""
+    
+    def decorate(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    
+    return decorate
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the request running in this context, if it has one."""
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+def flush_traces(timeout: float = 2.0) -> None:
+    """Export queued spans now, e.g. before a serverless function freezes."""
+    if _span_exporter is not None:
+        _span_exporter.flush(timeout)
+
+
+class SpanExporter:
+    """
+    Exports finished spans from a background thread, so ending a span
+    on the hot path is only a queue put.
+    
+    Spans go to a JSON-lines file (one span per line) or, with
+    TRACE_EXPORTER=otlp, to an OTLP/HTTP collector as OTLP JSON.
+    """
+    
+    def __init__(self, kind: str, path: Optional[str] = None, endpoint: Optional[str] = None):
+        self.kind = kind
+        self.path = path
+        self.endpoint = endpoint
+        
+        self.exported = 0
+        self.dropped = 0
+        
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUED_SPANS)
+        self._flushed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+    
+    def submit(self, finished: Span) -> None:
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+    
+    def flush(self, timeout: float = 2.0) -> None:
+        """Wait until every span queued so far has been exported."""
+        deadline = time.monotonic() + timeout
+        with self._flushed:
+            while self._queue.unfinished_tasks and time.monotonic() < deadline:
+                self._flushed.wait(min(0.05, max(0.0, deadline - time.monotonic())))
+    
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < EXPORT_BATCH_SIZE:
+                    batch.append(self._queue.get(timeout=EXPORT_INTERVAL if len(batch) == 1 else 0.01))
+            except queue.Empty:
+                pass
+            
+            try:
+                self._export(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                logger.warning(f"⚠️ Exporting {len(batch)} spans failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                with self._flushed:
+                    self._flushed.notify_all()
+    
+    def _export(self, batch: List[Span]) -> None:
+        if self.kind == "otlp":
+            httpx.post(self.endpoint, json=otlp_payload(batch), timeout=5.0).raise_for_status()
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for finished in batch:
+                f.write(json.dumps(finished.as_dict(), default=str) + "\n")
+
+
+def otlp_payload(batch: List[Span]) -> Dict:
+    """Wrap spans in an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    
+    def attribute(key, value):
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        return {'key': key, 'value': typed}
+    
+    spans = []
+    for finished in batch:
+        otlp_span = {
+            'traceId': finished.trace_id,
+            'spanId': finished.span_id,
+            'name': finished.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(finished.start_ns),
+            'endTimeUnixNano': str(finished.end_ns),
+            'attributes': [attribute(k, v) for k, v in finished.attributes.items()],
+            'status': {'code': 2, 'message': finished.error} if finished.error else {'code': 1}
+        }
+        if finished.parent_id:
+            otlp_span['parentSpanId'] = finished.parent_id
+        spans.append(otlp_span)
+    
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [attribute('service.name', config.TRACE_SERVICE_NAME)]},
+            'scopeSpans': [{'scope': {'name': 'viral_content_agent'}, 'spans': spans}]
+        }]
+    }
+
+
+def default_trace_path() -> str:
+    """Writable default location, including on serverless hosts (/tmp)."""
+    return os.path.join(tempfile.gettempdir(), "viral_content_agent", "traces.jsonl")
+
+
+_span_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter() -> SpanExporter:
+    """Return the process-wide span exporter, configured from config."""
+    global _span_exporter
+    if _span_exporter is None:
+        with _exporter_lock:
+            if _span_exporter is None:
+                _span_exporter = SpanExporter(
+                    config.TRACE_EXPORTER,
+                    path=config.TRACE_PATH or default_trace_path(),
+                    endpoint=config.TRACE_OTLP_ENDPOINT
+                )
+    return _span_exporter
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware giving every HTTP request a trace.
+    
+    The request span stays open until the response body is fully sent,
+    so it covers a whole SSE stream, and the trace ID is returned in the
+    X-Trace-Id response header.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope.get('headers') or [])
+        traceparent = headers.get(b'traceparent', b'').decode('latin-1') or None
+        with start_trace(f"{scope['method']} {scope['path']}", traceparent, {
+            'http.method': scope['method'],
+            'http.route': scope['path']
+        }) as request_span:
+            async def send_with_trace_id(message):
+                if message['type'] == 'http.response.start':
+                    request_span.set_attribute('http.status_code', message['status'])
+                    message['headers'] = list(message.get('headers') or []) + [
+                        (b'x-trace-id', request_span.trace_id.encode())
+                    ]
+                await send(message)
+            
+            await self.app(scope, receive, send_with_trace_id)
@@ -0,0 +1,469 @@
+"""Compact LangGraph checkpointer (in memory or SQLite) so interrupted runs can resume."""
+
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Sequence, Tuple, TypeVar
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata
+)
+
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Serialized values at least this big are stored zlib-compressed
+COMPRESS_MIN_BYTES = 512
+
+# Checkpoint metadata keys not worth storing: "writes" repeats every node's
+# update, which the channel values already hold
+DROPPED_METADATA_KEYS = ("writes",)
+
+
+class Checkpointer(BaseCheckpointSaver):
+    """
+    LangGraph checkpoint saver that keeps only what a resume needs.
+    
+    A checkpoint is written after every node, so it is kept small:
+    
+    - Channel values are stored once per version, so a checkpoint only
+      writes the channels its node changed (a new draft or score), not
+      the research angles and settings again.
+    - Each thread keeps its `keep` newest checkpoints (the latest, and the
+      one before it to resume a run whose last node failed); older ones,
+      their pending writes and channel values no longer referenced are
+      deleted as new ones arrive.
+    - Large values are zlib-compressed and node outputs are not repeated
+      in the metadata.
+    - Threads untouched for `ttl` seconds are dropped when a new run starts.
+    
+    With a path, checkpoints live in a SQLite (WAL) file shared by every
+    process on the host, so a run survives its process; without one they
+    live in this process only.
+    """
+    
+    def __init__(self, path: Optional[str] = None, keep: int = 2, ttl: float = 86400):
+        super().__init__()
+        self.path = path
+        self.keep = max(keep, 1)
+        self.ttl = ttl
+        
+        self.checkpoints_written = 0
+        self.bytes_written = 0
+        
+        self._lock = threading.Lock()
+        self._db = self._open(path or ":memory:")
+    
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the checkpoint in config, or the thread's latest one."""
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self._db.execute(
+                    "SELECT checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)
+                ).fetchone()
+            if row is None:
+                return None
+            return self._tuple(thread_id, checkpoint_ns, row)
+    
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        """List a thread's checkpoints (or every thread's), newest first."""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints"
+        )
+        conditions, params = [], []
+        if config is not None:
+            conditions.append("thread_id = ?")
+            params.append(config['configurable']['thread_id'])
+            if config['configurable'].get('checkpoint_ns') is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(config['configurable']['checkpoint_ns'])
+            if get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before is not None and get_checkpoint_id(before):
+            conditions.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                checkpoint_tuple = self._tuple(thread_id, checkpoint_ns, row)
+                if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+                    continue
+                tuples.append(checkpoint_tuple)
+                if limit is not None and len(tuples) >= limit:
+                    break
+        yield from tuples
+    
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        """Store a checkpoint and the channel values it changed, then compact the thread."""
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', "")
+        saved = dict(checkpoint)
+        values = saved.pop('channel_values')
+        metadata = {
+            key: value for key, value in get_checkpoint_metadata(config, metadata).items()
+            if key not in DROPPED_METADATA_KEYS
+        }
+        
+        blobs = []
+        for channel, version in new_versions.items():
+            if channel in values:
+                kind, data = self._dumps(values[channel])
+            else:
+                kind, data = "empty", b""
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), kind, data))
+        checkpoint_blob = self._dumps(saved)
+        metadata_blob = self._dumps(metadata)
+        
+        now = time.time()
+        with self._lock, _Transaction(self._db):
+            if metadata.get('source') == "input":
+                self._expire(now)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO checkpoint_blobs "
+                "(thread_id, checkpoint_ns, channel, version, type, value) VALUES (?, ?, ?, ?, ?, ?)",
+                blobs
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id, "
+                "checkpoint_type, checkpoint, metadata_type, metadata, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, checkpoint_ns, checkpoint['id'], config['configurable'].get('checkpoint_id'),
+                    *checkpoint_blob, *metadata_blob, now
+                )
+            )
+            self._compact(thread_id, checkpoint_ns)
+            self.checkpoints_written += 1
+            self.bytes_written += len(checkpoint_blob[1]) + len(metadata_blob[1]) + sum(len(b[5]) for b in blobs)
+        
+        return {
+            'configurable': {
+                'thread_id': thread_id,
+                'checkpoint_ns': checkpoint_ns,
+                'checkpoint_id': checkpoint['id']
+            }
+        }
+    
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        """Store the writes of a finished task, so a resume doesn't run it again."""
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', "")
+        checkpoint_id = config['configurable']['checkpoint_id']
+        rows = []
+        for index, (channel, value) in enumerate(writes):
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, index),
+                channel, *self._dumps(value), task_path
+            ))
+        # Special writes (errors, interrupts) are replaced; regular ones are kept
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._lock:
+            self._db.executemany(
+                f"{verb} INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, "
+                "channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+    
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint of a thread."""
+        with self._lock, _Transaction(self._db):
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self._db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+    
+    # The async API (used by every async run, once per node) runs the
+    # SQLite calls in a thread when checkpoints go to the shared file: they
+    # take write locks another process may hold
+    
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._offload(self.get_tuple, config)
+    
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await self._offload(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+    
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        return await self._offload(self.put, config, checkpoint, metadata, new_versions)
+    
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        await self._offload(self.put_writes, config, writes, task_id, task_path)
+    
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._offload(self.delete_thread, thread_id)
+    
+    async def _offload(self, func: Callable[..., T], *args) -> T:
+        if self.path is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+    
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Monotonic version with a random suffix, so forks of a thread never collide."""
+        if current is None:
+            number = 0
+        elif isinstance(current, int):
+            number = current
+        else:
+            number = int(current.split(".")[0])
+        return f"{number + 1:032}.{random.random():016}"
+    
+    def stats(self) -> Dict:
+        """Return write counters and the number of threads stored."""
+        with self._lock:
+            threads = self._db.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints").fetchone()[0]
+            return {
+                'threads': threads,
+                'checkpoints_written': self.checkpoints_written,
+                'bytes_written': self.bytes_written,
+                'average_checkpoint_bytes': self.bytes_written / self.checkpoints_written if self.checkpoints_written else 0.0
+            }
+    
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row: Sequence) -> CheckpointTuple:
+        """Build a CheckpointTuple from a checkpoints row (caller holds the lock)."""
+        checkpoint_id, parent_id, checkpoint_type, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self._loads((checkpoint_type, checkpoint_blob))
+        
+        values = {}
+        for channel, version in checkpoint['channel_versions'].items():
+            blob = self._db.execute(
+                "SELECT type, value FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version))
+            ).fetchone()
+            if blob is not None and blob[0] != "empty":
+                values[channel] = self._loads(blob)
+        
+        writes = self._db.execute(
+            "SELECT task_id, channel, type, value FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        
+        def config_for(checkpoint_id):
+            return {
+                'configurable': {
+                    'thread_id': thread_id,
+                    'checkpoint_ns': checkpoint_ns,
+                    'checkpoint_id': checkpoint_id
+                }
+            }
+        
+        return CheckpointTuple(
+            config=config_for(checkpoint_id),
+            checkpoint={**checkpoint, 'channel_values': values},
+            metadata=self._loads((metadata_type, metadata_blob)),
+            parent_config=config_for(parent_id) if parent_id else None,
+            pending_writes=[(task_id, channel, self._loads((kind, value))) for task_id, channel, kind, value in writes]
+        )
+    
+    def _compact(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Keep the thread's newest checkpoints and the values they use (caller holds the lock)."""
+        stale = [
+            row[0] for row in self._db.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+                (thread_id, checkpoint_ns, self.keep)
+            )
+        ]
+        if not stale:
+            return
+        marks = ",".join("?" * len(stale))
+        for table in ("checkpoints", "checkpoint_writes"):
+            self._db.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                (thread_id, checkpoint_ns, *stale)
+            )
+        
+        referenced = set()
+        for kind, value in self._db.execute(
+            "SELECT checkpoint_type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns)
+        ).fetchall():
+            for channel, version in self._loads((kind, value))['channel_versions'].items():
+                referenced.add((channel, str(version)))
+        unused = [
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in self._db.execute(
+                "SELECT channel, version FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns)
+            ).fetchall()
+            if (channel, version) not in referenced
+        ]
+        self._db.executemany(
+            "DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            unused
+        )
+    
+    def _expire(self, now: float) -> None:
+        """Drop threads not written to for ttl seconds (caller holds the lock)."""
+        expired = [
+            row[0] for row in self._db.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(updated_at) < ?",
+                (now - self.ttl,)
+            )
+        ]
+        for thread_id in expired:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self._db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        if expired:
+            logger.info(f"🧹 Expired checkpoints of {len(expired)} runs")
+    
+    def _dumps(self, value: Any) -> Tuple[str, bytes]:
+        kind, data = self.serde.dumps_typed(value)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return kind + "+zlib", zlib.compress(data, 1)
+        return kind, data
+    
+    def _loads(self, blob: Tuple[str, bytes]) -> Any:
+        kind, data = blob
+        if kind.endswith("+zlib"):
+            kind, data = kind[:-len("+zlib")], zlib.decompress(data)
+        return self.serde.loads_typed((kind, data))
+    
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, parent_id TEXT, "
+            "checkpoint_type TEXT NOT NULL, checkpoint BLOB NOT NULL, metadata_type TEXT NOT NULL, "
+            "metadata BLOB NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_blobs ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL, version TEXT NOT NULL, "
+            "type TEXT NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, channel, version))"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_writes ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+            "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT NOT NULL, "
+            "value BLOB NOT NULL, task_path TEXT NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+        )
+        return db
+
+
+class _Transaction:
+    """Write-locking SQLite transaction."""
+    
+    __slots__ = ("db",)
+    
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+    
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+_checkpointer: Optional[BaseCheckpointSaver] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """
+    Return the process-wide checkpointer from CHECKPOINT_BACKEND.
+    
+    "sqlite" stores checkpoints in CHECKPOINT_PATH (temp dir if unset),
+    "memory" in this process; None when checkpointing is off.
+    """
+    global _checkpointer
+    if _checkpointer is None and config.CHECKPOINT_BACKEND:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                settings = {'keep': config.CHECKPOINT_KEEP, 'ttl': config.CHECKPOINT_TTL}
+                if config.CHECKPOINT_BACKEND == "memory":
+                    _checkpointer = Checkpointer(path=None, **settings)
+                elif config.CHECKPOINT_BACKEND == "sqlite":
+                    path = config.CHECKPOINT_PATH or os.path.join(
+                        tempfile.gettempdir(), "viral_content_agent", "checkpoints.sqlite"
+                    )
+                    try:
+                        _checkpointer = Checkpointer(path=path, **settings)
+                    except (sqlite3.Error, OSError) as e:
+                        logger.warning(f"⚠️ Checkpoint file unavailable ({e}), keeping checkpoints in memory")
+                        _checkpointer = Checkpointer(path=None, **settings)
+                else:
+                    raise ValueError(f"Unknown CHECKPOINT_BACKEND: {config.CHECKPOINT_BACKEND}")
+    return _checkpointer
@@ -6,7 +6,6 @@ import logging
 # Add backend to path
 sys.path.append(os.path.join(os.getcwd(), "backend"))
 
-import config
 from workflow.graph import run_workflow
 
 # Configure logging
@@ -15,17 +14,19 @@ logging.basicConfig(level=logging.INFO)
 def test_workflow():
     print("🚀 Testing Workflow Logic")
     
-    # Mock settings
-    config.MAX_ITERATIONS = 3
-    config.VIRALITY_THRESHOLD = 99 # High threshold to force loops
+    # Per-run settings
+    settings = {
+        'max_iterations': 3,
+        'virality_threshold': 99  # High threshold to force loops
+    }
     
     topic = "Test Topic"
     platform = "twitter"
     
-    print(f"Config: Max Iterations={config.MAX_ITERATIONS}, Threshold={config.VIRALITY_THRESHOLD}")
+    print(f"Config: Max Iterations={settings['max_iterations']}, Threshold={settings['virality_threshold']}")
     
     # Run workflow
-    final_state = run_workflow(topic, platform)
+    final_state = run_workflow(topic, platform, settings)
     
     print("\n✅ Workflow Complete")
     print(f"Final Status: {final_state.get('status')}")
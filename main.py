@@ -104,9 +104,6 @@ def main():
             index=0
         )
         
-        # Update config with selected model
-        config.GROQ_MODEL = selected_model
-        
         # Max Iterations
         max_iterations = st.number_input(
             "Max Iterations",
@@ -114,7 +111,6 @@ def main():
             max_value=5,
             value=config.MAX_ITERATIONS
         )
-        config.MAX_ITERATIONS = max_iterations
         
         # Virality Threshold
         virality_threshold = st.slider(
@@ -123,7 +119,15 @@ def main():
             max_value=100,
             value=config.VIRALITY_THRESHOLD
         )
-        config.VIRALITY_THRESHOLD = virality_threshold
+        
+        # Best-of-N drafting
+        candidates = st.number_input(
+            "Drafts per Iteration",
+            min_value=1,
+            max_value=5,
+            value=config.CANDIDATES,
+            help="Write and score several drafts in parallel and keep the best"
+        )
         
         st.divider()
         
@@ -182,7 +186,16 @@ def main():
                 progress_bar.progress(25)
             
             # Run Workflow
-            final_state = run_workflow(topic, platform.lower())
+            final_state = run_workflow(
+                topic,
+                platform.lower(),
+                {
+                    'model': selected_model,
+                    'max_iterations': max_iterations,
+                    'virality_threshold': virality_threshold,
+                    'candidates': candidates
+                }
+            )
             
             # Complete
             progress_bar.progress(100)
@@ -292,7 +305,7 @@ def main():
         with tab_feedback:
             feedbacks = final_state.get('feedbacks', [])
             scores = final_state.get('scores', [])
-            threshold = config.VIRALITY_THRESHOLD
+            threshold = final_state.get('virality_threshold', config.VIRALITY_THRESHOLD)
             
             if feedbacks:
                 st.markdown("### ⚖️ Chief Editor's Report")
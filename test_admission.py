@@ -0,0 +1,138 @@
+"""Admission control: workflow slots, the bounded wait queue and 429 load shedding."""
+
+import asyncio
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.admission import AdmissionController, Overloaded
+from api.routes import router
+
+
+def test_queued_requests_get_freed_slots_in_order():
+    async def scenario():
+        controller = AdmissionController(slots=1, queue_size=2, max_wait=5)
+        first = await controller.acquire()
+        order = []
+        
+        async def wait(name):
+            slot = await controller.acquire()
+            order.append(name)
+            await asyncio.sleep(0.01)
+            slot.release()
+        
+        waiters = [asyncio.create_task(wait("a")), asyncio.create_task(wait("b"))]
+        await asyncio.sleep(0.01)
+        assert controller.stats()['queue_depth'] == 2
+        
+        # Queue is full: the next request is shed at once
+        with pytest.raises(Overloaded) as shed:
+            await controller.acquire()
+        assert shed.value.retry_after >= 1
+        
+        first.release()
+        first.release()  # releasing twice is a no-op
+        await asyncio.gather(*waiters)
+        return order, controller.stats()
+    
+    order, stats = asyncio.run(scenario())
+    assert order == ["a", "b"]
+    assert stats['in_use'] == 0 and stats['queue_depth'] == 0
+    assert stats['admitted'] == 3 and stats['queued'] == 2 and stats['rejected_full'] == 1
+
+
+def test_waiting_past_max_wait_is_rejected_and_frees_its_place():
+    async def scenario():
+        controller = AdmissionController(slots=1, queue_size=4, max_wait=5)
+        held = await controller.acquire()
+        with pytest.raises(Overloaded):
+            await controller.acquire(max_wait=0.05)
+        
+        # A waiter cancelled by its client leaves the queue too
+        cancelled = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        
+        held.release()
+        # The slot was not handed to the requests that gave up
+        slot = await asyncio.wait_for(controller.acquire(), timeout=1)
+        slot.release()
+        return controller.stats()
+    
+    stats = asyncio.run(scenario())
+    assert stats['rejected_timeout'] == 1
+    assert stats['in_use'] == 0 and stats['queue_depth'] == 0
+
+
+def test_background_work_waits_in_turn_and_is_never_shed():
+    async def scenario():
+        controller = AdmissionController(slots=1, queue_size=1, max_wait=0.05)
+        held = await controller.acquire()
+        order = []
+        
+        async def job():
+            slot = await controller.wait_for_slot()
+            order.append("job")
+            slot.release()
+        
+        async def request():
+            slot = await controller.acquire(max_wait=5)
+            order.append("request")
+            slot.release()
+        
+        # Queued past the controller's max_wait, and not taking the request's place in the queue
+        waiting = asyncio.create_task(job())
+        await asyncio.sleep(0.1)
+        queued = asyncio.create_task(request())
+        await asyncio.sleep(0.01)
+        assert controller.stats()['queue_depth'] == 2
+        
+        held.release()
+        await asyncio.gather(waiting, queued)
+        
+        # A job cancelled while waiting leaves the queue
+        held = await controller.acquire()
+        cancelled = asyncio.create_task(controller.wait_for_slot())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        held.release()
+        return order, controller.stats()
+    
+    order, stats = asyncio.run(scenario())
+    assert order == ["job", "request"]
+    assert stats['rejected_full'] == 0 and stats['rejected_timeout'] == 0
+    assert stats['in_use'] == 0 and stats['queue_depth'] == 0
+
+
+def test_overloaded_worker_answers_429_with_retry_after():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+    
+    controller = AdmissionController(slots=1, queue_size=0, max_wait=5)
+    body = {'topic': "AI agents"}
+    with mock.patch("api.routes.get_admission_controller", lambda: controller), \
+         mock.patch("config.GROQ_API_KEY", "test"), \
+         mock.patch("config.TAVILY_API_KEY", "test"):
+        held = asyncio.run(controller.acquire())
+        try:
+            response = client.post("/api/generate", json=body)
+            stream = client.post("/api/generate/stream", json=body)
+            metrics = client.get("/api/metrics").text
+        finally:
+            held.release()
+    
+    for r in (response, stream):
+        assert r.status_code == 429
+        assert int(r.headers["retry-after"]) >= 1
+    assert controller.stats()['rejected_full'] == 2
+    assert 'viral_agent_admissions_total{outcome="queue_full"}' in metrics
+    assert "viral_agent_admission_queue_depth" in metrics
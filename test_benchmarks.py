@@ -0,0 +1,52 @@
+"""Benchmark suite: percentiles, baseline comparison and a fake-backend run."""
+
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from benchmarks.suite import bench_workflow, compare, percentile
+
+
+def test_baseline_comparison_flags_regressions():
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2, 3, 4, 5], 95) == 4.8
+    assert percentile([], 99) == 0.0
+
+    baseline = {'scenarios': {'http_c4': {
+        'latency_p50_ms': 400.0, 'latency_p99_ms': 900.0, 'rps': 8.0, 'llm_calls_per_run': 6.0, 'errors': 0, 'runs': 20
+    }}}
+    same = {'scenarios': {'http_c4': {
+        'latency_p50_ms': 420.0, 'latency_p99_ms': 1200.0, 'rps': 7.5, 'llm_calls_per_run': 6.0, 'errors': 0, 'runs': 40
+    }}}
+    worse = {'scenarios': {'http_c4': {
+        'latency_p50_ms': 600.0, 'latency_p99_ms': 900.0, 'rps': 4.0, 'llm_calls_per_run': 9.0, 'errors': 1, 'runs': 20
+    }}}
+
+    assert compare(same, baseline, 0.25) == []
+    assert compare(worse, baseline, 0.25) == [
+        "http_c4.latency_p50_ms: 400.0 -> 600.0",
+        "http_c4.rps: 8.0 -> 4.0",
+        "http_c4.llm_calls_per_run: 6.0 -> 9.0",
+        "http_c4.errors: 0 -> 1",
+    ]
+
+
+def test_workflow_scenario_reports_percentiles_and_calls():
+    with mock.patch("config.FAKE_GROQ", True), \
+            mock.patch("config.FAKE_TAVILY", True), \
+            mock.patch("config.FAKE_GROQ_LATENCY_MS", 1), \
+            mock.patch("config.FAKE_TAVILY_LATENCY_MS", 1), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        result = bench_workflow(3, {'research_fanout': 2, 'max_iterations': 1})
+
+    assert result['runs'] == 3 and result['errors'] == 0
+    assert 0 < result['latency_p50_ms'] <= result['latency_p95_ms'] <= result['latency_p99_ms']
+    assert result['rps'] > 0
+    assert result['search_calls_per_run'] == 2
+    # Scout analysis, then a draft and a review per iteration, plus a polish if approved
+    assert 3 <= result['llm_calls_per_run'] <= 6
+    assert result['peak_rss_mb'] > 0
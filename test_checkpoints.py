@@ -0,0 +1,149 @@
+"""Checkpointer: round-trips, compaction of old checkpoints and values, TTL expiry."""
+
+import asyncio
+import os
+import sys
+import threading
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import router
+from workflow.checkpoints import Checkpointer
+
+RESEARCH = [{'title': f"Angle {i}", 'summary': "Why this works. " * 20} for i in range(3)]
+
+
+def checkpoint(number, values, versions):
+    return {
+        'v': 1,
+        'id': f"{number:04d}",
+        'ts': "",
+        'channel_values': values,
+        'channel_versions': versions,
+        'versions_seen': {},
+        'pending_sends': []
+    }
+
+
+def thread(thread_id, checkpoint_id=None):
+    configurable = {'thread_id': thread_id, 'checkpoint_ns': ""}
+    if checkpoint_id:
+        configurable['checkpoint_id'] = checkpoint_id
+    return {'configurable': configurable}
+
+
+def write_run(saver, thread_id, start=1):
+    """Research, then two drafts: each checkpoint only changes what its node wrote."""
+    saved = saver.put(
+        thread(thread_id),
+        checkpoint(start, {'research_angles': RESEARCH, 'draft_content': ""}, {'research_angles': "1", 'draft_content': "1"}),
+        {'source': "input", 'step': -1},
+        {'research_angles': "1", 'draft_content': "1"}
+    )
+    for step, draft in enumerate(["first draft", "second draft"], start=1):
+        saved = saver.put(
+            saved,
+            checkpoint(start + step, {'research_angles': RESEARCH, 'draft_content': draft},
+                       {'research_angles': "1", 'draft_content': str(step + 1)}),
+            {'source': "loop", 'step': step, 'writes': {'ghostwriter': {'draft_content': draft}}},
+            {'draft_content': str(step + 1)}
+        )
+    return saved
+
+
+def test_checkpoints_round_trip_through_the_shared_file(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = Checkpointer(path, keep=3)
+    latest = write_run(saver, "run-1")
+    saver.put_writes(latest, [("status", "failed")], task_id="task-1")
+
+    # Another process reads the same file
+    other = Checkpointer(path, keep=3)
+    stored = other.get_tuple(thread("run-1"))
+    assert stored.config == latest
+    assert stored.checkpoint['channel_values'] == {'research_angles': RESEARCH, 'draft_content': "second draft"}
+    assert stored.parent_config['configurable']['checkpoint_id'] == "0002"
+    assert stored.pending_writes == [("task-1", "status", "failed")]
+    # Node outputs are not repeated in the metadata
+    assert stored.metadata == {'source': "loop", 'step': 2}
+
+    earlier = asyncio.run(other.aget_tuple(thread("run-1", "0002")))
+    assert earlier.checkpoint['channel_values']['draft_content'] == "first draft"
+
+    assert [t.checkpoint['id'] for t in other.list(thread("run-1"))] == ["0003", "0002", "0001"]
+    assert [t.checkpoint['id'] for t in other.list(thread("run-1"), before=thread("run-1", "0003"), limit=1)] == ["0002"]
+    assert [t.checkpoint['id'] for t in other.list(thread("run-1"), filter={'source': "input"})] == ["0001"]
+
+    async def alist():
+        return [t.checkpoint['id'] async for t in other.alist(thread("run-1"), limit=2)]
+
+    assert asyncio.run(alist()) == ["0003", "0002"]
+    assert other.get_tuple(thread("run-2")) is None
+
+
+def test_compaction_keeps_the_newest_checkpoints_and_the_values_they_use():
+    saver = Checkpointer(path=None, keep=2)
+    first = saver.put(
+        thread("run-1"),
+        checkpoint(1, {'research_angles': RESEARCH, 'draft_content': ""}, {'research_angles': "1", 'draft_content': "1"}),
+        {'source': "input"},
+        {'research_angles': "1", 'draft_content': "1"}
+    )
+    saver.put_writes(first, [("draft_content", "first draft")], task_id="task-1")
+    write_run(saver, "run-1", start=2)
+
+    assert [t.checkpoint['id'] for t in saver.list(thread("run-1"))] == ["0004", "0003"]
+    # Research was written once and is still referenced; superseded drafts are gone
+    blobs = saver._db.execute("SELECT channel, version FROM checkpoint_blobs ORDER BY channel, version").fetchall()
+    assert blobs == [("draft_content", "2"), ("draft_content", "3"), ("research_angles", "1")]
+    assert saver._db.execute("SELECT COUNT(*) FROM checkpoint_writes").fetchone()[0] == 0
+
+    latest = saver.get_tuple(thread("run-1"))
+    assert latest.checkpoint['channel_values'] == {'research_angles': RESEARCH, 'draft_content': "second draft"}
+    # Research is large, so it is stored compressed
+    assert saver._db.execute(
+        "SELECT type FROM checkpoint_blobs WHERE channel = 'research_angles'"
+    ).fetchone()[0].endswith("+zlib")
+
+
+def test_idle_threads_expire_and_threads_can_be_deleted():
+    clock = mock.Mock(return_value=1000.0)
+    with mock.patch("time.time", clock):
+        saver = Checkpointer(path=None, ttl=60)
+        write_run(saver, "old-run")
+
+        # A new run starting after the TTL drops the idle one
+        clock.return_value = 1100.0
+        write_run(saver, "new-run")
+
+    assert saver.get_tuple(thread("old-run")) is None
+    assert saver.stats()['threads'] == 1
+
+    asyncio.run(saver.adelete_thread("new-run"))
+    assert saver.get_tuple(thread("new-run")) is None
+    for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+        assert saver._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+
+
+def test_metrics_read_checkpoint_stats_off_the_event_loop(tmp_path):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    saver = Checkpointer(str(tmp_path / "checkpoints.sqlite"))
+    write_run(saver, "run-1")
+    threads = []
+
+    def stats():
+        threads.append(threading.current_thread())
+        return Checkpointer.stats(saver)
+
+    saver.stats = stats
+    with mock.patch("api.routes.get_checkpointer", lambda: saver):
+        metrics = TestClient(app).get("/api/metrics").text
+
+    assert "viral_agent_checkpoints_threads 1" in metrics
+    # The stats ran in the event loop's default executor, not on the loop
+    assert len(threads) == 1 and threads[0].name.startswith("asyncio_")
@@ -0,0 +1,141 @@
+"""Chief Editor: speculative polish outcomes and structured reviews, using a fake LLM."""
+
+import asyncio
+import json
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from langchain_core.messages import AIMessage
+
+from agents import chief_editor
+from agents.chief_editor import achief_editor_agent, chief_editor_agent, speculation_stats
+from workflow.graph import build_initial_state
+
+MINOR = "SCORE: 92\n\nFEEDBACK:\n- Sharpen the hook.\n- Cut the last line."
+MAJOR = "SCORE: 80\n\nFEEDBACK:\n- Sharpen the hook.\n- Cut the last line."
+FAILING = "SCORE: 40\n\nFEEDBACK:\n- Start over."
+
+
+class ScriptedEditorLLM:
+    """Fake chat model: reviews return the scripted reply, polishes say which prompt they got."""
+
+    review = MINOR
+    prompts = []
+
+    def __init__(self, model, temperature, max_tokens):
+        pass
+
+    def reply(self, prompt):
+        self.prompts.append(prompt)
+        if "evaluating social media content" in prompt:
+            return AIMessage(content=self.review)
+        if "light final polish" in prompt:
+            return AIMessage(content="speculative polish")
+        return AIMessage(content="feedback polish")
+
+    def invoke(self, prompt, **kwargs):
+        return self.reply(prompt)
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.reply(prompt)
+
+
+def editor_state():
+    state = build_initial_state("remote work", settings={'speculative_polish': True, 'virality_threshold': 75})
+    state['draft_content'] = "the draft"
+    return state
+
+
+def test_speculative_polish_outcomes_are_counted():
+    expected = [
+        # (review, outcome, final content)
+        (MINOR, "used", "speculative polish"),
+        (MAJOR, "repolished", "feedback polish"),
+        (FAILING, "discarded", None),
+    ]
+    before = speculation_stats()
+
+    with mock.patch("tools.groq_llm._get_llm", ScriptedEditorLLM), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False):
+        for review, outcome, final_content in expected:
+            ScriptedEditorLLM.review = review
+            for agent in (chief_editor_agent, lambda state: asyncio.run(achief_editor_agent(state))):
+                update = agent(editor_state())
+                assert update['speculations'] == [outcome]
+                assert update.get('final_content') == final_content
+
+    after = speculation_stats()
+    # Each outcome once per path; used and repolished reviews approved the draft
+    assert {key: after[key] - before[key] for key in after} == {
+        'used': 2, 'repolished': 2, 'discarded': 2, 'approved': 4
+    }
+
+
+def test_speculation_threads_start_on_first_use_and_stop_at_shutdown():
+    chief_editor.shutdown_speculation_executor()
+    assert chief_editor._speculation_executor is None
+
+    with mock.patch("config.SPECULATIVE_POLISH_THREADS", 3):
+        executor = chief_editor.get_speculation_executor()
+        assert chief_editor.get_speculation_executor() is executor
+        assert executor._max_workers == 3
+
+    chief_editor.shutdown_speculation_executor()
+    assert executor._shutdown
+    # The next sync review gets a new pool
+    assert chief_editor.get_speculation_executor() is not executor
+
+
+class JSONEditorLLM:
+    """Fake JSON-mode chat model that replies with the scripted contents in turn."""
+
+    replies = []
+    prompts = []
+    bound = []
+
+    def __init__(self, model, temperature, max_tokens):
+        pass
+
+    def bind(self, **kwargs):
+        self.bound.append(kwargs)
+        return self
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return AIMessage(content=self.replies.pop(0))
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+
+def test_structured_review_retries_invalid_json_once():
+    review = {'score': 88, 'feedback': "- Sharpen the hook.", 'polished_content': "the polished draft"}
+    state = build_initial_state("remote work", settings={'editor_mode': "structured", 'virality_threshold': 75})
+    state['draft_content'] = "the draft"
+
+    with mock.patch("tools.groq_llm._get_llm", JSONEditorLLM), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False):
+        for agent in (chief_editor_agent, lambda state: asyncio.run(achief_editor_agent(state))):
+            # Not JSON, then valid JSON: one retry
+            JSONEditorLLM.replies = ["SCORE: 88, looks good", json.dumps(review)]
+            JSONEditorLLM.prompts = []
+            JSONEditorLLM.bound = []
+            update = agent(state)
+
+            assert JSONEditorLLM.bound == [{'response_format': {"type": "json_object"}}]
+            prompts = JSONEditorLLM.prompts
+            assert len(prompts) == 2 and prompts[0] == prompts[1]
+            assert update['virality_score'] == 88
+            assert update['editor_feedback'] == "- Sharpen the hook."
+            assert update['final_content'] == "the polished draft"
+            assert update['status'] == 'approved'
+
+            # Still invalid after the retry (score out of range): the node fails
+            JSONEditorLLM.replies = ["{}", json.dumps({**review, 'score': 140})]
+            assert agent(state)['status'] == 'failed'
+            assert JSONEditorLLM.replies == []
@@ -0,0 +1,164 @@
+"""Async jobs: the SQLite job store, leased workers and completion webhooks."""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.admission import AdmissionController
+from api.jobs import JobWorkerPool, check_webhook_url, webhook_signature
+from api.routes import router
+from tools.job_store import JobStore
+
+
+def fake_backends():
+    return [
+        mock.patch("config.FAKE_GROQ", True),
+        mock.patch("config.FAKE_TAVILY", True),
+        mock.patch("config.FAKE_GROQ_LATENCY_MS", 1),
+        mock.patch("config.FAKE_TAVILY_LATENCY_MS", 1),
+        mock.patch("config.FAKE_TAIL_RATE", 0),
+        mock.patch("config.LLM_CACHE_ENABLED", False),
+        mock.patch("config.RATE_LIMIT_ENABLED", False),
+        mock.patch("config.RESEARCH_CACHE_ENABLED", False),
+    ]
+
+
+def test_expired_leases_are_reclaimed_and_stale_workers_shut_out(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    store = JobStore(path, max_attempts=2)
+    # A second process on the same file
+    other = JobStore(path, max_attempts=2)
+    
+    first = store.submit({'topic': "first"})
+    second = store.submit({'topic': "second"})
+    assert store.claim("a", lease_seconds=0.05)['id'] == first['id']
+    assert other.claim("b", lease_seconds=60)['id'] == second['id']
+    assert other.claim("b", lease_seconds=60) is None
+    
+    # Worker a stops renewing; b takes the job over and a's writes are refused
+    time.sleep(0.1)
+    reclaimed = other.claim("b", lease_seconds=0.05)
+    assert reclaimed['id'] == first['id'] and reclaimed['attempts'] == 2
+    assert not store.save_progress(first['id'], "a", {'node': "trend_scout"}, 60)
+    assert not store.finish(first['id'], "a", result={})
+    
+    # Abandoned once more, the job has used up its attempts
+    time.sleep(0.1)
+    assert store.claim("a", lease_seconds=60) is None
+    assert store.get(first['id'])['status'] == "failed"
+    
+    assert other.finish(second['id'], "b", result={'final_content': "done"})
+    assert store.get(second['id'])['result'] == {'final_content': "done"}
+    assert store.stats() == {'queued': 0, 'running': 0, 'succeeded': 1, 'failed': 1}
+
+
+def test_job_runs_on_a_worker_and_calls_its_webhook(tmp_path):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+    
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    delivered = []
+    
+    async def webhook(self, url, content=None, headers=None):
+        delivered.append((url, content, headers))
+        return httpx.Response(200 if len(delivered) > 1 else 503)
+    
+    patches = fake_backends() + [
+        mock.patch("api.routes.get_job_store", lambda: store),
+        mock.patch("config.JOB_EXTERNAL_WORKERS", True),
+        mock.patch("config.JOB_WEBHOOK_ALLOWED_HOSTS", "example.com"),
+        mock.patch("config.JOB_WEBHOOK_SECRET", "s3cret"),
+        mock.patch("config.RATE_LIMIT_BACKOFF_BASE", 0.01),
+        mock.patch("httpx.AsyncClient.post", webhook),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        body = {'topic': "AI agents", 'settings': {'research_fanout': 1}, 'webhook_url': "https://example.com/hook"}
+        submitted = client.post("/api/jobs", json=body)
+        assert submitted.status_code == 202
+        job_id = submitted.json()['id']
+        assert submitted.json()['status'] == "queued"
+        
+        admission = AdmissionController(slots=1, queue_size=0, max_wait=5)
+        pool = JobWorkerPool(store, lease_seconds=30, admission=admission)
+        assert asyncio.run(pool.run_once())
+        assert not asyncio.run(pool.run_once())
+        job = client.get(f"/api/jobs/{job_id}").json()
+    finally:
+        for p in patches:
+            p.stop()
+    
+    assert job['status'] == "succeeded" and job['attempts'] == 1
+    # The partial state saved after the last node matches the result
+    assert job['partial']['virality_score'] == job['result']['virality_score']
+    assert job['result']['final_content']
+    assert job['webhook_status'] == "delivered"
+    # The job ran in one of the process's workflow slots
+    assert admission.stats()['admitted'] == 1 and admission.stats()['in_use'] == 0
+    
+    # The first delivery got a 503 and was retried
+    assert len(delivered) == 2
+    url, content, headers = delivered[-1]
+    assert url == "https://example.com/hook"
+    payload = json.loads(content)
+    assert payload['id'] == job_id and payload['result'] == job['result']
+    assert headers['X-Webhook-Signature'] == webhook_signature(content, "s3cret")
+    
+    assert client.get("/api/jobs/missing").status_code == 404
+
+
+def test_jobs_need_workers_and_webhooks_must_point_outside_the_network(tmp_path):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    
+    def resolve(host, port, *args, **kwargs):
+        address = "93.184.216.34" if host == "hooks.example.com" else "10.0.0.7"
+        return [(2, 1, 6, "", (address, port))]
+    
+    with mock.patch("socket.getaddrinfo", resolve):
+        check_webhook_url("https://hooks.example.com/done")
+        # Resolves into the private network (e.g. DNS pointing inside)
+        with pytest.raises(ValueError):
+            check_webhook_url("https://internal.example.com/done")
+    
+    for url in ("http://127.0.0.1:8000/admin", "http://169.254.169.254/latest/meta-data",
+                "http://192.168.1.10/", "http://[::1]/", "http://[::ffff:127.0.0.1]/", "ftp://example.com/"):
+        with pytest.raises(ValueError):
+            check_webhook_url(url)
+    
+    with mock.patch("config.JOB_WEBHOOK_ALLOWED_HOSTS", "hooks.internal"):
+        check_webhook_url("http://hooks.internal/done")
+        with pytest.raises(ValueError):
+            check_webhook_url("https://example.com/done")
+    
+    body = {'topic': "AI agents", 'webhook_url': "http://169.254.169.254/latest/meta-data"}
+    with mock.patch("api.routes.get_job_store", lambda: store), \
+            mock.patch("config.GROQ_API_KEY", "test"), \
+            mock.patch("config.TAVILY_API_KEY", "test"):
+        # No worker started (e.g. Mangum runs no lifespan): nothing would run the job
+        unserved = client.post("/api/jobs", json={'topic': "AI agents"})
+        unserved_metrics = client.get("/api/metrics").text
+        with mock.patch("config.JOB_EXTERNAL_WORKERS", True):
+            refused = client.post("/api/jobs", json=body)
+            served_metrics = client.get("/api/metrics").text
+    
+    assert unserved.status_code == 503
+    assert refused.status_code == 400
+    assert store.stats()['queued'] == 0
+    # The job queue is only reported (and its file opened) where workers serve it
+    assert "viral_agent_jobs_" not in unserved_metrics
+    assert "viral_agent_jobs_queued 0" in served_metrics
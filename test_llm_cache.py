@@ -0,0 +1,163 @@
+"""LLM response cache: TTL expiry, memory LRU, disk trimming, hit-rate stats and a locked disk tier."""
+
+import asyncio
+import os
+import sqlite3
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agents.trend_scout import research_topic
+from tools.groq_llm import agenerate_content
+from tools.llm_cache import LLMCache, cache_key
+from workflow.graph import build_initial_state
+
+
+class Clock:
+    """Settable stand-in for time.time."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def disk_rows(cache):
+    return cache._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def test_cache_key_covers_every_setting():
+    key = cache_key("m", "prompt", 0.2, 100)
+    assert key == cache_key("m", "prompt", 0.2, 100)
+    assert len({key, cache_key("m2", "prompt", 0.2, 100), cache_key("m", "prompt!", 0.2, 100),
+                cache_key("m", "prompt", 0.3, 100), cache_key("m", "prompt", 0.2, 200)}) == 5
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    clock = Clock()
+    with mock.patch("time.time", clock):
+        cache = LLMCache(str(tmp_path / "cache.sqlite"), ttl=60)
+        cache.set("a", "answer")
+        clock.now += 59
+        assert cache.get("a") == "answer"
+
+        # Expired in memory and on disk; another process sees the same
+        clock.now += 1
+        assert cache.get("a") is None
+        assert LLMCache(str(tmp_path / "cache.sqlite"), ttl=60).get("a") is None
+
+
+def test_memory_lru_evicts_the_least_recently_used(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), max_memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+
+    # b was least recently used; it is still on disk
+    assert list(cache._memory) == ["a", "c"]
+    assert cache.stats()['evictions'] == 1
+    assert cache.get("b") == "2"
+    assert cache.stats()['disk_hits'] == 1 and list(cache._memory) == ["c", "b"]
+
+
+def test_disk_is_trimmed_every_50_writes(tmp_path):
+    clock = Clock()
+    with mock.patch("time.time", clock):
+        cache = LLMCache(str(tmp_path / "cache.sqlite"), ttl=100, max_disk_entries=10)
+        cache.set("old", "expires")
+        clock.now += 200
+        for i in range(LLMCache.TRIM_EVERY - 2):
+            clock.now += 1
+            cache.set(f"key-{i}", str(i))
+        assert disk_rows(cache) == LLMCache.TRIM_EVERY - 1
+
+        # The 50th write trims: the expired row, then all but the 10 most recently used
+        clock.now += 1
+        cache.set("last", "value")
+        assert disk_rows(cache) == 10
+        assert cache.stats()['evictions'] == LLMCache.TRIM_EVERY - 10
+        kept = {row[0] for row in cache._db.execute("SELECT key FROM llm_cache")}
+        assert kept == {f"key-{i}" for i in range(39, 48)} | {"last"}
+
+
+def test_stats_report_the_hit_rate(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    LLMCache(path).set("a", "1")
+
+    cache = LLMCache(path)
+    assert cache.stats()['hit_rate'] == 0.0
+    assert cache.get("a") == "1"
+    assert cache.get("a") == "1"
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+    assert stats['memory_entries'] == 1
+
+
+class AnalysisLLM:
+    calls = 0
+
+    def __init__(self, model, temperature, max_tokens):
+        pass
+
+    def invoke(self, prompt, **kwargs):
+        AnalysisLLM.calls += 1
+        return AIMessage(content="ANGLE 1: A\nWHY VIRAL: B\nSUMMARY: C")
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+
+def test_trend_scout_analysis_bypasses_the_cache():
+    cache = LLMCache(path=None)
+    search = [{'title': "T", 'url': "https://example.com", 'content': "C", 'score': 1.0}]
+    with mock.patch("tools.groq_llm._get_llm", AnalysisLLM), \
+            mock.patch("tools.groq_llm.get_llm_cache", lambda: cache), \
+            mock.patch("agents.trend_scout.search_trending_content", lambda *args, **kwargs: search), \
+            mock.patch("config.LLM_CACHE_ENABLED", True), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False):
+        state = build_initial_state("remote work")
+        research_topic(state)
+        research_topic(state)
+
+    assert AnalysisLLM.calls == 2
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_a_locked_disk_cache_falls_back_to_the_network(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    LLMCache(path).set(cache_key("m", "cached prompt", 0.2, 100), "cached answer")
+    cache = LLMCache(path, busy_timeout=0.05)
+
+    # Another process holds the write lock
+    locker = sqlite3.connect(path, isolation_level=None)
+    locker.execute("BEGIN IMMEDIATE")
+    AnalysisLLM.calls = 0
+    try:
+        with mock.patch("tools.groq_llm._get_llm", AnalysisLLM), \
+                mock.patch("tools.groq_llm.get_llm_cache", lambda: cache), \
+                mock.patch("config.LLM_CACHE_ENABLED", True), \
+                mock.patch("config.RATE_LIMIT_ENABLED", False):
+            # The hit can't be recorded, so it is a miss; the new answer isn't stored
+            for prompt in ("cached prompt", "new prompt"):
+                content = asyncio.run(agenerate_content(prompt, model="m", temperature=0.2, max_tokens=100))
+                assert content.startswith("ANGLE 1")
+    finally:
+        locker.execute("ROLLBACK")
+        locker.close()
+
+    assert AnalysisLLM.calls == 2
+    stats = cache.stats()
+    assert (stats['misses'], stats['errors']) == (2, 3)
+    # Once the lock is gone the disk tier works again
+    cache.set("after", "stored")
+    assert LLMCache(path).get("after") == "stored"
+    assert LLMCache(path).get(cache_key("m", "cached prompt", 0.2, 100)) == "cached answer"
@@ -0,0 +1,87 @@
+"""LLM client pool: reuse per (model, temperature, max_tokens) and per-loop connection pools."""
+
+import asyncio
+import os
+import sys
+import threading
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import pytest
+
+from tools.llm_pool import LLMClientPool
+
+
+@pytest.fixture(autouse=True)
+def groq_key():
+    with mock.patch("config.GROQ_API_KEY", "test-key"):
+        yield
+
+
+def test_clients_are_reused_per_model_temperature_and_max_tokens():
+    pool = LLMClientPool(max_clients=3)
+    llm = pool.get("model-a", 0.7, 100)
+    assert pool.get("model-a", 0.7, 100) is llm
+    assert llm.model_name == "model-a" and llm.temperature == 0.7 and llm.max_tokens == 100
+
+    # Any setting that differs is another client, on the same connection pool
+    others = [pool.get("model-b", 0.7, 100), pool.get("model-a", 0.2, 100), pool.get("model-a", 0.7, 300)]
+    assert len({id(llm), *map(id, others)}) == 4
+    assert all(other.client is llm.client for other in others)
+
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['clients']) == (1, 4, 1, 3)
+
+    # The least recently used client was evicted
+    assert pool.get("model-a", 0.7, 300) is others[2]
+    assert pool.get("model-a", 0.7, 100) is not llm
+
+
+def test_each_event_loop_gets_its_own_pool_closed_when_the_loop_ends():
+    pool = LLMClientPool()
+    sync_llm = pool.get("model-a", 0.7, 100)
+
+    async def use_pool():
+        llm = pool.get("model-a", 0.7, 100)
+        assert pool.get("model-a", 0.7, 100) is llm
+        scope = pool._loop_scopes[asyncio.get_running_loop()]
+        assert llm.async_client is scope.completions
+        http_client = scope.http_client
+        assert not http_client.is_closed
+        return llm, http_client
+
+    llm, http_client = asyncio.run(use_pool())
+
+    assert llm is not sync_llm
+    assert pool.stats()['hits'] == 1 and pool.stats()['misses'] == 2
+    # asyncio.run shut the loop down, which closed its connection pool
+    assert http_client.is_closed
+    assert pool.stats()['event_loops'] == 0
+
+    # A new loop starts with a fresh pool
+    _, next_client = asyncio.run(use_pool())
+    assert next_client is not http_client and next_client.is_closed
+
+
+def test_aclose_closes_the_pools_of_other_running_loops():
+    pool = LLMClientPool()
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+
+    async def open_scope():
+        pool.get("model-a", 0.7, 100)
+        return pool._loop_scopes[asyncio.get_running_loop()].http_client
+
+    try:
+        other_client = asyncio.run_coroutine_threadsafe(open_scope(), other).result(5)
+        assert pool.stats()['event_loops'] == 1
+
+        asyncio.run(pool.aclose())
+        assert other_client.is_closed
+        assert pool.stats()['event_loops'] == 0
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(5)
+        other.close()
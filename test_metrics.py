@@ -0,0 +1,172 @@
+"""Observability: /api/metrics, the per-request timings block and tracing."""
+
+import asyncio
+import json
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from api.routes import router
+from utils.tracing import TraceMiddleware, flush_traces
+from workflow.graph import arun_workflow
+
+
+class FakeLLM:
+    """Fake chat model that approves the first draft and reports token usage."""
+
+    calls = 0
+
+    def __init__(self, model, temperature, max_tokens):
+        self.model = model
+
+    async def ainvoke(self, prompt, **kwargs):
+        FakeLLM.calls += 1
+        if "evaluating social media content" in prompt:
+            content = "SCORE: 92\n\nFEEDBACK:\n- Ship it."
+        else:
+            content = "ANGLE 1: A\nWHY VIRAL: B\nSUMMARY: C"
+        return AIMessage(
+            content=content,
+            usage_metadata={'input_tokens': 100, 'output_tokens': 10, 'total_tokens': 110}
+        )
+
+
+async def fake_search(self, *args, **kwargs):
+    return {'results': [{'title': 'T', 'url': 'https://example.com', 'content': 'C', 'score': 1.0}]}
+
+
+def metric_value(text, sample):
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def fake_backends():
+    return [
+        mock.patch("tools.groq_llm._get_llm", FakeLLM),
+        mock.patch("tavily.AsyncTavilyClient.search", fake_search),
+        mock.patch("config.GROQ_API_KEY", "test"),
+        mock.patch("config.TAVILY_API_KEY", "test"),
+        mock.patch("config.LLM_CACHE_ENABLED", False),
+        mock.patch("config.RATE_LIMIT_ENABLED", False),
+        mock.patch("config.RESEARCH_CACHE_ENABLED", False),
+    ]
+
+
+def test_workflow_run_is_recorded_in_metrics():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    model = "metrics-test-model"
+    runs = '{status="approved"}'
+    tokens = f'viral_agent_llm_tokens_total{{model="{model}",type="prompt"}}'
+    before = client.get("/api/metrics").text
+    FakeLLM.calls = 0
+
+    patches = fake_backends()
+    for p in patches:
+        p.start()
+    try:
+        final_state = asyncio.run(arun_workflow("AI agents", settings={'model': model, 'research_fanout': 1}))
+    finally:
+        for p in patches:
+            p.stop()
+
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    after = response.text
+
+    assert final_state['status'] == 'approved'
+    assert metric_value(after, "viral_agent_workflows_total" + runs) == metric_value(before, "viral_agent_workflows_total" + runs) + 1
+    assert metric_value(after, "viral_agent_workflows_in_flight") == 0
+    assert FakeLLM.calls > 0
+    assert metric_value(after, tokens) == metric_value(before, tokens) + 100 * FakeLLM.calls
+    for node in ("trend_scout", "ghostwriter", "chief_editor"):
+        assert metric_value(after, f'viral_agent_node_seconds_count{{node="{node}"}}') >= 1
+    assert metric_value(after, 'viral_agent_tool_call_seconds_count{tool="tavily",model=""}') >= 1
+    assert 'viral_agent_workflow_final_score_bucket{le="95"}' in after
+    assert "viral_agent_llm_cache_hit_rate" in after
+
+
+def test_generate_returns_timings_when_asked():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    patches = fake_backends()
+    for p in patches:
+        p.start()
+    try:
+        FakeLLM.calls = 0
+        body = {'topic': "AI agents", 'settings': {'research_fanout': 2}}
+        plain = client.post("/api/generate", json=body).json()
+        timed = client.post("/api/generate", json={**body, 'include_timings': True}).json()
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert plain['timings'] is None
+    timings = timed['timings']
+    assert [node['name'] for node in timings['nodes']] == ["trend_scout", "ghostwriter", "chief_editor"]
+    assert [step['name'] for step in timings['steps']] == ["scout_search", "scout_analysis", "draft", "review", "polish"]
+
+    # Every call is attributed to the node and step that made it
+    searches = [call for call in timings['calls'] if call['tool'] == "tavily"]
+    assert len(searches) == 2 and all(call['step'] == "scout_search" for call in searches)
+    llm_calls = [call for call in timings['calls'] if call['tool'] == "groq"]
+    assert [call['step'] for call in llm_calls] == ["scout_analysis", "draft", "review", "polish"]
+    assert all(call['prompt_tokens'] == 100 and call['completion_tokens'] == 10 for call in llm_calls)
+    assert timings['prompt_tokens'] == 400
+    assert timings['cache_hits'] == {'llm': 0, 'research': 0}
+
+
+def test_sampled_request_is_traced_end_to_end(tmp_path):
+    app = FastAPI()
+    app.add_middleware(TraceMiddleware)
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    trace_path = str(tmp_path / "traces.jsonl")
+    patches = fake_backends() + [
+        mock.patch("config.TRACE_SAMPLE_RATE", 1.0),
+        mock.patch("config.TRACE_PATH", trace_path),
+        mock.patch("utils.tracing._span_exporter", None),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        FakeLLM.calls = 0
+        response = client.post("/api/generate", json={'topic': "AI agents", 'settings': {'research_fanout': 1}})
+        flush_traces()
+    finally:
+        for p in patches:
+            p.stop()
+
+    trace_id = response.headers["x-trace-id"]
+    with open(trace_path) as f:
+        spans = [json.loads(line) for line in f]
+    assert {s['trace_id'] for s in spans} == {trace_id}
+
+    by_id = {s['span_id']: s for s in spans}
+
+    def parent_name(s):
+        return by_id[s['parent_span_id']]['name'] if s['parent_span_id'] else None
+
+    names = {s['name']: parent_name(s) for s in spans}
+    assert names["POST /api/generate"] is None
+    assert names["node trend_scout"] == "POST /api/generate"
+    assert names["asearch_trending_content"] == "node trend_scout"
+    assert names["tavily call"] == "asearch_trending_content"
+    # Every Groq call sits under agenerate_content under its node
+    groq_calls = [s for s in spans if s['name'] == "groq call"]
+    assert len(groq_calls) == FakeLLM.calls
+    assert all(parent_name(by_id[s['parent_span_id']]).startswith("node ") for s in groq_calls)
@@ -0,0 +1,185 @@
+"""Rate limits: shared token buckets, 429/Retry-After handling and stream retries."""
+
+import asyncio
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import httpx
+import pytest
+import requests
+
+from tools.rate_limiter import (
+    RateLimiter, _aretry_plan, _retry_plan, acall_with_limits, astream_with_limits, call_with_limits, is_transient,
+    stream_with_limits
+)
+from utils.deadline import DeadlineExceeded
+
+
+class Clock:
+    """Settable stand-in for time.time."""
+    
+    def __init__(self, now=1000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+def http_error(status, headers=None):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+def test_buckets_refill_and_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "limits.sqlite")
+    clock = Clock()
+    # 2 requests per minute, 300 tokens per minute
+    limits = [("m:rpm", 1, 2, 2 / 60), ("m:tpm", 100, 300, 5)]
+    
+    with mock.patch("time.time", clock):
+        limiter = RateLimiter(path)
+        other = RateLimiter(path)
+        assert limiter.try_acquire(limits) == 0.0
+        assert asyncio.run(other.aacquire(limits)) is None
+        # Both workers drew on the same RPM bucket: the next request waits 30s
+        assert limiter.try_acquire(limits) == pytest.approx(30)
+        
+        clock.now += 30
+        assert other.try_acquire(limits) == 0.0
+        
+        # TPM: 300 - 3 x 100 + 30s x 5 refilled = 150 left; a 200-token call waits 10s
+        assert limiter.try_acquire([("m:tpm", 200, 300, 5)]) == pytest.approx(10)
+        
+        # Refunds are capped at the bucket's capacity
+        limiter.refund(limits[1], 1000)
+        asyncio.run(other.arefund(limits[1], 1000))
+        assert limiter.try_acquire([("m:tpm", 300, 300, 5)]) == 0.0
+
+
+def test_429_retry_after_blocks_the_buckets_for_every_caller(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "limits.sqlite"))
+    limits = [("m:rpm", 1, 60, 1.0)]
+    
+    with mock.patch("tools.rate_limiter.get_rate_limiter", lambda: limiter), \
+            mock.patch("config.RATE_LIMIT_MAX_RETRIES", 2), \
+            mock.patch("config.RATE_LIMIT_BACKOFF_BASE", 0.5):
+        # The block, not a sleep, makes the next acquire wait
+        assert _retry_plan(http_error(429, {'retry-after': "7"}), 0, limits, None, "Groq") == 0.0
+        assert limiter.try_acquire(limits) == pytest.approx(7, abs=0.1)
+        
+        reset = http_error(429, {'x-ratelimit-reset-requests': "2m59.56s"})
+        assert asyncio.run(_aretry_plan(reset, 1, limits, None, "Groq")) == 0.0
+        assert limiter.try_acquire(limits) == pytest.approx(179.56, abs=0.1)
+        assert limiter.stats()['blocks'] == 2
+        
+        # 5xx backs off without blocking anyone else
+        delay = _retry_plan(http_error(503), 0, [("other:rpm", 1, 60, 1.0)], None, "Groq")
+        assert 0 <= delay <= 0.5
+        assert limiter.try_acquire([("other:rpm", 1, 60, 1.0)]) == 0.0
+        
+        # No retry: out of attempts, not retryable, or past the deadline
+        assert _retry_plan(http_error(429), 2, limits, None, "Groq") is None
+        assert _retry_plan(http_error(400), 0, limits, None, "Groq") is None
+        assert _retry_plan(http_error(429, {'retry-after': "7"}), 0, limits, 0.0, "Groq") is None
+
+
+def test_streams_retry_only_before_their_first_chunk():
+    opened = []
+    
+    def flaky_stream(left):
+        opened.append(left)
+        if len(opened) == 1:
+            raise httpx.ConnectError("connection refused")
+        yield "a"
+        yield "b"
+    
+    def broken_stream(left):
+        opened.append(left)
+        yield "a"
+        raise httpx.ConnectError("connection reset")
+    
+    async def abroken_stream(left):
+        opened.append(left)
+        yield "a"
+        raise httpx.ConnectError("connection reset")
+    
+    async def collect(stream):
+        return [chunk async for chunk in stream]
+    
+    with mock.patch("tools.rate_limiter.get_rate_limiter", lambda: RateLimiter(None)), \
+            mock.patch("config.RATE_LIMIT_MAX_RETRIES", 2), \
+            mock.patch("config.RATE_LIMIT_BACKOFF_BASE", 0.01):
+        assert list(stream_with_limits(flaky_stream, [])) == ["a", "b"]
+        assert len(opened) == 2
+        
+        # Chunks already went out: the error is raised, not retried
+        opened.clear()
+        chunks = []
+        with pytest.raises(httpx.ConnectError):
+            for chunk in stream_with_limits(broken_stream, []):
+                chunks.append(chunk)
+        assert chunks == ["a"] and len(opened) == 1
+        
+        opened.clear()
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(collect(astream_with_limits(abroken_stream, [])))
+        assert len(opened) == 1
+
+
+def test_no_call_starts_without_more_than_the_minimum_timeout_left():
+    calls = []
+    
+    def flaky(left):
+        calls.append(left)
+        raise httpx.ConnectError("connection refused")
+    
+    async def aflaky(left):
+        return flaky(left)
+    
+    with mock.patch("tools.rate_limiter.get_rate_limiter", lambda: RateLimiter(None)), \
+            mock.patch("config.RATE_LIMIT_MAX_RETRIES", 3), \
+            mock.patch("config.RATE_LIMIT_BACKOFF_BASE", 0.01):
+        # At or below the 0.5s floor nothing is called
+        for timeout in (0.5, 0.0, -1.0):
+            with pytest.raises(DeadlineExceeded):
+                call_with_limits(flaky, [], timeout)
+            with pytest.raises(DeadlineExceeded):
+                asyncio.run(acall_with_limits(aflaky, [], timeout))
+        assert calls == []
+        
+        # A retry that would leave the floor or less gives up with the call's own error
+        with mock.patch("tools.rate_limiter.backoff_delay", lambda attempt: 0.1):
+            with pytest.raises(httpx.ConnectError):
+                call_with_limits(flaky, [], 0.55)
+        assert len(calls) == 1 and 0.5 < calls[0] <= 0.55
+
+
+def test_sync_tavily_errors_from_requests_are_retried():
+    unavailable = requests.Response()
+    unavailable.status_code = 503
+    errors = [
+        requests.ConnectionError("connection refused"),
+        requests.Timeout("read timed out"),
+        requests.HTTPError("503 Server Error", response=unavailable),
+    ]
+    attempts = []
+    
+    def flaky(left):
+        attempts.append(left)
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return "results"
+    
+    with mock.patch("tools.rate_limiter.get_rate_limiter", lambda: RateLimiter(None)), \
+            mock.patch("config.RATE_LIMIT_MAX_RETRIES", 3), \
+            mock.patch("config.RATE_LIMIT_BACKOFF_BASE", 0.01):
+        assert call_with_limits(flaky, []) == "results"
+    assert len(attempts) == 4
+    
+    bad_request = requests.Response()
+    bad_request.status_code = 400
+    assert not is_transient(requests.HTTPError("400 Client Error", response=bad_request))
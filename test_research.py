@@ -0,0 +1,255 @@
+"""Trend Scout research: query fan-out, URL dedupe, reciprocal-rank fusion and the research cache."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import pytest
+
+from agents import trend_scout
+from tools.research_cache import ResearchCache, normalize_topic
+from tools.tavily_search import (
+    RRF_K,
+    asearch_trending_content,
+    canonical_url,
+    fuse_results,
+    merge_query_results,
+    search_trending_content
+)
+from workflow.graph import build_initial_state
+
+
+def result(url, title=""):
+    return {'title': title or url, 'url': url, 'content': "", 'score': 0.5}
+
+
+def test_canonical_url_dedupes_the_same_page():
+    same = [
+        "https://www.example.com/post/?utm_source=x&b=2&a=1",
+        "HTTPS://example.com/post?a=1&b=2&fbclid=abc",
+        "https://Example.com/post?b=2&a=1#comments",
+    ]
+    assert len({canonical_url(url) for url in same}) == 1
+    assert canonical_url("https://example.com/post?a=1") != canonical_url("https://example.com/post?a=2")
+    assert canonical_url("https://example.com/a") != canonical_url("https://example.com/b")
+
+
+def test_fusion_ranks_pages_found_by_several_queries_first():
+    news = [result("https://a.com/1"), result("https://b.com/2"), result("https://c.com/3")]
+    contrarian = [result("https://d.com/4"), result("https://www.c.com/3/"), result("https://b.com/2?utm_medium=x")]
+    stats = [result("https://e.com/5")]
+
+    fused = fuse_results([news, contrarian, stats], max_results=4)
+
+    # b and c were each found twice (ranks 2 + 3 and 3 + 2); the tie keeps first-seen order
+    assert [item['url'] for item in fused] == ["https://b.com/2", "https://c.com/3", "https://a.com/1", "https://d.com/4"]
+    assert fused[0]['fused_score'] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 3))
+    # max_results is the budget across all queries, not per query
+    assert len(fuse_results([news, contrarian, stats], max_results=2)) == 2
+
+
+def test_failed_queries_are_dropped_unless_all_fail():
+    queries = ["news", "contrarian", "stats"]
+    outcomes = [RuntimeError("timeout"), [result("https://a.com/1")], [result("https://b.com/2")]]
+    merged = merge_query_results(outcomes, queries, "AI", max_results=5)
+    assert {item['url'] for item in merged} == {"https://a.com/1", "https://b.com/2"}
+
+    with pytest.raises(RuntimeError, match="first"):
+        merge_query_results([RuntimeError("first"), RuntimeError("second")], queries[:2], "AI", max_results=5)
+
+
+class FanOutClient:
+    """Tavily client stand-in: the contrarian query fails, every search records its options."""
+
+    searches = []
+
+    def __init__(self, api_key=None):
+        pass
+
+    def respond(self, query, max_results, kwargs):
+        self.searches.append((query, kwargs))
+        if "controversial" in query:
+            raise RuntimeError("Tavily is down")
+        slug = query.split()[1]
+        return {'results': [result(f"https://{slug}.com/{i}") for i in range(max_results)] + [result("https://shared.com/x")]}
+
+    def search(self, query, max_results=5, **kwargs):
+        return self.respond(query, max_results, kwargs)
+
+
+class AsyncFanOutClient(FanOutClient):
+
+    async def search(self, query, max_results=5, **kwargs):
+        return self.respond(query, max_results, kwargs)
+
+
+def test_fan_out_merges_surviving_queries_and_passes_the_deadline():
+    FanOutClient.searches = []
+    with mock.patch("tools.tavily_search.TavilyClient", FanOutClient), \
+            mock.patch("tools.tavily_search.AsyncTavilyClient", AsyncFanOutClient), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.FAKE_TAVILY", False), \
+            mock.patch("config.CASSETTE_MODE", ""):
+        results = search_trending_content("AI", max_results=3, width=3, timeout=5)
+        sync_searches = list(FanOutClient.searches)
+
+        FanOutClient.searches = []
+        aresults = asyncio.run(asearch_trending_content("AI", max_results=3, width=3))
+
+    assert len(sync_searches) == 3
+    # Each search is bounded by what is left of the deadline
+    assert all(0 < kwargs['timeout'] <= 5 for _, kwargs in sync_searches)
+    assert all('timeout' not in kwargs for _, kwargs in FanOutClient.searches)
+
+    # The failed query is dropped; the page both others found ranks first
+    assert len(results) == 3 and results[0]['url'] == "https://shared.com/x"
+    assert [item['url'] for item in aresults] == [item['url'] for item in results]
+
+
+class Clock:
+    """Settable stand-in for time.time."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def angles(title):
+    return [{'title': title, 'why_viral': "", 'summary': ""}]
+
+
+# Research settings of a run with the default configuration
+DEFAULTS = trend_scout.research_settings(build_initial_state("AI agents"))
+
+
+def test_normalize_topic_folds_case_punctuation_and_spacing():
+    assert normalize_topic("  AI Agents!! ") == normalize_topic("ai   agents") == "ai agents"
+    assert normalize_topic("Remote-work: pros/cons") == "remote work pros cons"
+    # NFKC folds full-width letters
+    assert normalize_topic("ＡＩ agents") == "ai agents"
+    assert normalize_topic("AI agents") != normalize_topic("AI agent")
+
+
+def test_research_cache_entries_go_fresh_then_stale_then_expire(tmp_path):
+    path = str(tmp_path / "research.sqlite")
+    clock = Clock()
+    cache = ResearchCache(path, ttl=60, max_stale=600, clock=clock)
+    cache.set("AI Agents", [result("https://a.com/1")], angles("first"))
+
+    entry, fresh = cache.get("ai agents!")
+    assert fresh and entry['angles'] == angles("first") and entry['fetched_at'] == 1000.0
+
+    # Past the TTL: still served, but stale; another process sees the same
+    clock.now += 61
+    assert cache.get("AI agents")[1] is False
+    assert ResearchCache(path, ttl=60, max_stale=600, clock=clock).get("AI agents")[1] is False
+
+    # Past max_stale: a miss
+    clock.now += 540
+    assert cache.get("AI agents") is None
+    assert cache.get("another topic") is None
+
+    stats = cache.stats()
+    assert (stats['fresh_hits'], stats['stale_hits'], stats['misses']) == (1, 1, 2)
+    assert stats['hit_rate'] == pytest.approx(0.5)
+
+
+def test_only_one_refresh_claims_a_topic():
+    cache = ResearchCache(path=None)
+    assert cache.start_refresh("AI agents", DEFAULTS)
+    assert not cache.start_refresh("ai AGENTS!", DEFAULTS)
+    assert cache.start_refresh("remote work", DEFAULTS)
+    # Research with other settings is another entry, refreshed on its own
+    assert cache.start_refresh("AI agents", ("other-model", 0.8, 1))
+
+    cache.finish_refresh("AI Agents", DEFAULTS)
+    assert cache.start_refresh("ai agents", DEFAULTS)
+    assert cache.stats()['refreshes'] == 4
+
+
+def test_research_is_cached_per_model_temperature_and_fanout():
+    cache = ResearchCache(path=None)
+    with mock.patch("agents.trend_scout.get_research_cache", lambda: cache), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", True):
+        trend_scout.store_research(build_initial_state("AI agents"), [], angles("default"))
+        assert trend_scout.lookup_research(build_initial_state("ai agents!"))[0]['angles'] == angles("default")
+
+        for settings in ({'model': "other-model"}, {'scout_temperature': 0.2}, {'research_fanout': 3}):
+            assert trend_scout.lookup_research(build_initial_state("AI agents", settings=settings)) is None
+
+
+def stale_cache():
+    clock = Clock()
+    cache = ResearchCache(path=None, ttl=60, max_stale=600, clock=clock)
+    cache.set("AI agents", [], angles("old"), DEFAULTS)
+    clock.now += 120
+    return cache
+
+
+def test_stale_research_is_served_while_one_background_refresh_runs():
+    cache = stale_cache()
+    started = threading.Event()
+    release = threading.Event()
+    refreshes = []
+
+    def slow_research(state):
+        refreshes.append(state['deadline_at'])
+        started.set()
+        release.wait(5)
+        return [], angles("new")
+
+    state = build_initial_state("ai agents", deadline_ms=30000)
+    with mock.patch("agents.trend_scout.get_research_cache", lambda: cache), \
+            mock.patch("agents.trend_scout.research_topic", slow_research), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", True):
+        # Both runs get the stale angles without waiting; only one refresh starts
+        assert trend_scout.trend_scout_agent(state)['research_angles'] == angles("old")
+        assert trend_scout.trend_scout_agent(state)['research_angles'] == angles("old")
+        assert started.wait(5)
+        release.set()
+
+        waited = 0.0
+        while cache._refreshing and waited < 5:
+            time.sleep(0.01)
+            waited += 0.01
+
+    # The refresh ran without the run's deadline and replaced the entry
+    assert refreshes == [None]
+    entry, fresh = cache.get("AI agents", DEFAULTS)
+    assert fresh and entry['angles'] == angles("new")
+
+
+def test_async_stale_research_is_refreshed_in_the_background():
+    cache = stale_cache()
+    refreshes = []
+
+    async def aslow_research(state):
+        refreshes.append(state['deadline_at'])
+        await asyncio.sleep(0.05)
+        return [], angles("new")
+
+    async def run():
+        state = build_initial_state("AI agents", deadline_ms=30000)
+        first = await trend_scout.atrend_scout_agent(state)
+        second = await trend_scout.atrend_scout_agent(state)
+        assert cache.get("AI agents", DEFAULTS)[0]['angles'] == angles("old")
+        await asyncio.gather(*trend_scout._background_refreshes)
+        return first, second
+
+    with mock.patch("agents.trend_scout.get_research_cache", lambda: cache), \
+            mock.patch("agents.trend_scout.aresearch_topic", aslow_research), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", True):
+        first, second = asyncio.run(run())
+
+    assert first['research_angles'] == second['research_angles'] == angles("old")
+    assert refreshes == [None]
+    entry, fresh = cache.get("AI agents", DEFAULTS)
+    assert fresh and entry['angles'] == angles("new")
+    assert cache.start_refresh("AI agents", DEFAULTS)
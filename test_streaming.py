@@ -0,0 +1,153 @@
+"""Streaming: per-node progress events, and streamed drafts must assemble to the non-streamed text."""
+
+import asyncio
+import json
+import os
+import sys
+import uuid
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from api.models import GenerateResponse
+from api.routes import router
+from workflow.graph import arun_workflow, astream_workflow
+
+DRAFT = "1/3 Most teams ship agents 🚀\n\nwithout evals.\n---\n2/3 That is a bet, not a plan.\n---\n3/3 Measure first."
+POLISHED = "1/3 Most teams ship agents 🚀\n\nwithout evals.\n---\n2/3 That's a bet, not a plan.\n---\n3/3 Measure first."
+
+
+class ScriptedChatModel(GenericFakeChatModel):
+    """Fake streaming chat model that answers based on what the prompt asks for."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        if "viral content researcher" in prompt:
+            reply = "ANGLE 1: Evals\nWHY VIRAL: Pain point\nSUMMARY: Nobody measures agents"
+        elif "evaluating social media content" in prompt:
+            reply = "SCORE: 90\n\nFEEDBACK:\n- Use a contraction in tweet 2."
+        elif "Polish this social media post" in prompt:
+            reply = POLISHED
+        else:
+            reply = DRAFT
+        self.messages = iter([AIMessage(content=reply)])
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+async def fake_search(self, *args, **kwargs):
+    return {'results': [{'title': 'Agents', 'url': 'https://example.com', 'content': 'Body', 'score': 1.0}]}
+
+
+reviews = []
+
+
+class RevisingChatModel(ScriptedChatModel):
+    """Scripted model whose first review asks for a revision."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        if "evaluating social media content" in prompt:
+            reviews.append(prompt)
+            if len(reviews) == 1:
+                self.messages = iter([AIMessage(content="SCORE: 60\n\nFEEDBACK:\n- Open with a number.\n- Cut tweet 3.")])
+                return GenericFakeChatModel._generate(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def fake_backends(model=ScriptedChatModel):
+    return [
+        mock.patch("tools.groq_llm._get_llm", lambda *args: model(messages=iter([]))),
+        mock.patch("tavily.AsyncTavilyClient.search", fake_search),
+        mock.patch("config.TAVILY_API_KEY", "test"),
+        mock.patch("config.LLM_CACHE_ENABLED", False),
+        mock.patch("config.RATE_LIMIT_ENABLED", False),
+        mock.patch("config.RESEARCH_CACHE_ENABLED", False),
+    ]
+
+
+async def collect_stream():
+    deltas = {}
+    final_state = None
+    async for kind, data in astream_workflow("AI agents"):
+        if kind == "draft_delta":
+            deltas.setdefault((data['node'], data['iteration']), []).append(data['delta'])
+        else:
+            final_state = data['state']
+    return deltas, final_state
+
+
+def test_streamed_text_matches_non_streamed_result():
+    patches = fake_backends()
+    for p in patches:
+        p.start()
+    try:
+        deltas, streamed = asyncio.run(collect_stream())
+        plain = asyncio.run(arun_workflow("AI agents"))
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert set(deltas) == {("ghostwriter", 0), ("chief_editor", 0)}
+    # More than one chunk per text, so tokens really were streamed
+    assert all(len(chunks) > 1 for chunks in deltas.values())
+    assert "".join(deltas[("ghostwriter", 0)]) == DRAFT
+    assert "".join(deltas[("chief_editor", 0)]) == POLISHED
+
+    assert streamed['status'] == plain['status'] == 'approved'
+    assert streamed['drafts'] == plain['drafts'] == [DRAFT]
+    assert streamed['final_content'] == plain['final_content'] == POLISHED
+
+
+def test_stream_emits_one_progress_event_per_node_in_order():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    reviews.clear()
+    # A new run_id, so no checkpoint from an earlier run is resumed
+    run_id = f"stream-{uuid.uuid4().hex}"
+    patches = fake_backends(RevisingChatModel)
+    for p in patches:
+        p.start()
+    try:
+        response = client.post("/api/generate/stream", json={
+            'topic': "AI agents", 'settings': {'virality_threshold': 75}, 'run_id': run_id
+        })
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert response.status_code == 200
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    progress = [event for event in events if event['type'] == 'progress']
+    assert events[0]['type'] == 'status' and events[-1]['type'] == 'complete'
+
+    # Rejected once at 60, revised, then approved at 90
+    assert [event['node'] for event in progress] == [
+        "trend_scout", "ghostwriter", "chief_editor", "increment", "ghostwriter", "chief_editor"
+    ]
+    assert [event['data']['iteration'] for event in progress] == [0, 0, 0, 1, 1, 1]
+    scout, draft, review, increment, revision, approval = (event['data'] for event in progress)
+
+    assert scout['status'] == 'researching_complete'
+    assert [angle['title'] for angle in scout['research_angles']] == ["Evals"]
+    assert draft['draft'] == revision['draft'] == DRAFT
+    assert (review['score'], review['status']) == (60, 'needs_revision')
+    assert review['feedback'] == "- Open with a number.\n- Cut tweet 3."
+    assert 'final_content' not in review
+    assert set(increment) == {'iteration', 'status'}
+    assert (approval['score'], approval['status']) == (90, 'approved')
+    assert approval['final_content'] == POLISHED
+    assert not any('error' in data for data in (scout, draft, review, increment, revision, approval))
+
+    # The same payload /generate returns
+    complete = events[-1]['data']
+    assert set(complete) == set(GenerateResponse.model_fields)
+    assert complete['status'] == 'approved' and complete['scores'] == [60, 90]
+    assert complete['run_id'] == run_id
+    assert complete['final_content'] == POLISHED
@@ -0,0 +1,416 @@
+"""Workflow behaviour under concurrency, using fake LLM and search backends."""
+
+import asyncio
+import os
+import random
+import time
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from api.routes import router
+from tools.cassettes import cassette_stats, reset_cassette
+from tools.fake_backends import fake_backend_stats, reset_fake_backends
+from workflow.checkpoints import Checkpointer
+from workflow.graph import arun_workflow
+
+
+class RecordingLLM:
+    """Fake chat model that records its settings and signs its output with them."""
+
+    calls = []
+
+    def __init__(self, model, temperature, max_tokens):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    async def ainvoke(self, prompt):
+        # Random latency so concurrent runs interleave
+        await asyncio.sleep(random.uniform(0, 0.02))
+        self.calls.append((self.model, self.temperature, self.max_tokens, prompt))
+        if "evaluating social media content" in prompt:
+            content = "SCORE: 80\n\nFEEDBACK:\n- Sharpen the hook."
+        else:
+            content = f"[{self.model}] ANGLE 1: A\nWHY VIRAL: B\nSUMMARY: C"
+        return AIMessage(content=content)
+
+
+async def fake_search(self, *args, **kwargs):
+    await asyncio.sleep(random.uniform(0, 0.02))
+    return {'results': [{'title': 'T', 'url': 'https://example.com', 'content': 'C', 'score': 1.0}]}
+
+
+def test_concurrent_runs_keep_their_own_settings():
+    RecordingLLM.calls = []
+    runs = [
+        # (topic, settings, expected status, expected iterations)
+        ("topic-a", {'model': 'model-a', 'virality_threshold': 75, 'max_iterations': 3,
+                     'editor_temperature': 0.1}, 'approved', 0),
+        # Same draft twice in a row: converged before max_iterations
+        ("topic-b", {'model': 'model-b', 'virality_threshold': 90, 'max_iterations': 2,
+                     'editor_temperature': 0.2, 'convergence_window': 2}, 'converged', 1),
+        ("topic-c", {'model': 'model-c', 'virality_threshold': 95, 'max_iterations': 1,
+                     'editor_temperature': 0.4, 'draft_max_tokens': 300}, 'needs_revision', 1),
+    ] * 3
+
+    async def run_all():
+        return await asyncio.gather(*(
+            arun_workflow(topic, "twitter", settings) for topic, settings, _, _ in runs
+        ))
+
+    with mock.patch("tools.groq_llm._get_llm", RecordingLLM), \
+            mock.patch("tavily.AsyncTavilyClient.search", fake_search), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        results = asyncio.run(run_all())
+
+    for (topic, settings, status, iterations), state in zip(runs, results):
+        assert state['model'] == settings['model']
+        assert state['virality_threshold'] == settings['virality_threshold']
+        assert state['status'] == status
+        assert state['iteration_count'] == iterations
+        assert all(draft.startswith(f"[{settings['model']}]") for draft in state['drafts'])
+
+    # Every LLM call for a topic used that topic's model and editor settings
+    for topic, settings, _, _ in runs[:3]:
+        topic_calls = [call for call in RecordingLLM.calls if topic in call[3]]
+        assert topic_calls
+        assert {call[0] for call in topic_calls} == {settings['model']}
+        review_temps = {call[1] for call in topic_calls if "evaluating social media content" in call[3]}
+        assert review_temps == {settings['editor_temperature']}
+        if 'draft_max_tokens' in settings:
+            draft_calls = [call for call in topic_calls if "ghostwriter" in call[3]]
+            assert {call[2] for call in draft_calls} == {settings['draft_max_tokens']}
+
+
+class TemperatureScoredLLM(RecordingLLM):
+    """Fake chat model whose drafts score higher the hotter they were written."""
+
+    in_flight = 0
+    peak = 0
+
+    async def ainvoke(self, prompt):
+        cls = TemperatureScoredLLM
+        cls.in_flight += 1
+        cls.peak = max(cls.peak, cls.in_flight)
+        await asyncio.sleep(0.01)
+        cls.in_flight -= 1
+        if "evaluating social media content" in prompt:
+            temperature = float(prompt.split("draft@", 1)[1].split()[0])
+            content = f"SCORE: {int(50 + temperature * 30)}\n\nFEEDBACK:\n- Sharpen the hook."
+        elif "viral content researcher" in prompt:
+            content = "ANGLE 1: A\nWHY VIRAL: B\nSUMMARY: C"
+        else:
+            content = f"draft@{self.temperature} "
+        return AIMessage(content=content)
+
+
+def test_best_of_n_keeps_the_top_scoring_candidate():
+    TemperatureScoredLLM.peak = 0
+    with mock.patch("tools.groq_llm._get_llm", TemperatureScoredLLM), \
+            mock.patch("tavily.AsyncTavilyClient.search", fake_search), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        state = asyncio.run(arun_workflow("topic-n", "twitter", {
+            'candidates': 3, 'draft_temperature': 0.9, 'max_iterations': 1, 'virality_threshold': 100
+        }))
+
+    # Two iterations of three candidates, one kept draft per iteration
+    assert len(state['candidate_results']) == 6
+    assert {result['draft_temperature'] for result in state['candidate_results']} == {0.7, 0.9, 1.1}
+    assert state['drafts'] == ["draft@1.1 "] * 2
+    assert state['scores'] == [83, 83]
+    assert state['status'] == 'needs_revision'
+    # Candidates were drafted and reviewed concurrently
+    assert TemperatureScoredLLM.peak == 3
+
+
+class PlateauLLM(RecordingLLM):
+    """Fake chat model that writes a new draft each time and scores them 78, 79, 78, ..."""
+
+    scores = [78, 79, 78, 90]
+    drafts = 0
+
+    async def ainvoke(self, prompt):
+        if "evaluating social media content" in prompt:
+            number = int(prompt.split("draft #", 1)[1].split()[0])
+            content = f"SCORE: {self.scores[number - 1]}\n\nFEEDBACK:\n- Sharpen the hook."
+        elif "viral content researcher" in prompt:
+            content = "ANGLE 1: A\nWHY VIRAL: B\nSUMMARY: C"
+        else:
+            PlateauLLM.drafts += 1
+            content = f"draft #{PlateauLLM.drafts} " + "lorem ipsum " * PlateauLLM.drafts * 10
+        return AIMessage(content=content)
+
+
+def test_plateaued_scores_converge_on_best_draft():
+    PlateauLLM.drafts = 0
+    with mock.patch("tools.groq_llm._get_llm", PlateauLLM), \
+            mock.patch("tavily.AsyncTavilyClient.search", fake_search), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        state = asyncio.run(arun_workflow("topic-p", "twitter", {
+            'max_iterations': 5, 'virality_threshold': 85,
+            'convergence_window': 2, 'convergence_min_improvement': 2
+        }))
+
+    assert state['status'] == 'converged'
+    assert state['scores'] == [78, 79, 78]
+    assert state['iteration_count'] == 2
+    # The best-scoring draft, not the last one
+    assert state['final_content'] == state['drafts'][1]
+    assert state['virality_score'] == 79
+
+
+class SlowLLM(RecordingLLM):
+    """Fake chat model with a fixed latency per call."""
+
+    latency = 0.0
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super().ainvoke(prompt)
+
+
+def test_deadline_returns_best_draft_in_time():
+    async def slow_search(self, *args, **kwargs):
+        await asyncio.sleep(SlowLLM.latency)
+        return await fake_search(self)
+
+    results = {}
+    with mock.patch("tools.groq_llm._get_llm", SlowLLM), \
+            mock.patch("tavily.AsyncTavilyClient.search", slow_search), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        for latency, deadline_ms in ((0.05, 2000), (5.0, 800)):
+            SlowLLM.latency = latency
+            start = time.perf_counter()
+            state = asyncio.run(arun_workflow("topic-d", "twitter", {
+                'max_iterations': 5, 'virality_threshold': 95
+            }, deadline_ms=deadline_ms))
+            results[latency] = (state, time.perf_counter() - start)
+
+    # Fast upstream: one round fits, another would not (15s reserve)
+    state, elapsed = results[0.05]
+    assert state['status'] == 'deadline_reached'
+    assert state['scores'] == [80]
+    assert state['final_content'] == state['drafts'][0]
+    assert elapsed < 2.0
+
+    # Upstream slower than the whole budget: calls are cut off at the deadline
+    state, elapsed = results[5.0]
+    assert state['status'] == 'deadline_reached'
+    assert state['final_content'] == ''
+    assert elapsed < 1.0
+
+
+def test_fake_backends_replay_the_same_run():
+    def run():
+        reset_fake_backends()
+        state = asyncio.run(arun_workflow("topic-f", "twitter", {'max_iterations': 2, 'research_fanout': 1}))
+        return state, fake_backend_stats()
+
+    with mock.patch("config.FAKE_GROQ", True), \
+            mock.patch("config.FAKE_TAVILY", True), \
+            mock.patch("config.FAKE_GROQ_LATENCY_MS", 5), \
+            mock.patch("config.FAKE_TAVILY_LATENCY_MS", 5), \
+            mock.patch("config.FAKE_429_RATE", 0.2), \
+            mock.patch("config.FAKE_429_BURST", 2), \
+            mock.patch("config.FAKE_429_RETRY_AFTER", 0.01), \
+            mock.patch("config.RATE_LIMIT_BACKOFF_BASE", 0.01), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        first, first_stats = run()
+        second, second_stats = run()
+        reset_fake_backends()
+
+    # 429 bursts were retried through, and the run parsed like a real one
+    assert first_stats['groq']['throttled'] > 0
+    assert first['status'] in ('approved', 'needs_revision', 'converged')
+    assert len(first['research_angles']) >= 3
+    assert first['drafts'][0].startswith("1/") and "\n---\n" in first['drafts'][0]
+    assert all(70 <= score <= 95 for score in first['scores'])
+
+    # Same seed, same call order: same outcome
+    assert second['scores'] == first['scores']
+    assert second['final_content'] == first['final_content']
+    assert second_stats == first_stats
+
+
+def test_cassette_replays_a_recorded_run_offline(tmp_path):
+    cassette = str(tmp_path / "cassette.jsonl.gz")
+    settings = {'max_iterations': 2, 'research_fanout': 2, 'editor_mode': "structured"}
+    common = [
+        mock.patch("config.CASSETTE_PATH", cassette),
+        mock.patch("config.LLM_CACHE_ENABLED", False),
+        mock.patch("config.RATE_LIMIT_ENABLED", False),
+        mock.patch("config.RESEARCH_CACHE_ENABLED", False),
+    ]
+    recording = [
+        mock.patch("config.CASSETTE_MODE", "record"),
+        mock.patch("config.FAKE_GROQ", True),
+        mock.patch("config.FAKE_TAVILY", True),
+        mock.patch("config.FAKE_GROQ_LATENCY_MS", 40),
+        mock.patch("config.FAKE_TAVILY_LATENCY_MS", 5),
+        mock.patch("config.FAKE_TAIL_RATE", 0),
+    ]
+    replaying = [
+        mock.patch("config.CASSETTE_MODE", "replay"),
+        mock.patch("config.GROQ_API_KEY", None),
+        mock.patch("config.TAVILY_API_KEY", None),
+    ]
+
+    def run(patches):
+        for p in common + patches:
+            p.start()
+        try:
+            reset_cassette()
+            reset_fake_backends()
+            start = time.perf_counter()
+            state = asyncio.run(arun_workflow("topic-c", "twitter", settings))
+            return state, time.perf_counter() - start, cassette_stats()
+        finally:
+            reset_cassette()
+            for p in common + patches:
+                p.stop()
+
+    recorded, _, record_stats = run(recording)
+    replayed, elapsed, replay_stats = run(replaying)
+    with mock.patch("config.CASSETTE_REPLAY_LATENCY", False):
+        instant, instant_elapsed, _ = run(replaying)
+
+    assert record_stats['recorded'] >= 4
+    assert replay_stats == {'recorded': 0, 'replayed': record_stats['recorded'], 'misses': 0}
+    for state in (replayed, instant):
+        assert state['final_content'] == recorded['final_content']
+        assert state['scores'] == recorded['scores']
+        assert state['research_angles'] == recorded['research_angles']
+    # Recorded latencies are waited out, unless turned off
+    groq_calls = replay_stats['replayed'] - 2
+    assert elapsed >= 0.03 * groq_calls
+    assert instant_elapsed < elapsed
+
+
+class FlakyEditorLLM(RecordingLLM):
+    """Fake chat model whose reviews fail while `failing` is set."""
+
+    failing = True
+
+    async def ainvoke(self, prompt):
+        if "evaluating social media content" in prompt and FlakyEditorLLM.failing:
+            self.calls.append((self.model, self.temperature, self.max_tokens, prompt))
+            raise RuntimeError("Groq is down")
+        return await super().ainvoke(prompt)
+
+
+def test_failed_run_resumes_from_its_last_finished_node():
+    checkpointer = Checkpointer(path=None, keep=2)
+    FlakyEditorLLM.calls = []
+    FlakyEditorLLM.failing = True
+    settings = {'max_iterations': 1, 'virality_threshold': 99, 'research_fanout': 1}
+    with mock.patch("tools.groq_llm._get_llm", FlakyEditorLLM), \
+            mock.patch("tavily.AsyncTavilyClient.search", fake_search), \
+            mock.patch("workflow.graph.get_checkpointer", lambda: checkpointer), \
+            mock.patch("workflow.graph._compiled_workflows", {}), \
+            mock.patch("config.RATE_LIMIT_MAX_RETRIES", 0), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        failed = asyncio.run(arun_workflow("topic-r", "twitter", settings, run_id="run-1"))
+        first_calls = len(FlakyEditorLLM.calls)
+
+        FlakyEditorLLM.failing = False
+        resumed = asyncio.run(arun_workflow("topic-r", "twitter", settings, run_id="run-1"))
+        resumed_prompts = [call[3] for call in FlakyEditorLLM.calls[first_calls:]]
+
+        # A finished run is returned as it is
+        calls = len(FlakyEditorLLM.calls)
+        again = asyncio.run(arun_workflow("topic-r", "twitter", settings, run_id="run-1"))
+
+    assert failed['status'] == 'failed'
+    # Research and the draft are not paid for again: only the review and the rest of the loop
+    assert "evaluating social media content" in resumed_prompts[0]
+    assert not any("viral content researcher" in prompt for prompt in resumed_prompts)
+    assert resumed['status'] == 'needs_revision' and resumed['drafts'][0] == failed['drafts'][0]
+    assert resumed['research_angles'] == failed['research_angles']
+    assert len(FlakyEditorLLM.calls) == calls and again == resumed
+
+    # Compaction keeps two checkpoints for the run, and the values they reference
+    assert len(list(checkpointer.list({'configurable': {'thread_id': "run-1"}}))) == 2
+    assert checkpointer.stats()['average_checkpoint_bytes'] < 4096
+
+
+def test_rerun_from_a_later_node_reuses_the_stored_research():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    checkpointer = Checkpointer(path=None)
+    searches = []
+
+    async def counted_search(self, *args, **kwargs):
+        searches.append(args)
+        return await fake_search(self, *args, **kwargs)
+
+    RecordingLLM.calls = []
+    settings = {'max_iterations': 2, 'virality_threshold': 75, 'research_fanout': 1}
+    with mock.patch("tools.groq_llm._get_llm", RecordingLLM), \
+            mock.patch("tavily.AsyncTavilyClient.search", counted_search), \
+            mock.patch("workflow.graph.get_checkpointer", lambda: checkpointer), \
+            mock.patch("workflow.graph._compiled_workflows", {}), \
+            mock.patch("config.GROQ_API_KEY", "test"), \
+            mock.patch("config.TAVILY_API_KEY", "test"), \
+            mock.patch("config.LLM_CACHE_ENABLED", False), \
+            mock.patch("config.RATE_LIMIT_ENABLED", False), \
+            mock.patch("config.RESEARCH_CACHE_ENABLED", False):
+        source = asyncio.run(arun_workflow("topic-e", "twitter", settings, run_id="run-e"))
+        searched = len(searches)
+
+        # Same draft, stricter editor, other platform: review and revise, no research
+        RecordingLLM.calls = []
+        review = client.post("/api/runs/run-e/rerun", json={
+            'start_node': "chief_editor", 'platform': "linkedin", 'settings': {'virality_threshold': 90}
+        })
+        review_prompts = [call[3] for call in RecordingLLM.calls]
+
+        # Polish the re-run's result once more
+        RecordingLLM.calls = []
+        polish = client.post(f"/api/runs/{review.json()['run_id']}/rerun", json={
+            'start_node': "polish", 'feedback': "Cut the last line."
+        })
+        polish_prompts = [call[3] for call in RecordingLLM.calls]
+
+        missing = client.post("/api/runs/run-x/rerun", json={'start_node': "polish"})
+        mismatched = client.post("/api/runs/run-e/rerun", json={'start_node': "chief_editor", 'feedback': "More."})
+
+    assert source['status'] == 'approved' and searched > 0
+    assert len(searches) == searched
+
+    assert review.status_code == 200
+    result = review.json()
+    assert not any("viral content researcher" in prompt for prompt in review_prompts)
+    assert "evaluating social media content" in review_prompts[0]
+    assert source['final_content'] in review_prompts[0]
+    assert "PLATFORM: LINKEDIN" in review_prompts[0]
+    # Scored 80 against 90: revised until out of iterations (convergence is off)
+    assert result['status'] == 'needs_revision' and result['scores'] == [80, 80, 80]
+    assert result['drafts'][0] == source['final_content']
+    assert result['research_angles'] == source['research_angles']
+
+    assert polish.status_code == 200
+    assert polish.json()['status'] == 'polished' and polish.json()['run_id'] != result['run_id']
+    assert len(polish_prompts) == 1 and "Cut the last line." in polish_prompts[0]
+
+    assert missing.status_code == 404
+    assert mismatched.status_code == 400
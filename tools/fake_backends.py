@@ -0,0 +1,409 @@
+"""
+Deterministic local stand-ins for Groq and Tavily, for offline load and
+latency benchmarking.
+
+With FAKE_GROQ / FAKE_TAVILY on, groq_llm and tavily_search talk to these
+instead of the real APIs. Replies are built from the prompt (angle-formatted
+analysis, threaded drafts, "SCORE:/FEEDBACK:" reviews, JSON reviews in JSON
+mode), so the whole workflow runs end to end. Each backend waits out a
+latency drawn from a seeded distribution (log-normal body plus occasional
+tail outliers) and can answer with bursts of 429s, so the rate limiter,
+retries, deadlines and streaming behave as they would against the real
+services. The same seed and call order give the same latencies and replies.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import textwrap
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+import groq
+import httpx
+from langchain_core.messages import AIMessage, AIMessageChunk
+from tavily.errors import UsageLimitExceededError
+
+import config
+from tools.rate_limiter import estimate_tokens
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+# A rejected (429) call answers quickly, at this share of the median latency
+THROTTLED_LATENCY_SHARE = 0.05
+
+# Streams deliver their first chunk after this share of the call's latency
+FIRST_CHUNK_SHARE = 0.3
+
+ANGLE_TITLES = [
+    "The Hidden Cost Nobody Talks About",
+    "Why The Experts Got It Backwards",
+    "The 5-Minute Habit That Changes Everything",
+    "What The Data Actually Says",
+    "The Quiet Shift Already Happening",
+    "Everyone Is Optimizing The Wrong Thing",
+]
+
+FEEDBACK_ITEMS = [
+    "Hook is generic. Open with the most surprising number instead.",
+    "Too many emojis in the middle section. Keep one per tweet at most.",
+    "Tweet 4 is too long - cut it by 40 characters.",
+    "The call-to-action is vague. Ask one specific question.",
+    "Transitions between insights feel abrupt. Add a one-line bridge.",
+    "The closing line repeats the hook. End on a fresh takeaway.",
+]
+
+
+class LatencyModel:
+    """
+    Seeded latency and throttling for one fake backend.
+    
+    Each call waits `median * exp(sigma * N(0, 1))` seconds (log-normal, so
+    most calls sit near the median with a right skew), and with probability
+    `tail_rate` that is multiplied by `tail_factor` to model tail outliers.
+    With probability `burst_rate` a call starts a burst of `burst_length`
+    consecutive 429s.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        median: float,
+        sigma: float,
+        tail_rate: float,
+        tail_factor: float,
+        burst_rate: float,
+        burst_length: int,
+        seed: int = 0
+    ):
+        self.median = median
+        self.sigma = sigma
+        self.tail_rate = tail_rate
+        self.tail_factor = tail_factor
+        self.burst_rate = burst_rate
+        self.burst_length = burst_length
+        
+        self.calls = 0
+        self.tail_calls = 0
+        self.throttled = 0
+        
+        self._random = random.Random(f"{seed}:{name}")
+        self._burst_left = 0
+        self._lock = threading.Lock()
+    
+    def sample(self) -> Tuple[float, bool]:
+        """
+        Draw the next call's outcome.
+        
+        Returns:
+            Tuple of (seconds the call takes, whether it is rejected with a 429)
+        """
+        with self._lock:
+            self.calls += 1
+            
+            if self._burst_left == 0 and self.burst_rate > 0 and self._random.random() < self.burst_rate:
+                self._burst_left = self.burst_length
+            if self._burst_left > 0:
+                self._burst_left -= 1
+                self.throttled += 1
+                return self.median * THROTTLED_LATENCY_SHARE, True
+            
+            latency = self.median * math.exp(self.sigma * self._random.gauss(0.0, 1.0))
+            if self.tail_rate > 0 and self._random.random() < self.tail_rate:
+                latency *= self.tail_factor
+                self.tail_calls += 1
+            return latency, False
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'tail_calls': self.tail_calls,
+                'throttled': self.throttled
+            }
+
+
+_latency_models: Dict[str, LatencyModel] = {}
+_latency_lock = threading.Lock()
+
+
+def get_latency_model(name: str) -> LatencyModel:
+    """Return the process-wide latency model of a backend ("groq" or "tavily")."""
+    if name not in _latency_models:
+        with _latency_lock:
+            if name not in _latency_models:
+                median_ms = config.FAKE_GROQ_LATENCY_MS if name == "groq" else config.FAKE_TAVILY_LATENCY_MS
+                _latency_models[name] = LatencyModel(
+                    name,
+                    median=median_ms / 1000,
+                    sigma=config.FAKE_LATENCY_SIGMA,
+                    tail_rate=config.FAKE_TAIL_RATE,
+                    tail_factor=config.FAKE_TAIL_FACTOR,
+                    burst_rate=config.FAKE_429_RATE,
+                    burst_length=config.FAKE_429_BURST,
+                    seed=config.FAKE_SEED
+                )
+                logger.info(f"🧪 Using fake {name} backend (median {median_ms:.0f} ms, seed {config.FAKE_SEED})")
+    return _latency_models[name]
+
+
+def reset_fake_backends() -> None:
+    """Start every latency sequence over, e.g. between benchmark runs or after changing config."""
+    with _latency_lock:
+        _latency_models.clear()
+
+
+def fake_backend_stats() -> Dict:
+    """Return call, tail and 429 counters of the fake backends in use."""
+    with _latency_lock:
+        models = dict(_latency_models)
+    return {name: model.stats() for name, model in models.items()}
+
+
+def _digest(*parts: str) -> int:
+    """Stable integer from text, so replies don't depend on PYTHONHASHSEED."""
+    text = "\x00".join((str(config.FAKE_SEED),) + parts)
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _pick(options: List[str], seed: int, count: int) -> List[str]:
+    """`count` distinct options, chosen and ordered by seed."""
+    return random.Random(seed).sample(options, min(count, len(options)))
+
+
+def _between(text: str, start: str, end: Optional[str] = None) -> str:
+    """The part of text after `start` (and before `end`), or ''."""
+    _, found, rest = text.partition(start)
+    if not found:
+        return ""
+    return rest.split(end, 1)[0] if end else rest
+
+
+def _topic(prompt: str) -> str:
+    match = re.search(r'about "([^"]+)"', prompt) or re.search(r'TOPIC: (.+)', prompt)
+    return match.group(1).strip() if match else "this topic"
+
+
+def fake_reply(prompt: str, json_mode: bool = False) -> str:
+    """
+    Build a realistic reply for one of the workflow's prompts.
+    
+    Args:
+        prompt: The prompt sent to the fake LLM
+        json_mode: Answer with a JSON object (Groq JSON mode)
+    
+    Returns:
+        Text in the format the agent parsing it expects
+    """
+    seed = _digest(prompt)
+    
+    if "evaluating social media content" in prompt:
+        draft = _between(prompt, "CONTENT TO REVIEW:\n---\n", "\n---\n\nSCORING CRITERIA").strip()
+        return _review(draft, json_mode)
+    if "viral content researcher" in prompt:
+        return _analysis(_topic(prompt), seed)
+    if "Twitter ghostwriter" in prompt:
+        return _thread(_topic(prompt), prompt, seed)
+    if "LinkedIn ghostwriter" in prompt:
+        return _linkedin_post(_topic(prompt), prompt, seed)
+    if "ORIGINAL CONTENT:" in prompt:
+        # Polish: return the draft with its whitespace tidied
+        original = _between(prompt, "ORIGINAL CONTENT:", "Output ONLY the polished content.")
+        lines = [line.rstrip() for line in textwrap.dedent(original).strip().splitlines()]
+        return "\n".join(lines)
+    
+    return f"Here is a short answer about {_topic(prompt)}."
+
+
+def _review(draft: str, json_mode: bool) -> str:
+    # Score the draft itself, so a revised draft gets a new score
+    seed = _digest("review", draft)
+    score = 70 + seed % 26
+    items = _pick(FEEDBACK_ITEMS, seed, 1 if score >= 90 else 2 + seed % 2)
+    feedback = "\n".join(f"- {item}" for item in items)
+    if json_mode:
+        return json.dumps({'score': score, 'feedback': feedback, 'polished_content': draft or "Polished post"})
+    return f"SCORE: {score}\n\nFEEDBACK:\n{feedback}"
+
+
+def _analysis(topic: str, seed: int) -> str:
+    angles = []
+    for i, title in enumerate(_pick(ANGLE_TITLES, seed, 3 + seed % 3), 1):
+        angles.append(
+            f"ANGLE {i}: {title}\n"
+            f"WHY VIRAL: It challenges what most people assume about {topic} and invites debate.\n"
+            f"SUMMARY: A fresh look at {topic} through the lens of \"{title.lower()}\"."
+        )
+    return "\n\n".join(angles)
+
+
+def _angle_titles(prompt: str) -> List[str]:
+    section = _between(prompt, "RESEARCH ANGLES TO USE:\n", "\n\n")
+    return [line[2:].split(":", 1)[0] for line in section.splitlines() if line.startswith("- ")] or ["The big picture"]
+
+
+def _revision_note(prompt: str) -> str:
+    return " (sharper take)" if "IMPORTANT FEEDBACK TO ADDRESS" in prompt else ""
+
+
+def _thread(topic: str, prompt: str, seed: int) -> str:
+    count = 8 + seed % 5
+    angles = _angle_titles(prompt)
+    tweets = [f"1/{count} Most people get {topic} wrong{_revision_note(prompt)}.\n\nHere's what actually matters 🧵"]
+    for n in range(2, count):
+        angle = angles[(n - 2) % len(angles)]
+        tweets.append(f"{n}/{count} {angle}.\n\nSmall shifts.\nBig results.")
+    tweets.append(f"{count}/{count} That's the real story of {topic}.\n\nWhich one surprised you most? 👇")
+    return "\n---\n".join(tweets)
+
+
+def _linkedin_post(topic: str, prompt: str, seed: int) -> str:
+    paragraphs = [f"I used to think {topic} was overrated{_revision_note(prompt)}.", "Then I looked closer."]
+    paragraphs += [f"{angle}." for angle in _angle_titles(prompt)]
+    paragraphs.append(f"What has {topic} changed for you? 💡")
+    return "\n\n".join(paragraphs)
+
+
+def _rate_limit_error(what: str) -> groq.RateLimitError:
+    response = httpx.Response(
+        429,
+        headers={'retry-after': str(config.FAKE_429_RETRY_AFTER)},
+        request=httpx.Request("POST", GROQ_URL)
+    )
+    return groq.RateLimitError(f"Rate limit reached for {what}", response=response, body=None)
+
+
+class FakeChatGroq:
+    """
+    Offline stand-in for ChatGroq: the invoke/ainvoke/stream/astream/bind
+    subset groq_llm uses, with fake_reply answers and LatencyModel timing.
+    A call that would outlast its timeout raises groq.APITimeoutError.
+    """
+    
+    def __init__(self, model: str, temperature: float, max_tokens: int, json_mode: bool = False):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.json_mode = json_mode
+    
+    def bind(self, response_format: Optional[Dict] = None, **kwargs) -> "FakeChatGroq":
+        json_mode = (response_format or {}).get('type') == "json_object"
+        return FakeChatGroq(self.model, self.temperature, self.max_tokens, json_mode)
+    
+    def _outcome(self, prompt: str, timeout: Optional[float]) -> Tuple[float, Union[str, Exception]]:
+        """Latency to wait out and the reply, or the error to raise after waiting."""
+        latency, throttled = get_latency_model("groq").sample()
+        if throttled:
+            return latency, _rate_limit_error(self.model)
+        if timeout is not None and latency > timeout:
+            return timeout, groq.APITimeoutError(request=httpx.Request("POST", GROQ_URL))
+        return latency, fake_reply(prompt, self.json_mode)
+    
+    def _message(self, prompt: str, content: str) -> AIMessage:
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        return AIMessage(content=content, usage_metadata={
+            'input_tokens': prompt_tokens,
+            'output_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        })
+    
+    def invoke(self, prompt: str, timeout: Optional[float] = None, **kwargs) -> AIMessage:
+        latency, reply = self._outcome(prompt, timeout)
+        time.sleep(latency)
+        if isinstance(reply, Exception):
+            raise reply
+        return self._message(prompt, reply)
+    
+    async def ainvoke(self, prompt: str, timeout: Optional[float] = None, **kwargs) -> AIMessage:
+        latency, reply = self._outcome(prompt, timeout)
+        await asyncio.sleep(latency)
+        if isinstance(reply, Exception):
+            raise reply
+        return self._message(prompt, reply)
+    
+    def stream(self, prompt: str, timeout: Optional[float] = None, **kwargs) -> Iterator[AIMessageChunk]:
+        latency, reply = self._outcome(prompt, timeout)
+        if isinstance(reply, Exception):
+            time.sleep(latency)
+            raise reply
+        chunks = stream_chunks(reply)
+        time.sleep(latency * FIRST_CHUNK_SHARE)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(latency * (1 - FIRST_CHUNK_SHARE) / len(chunks))
+            yield AIMessageChunk(content=chunk)
+    
+    async def astream(self, prompt: str, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        latency, reply = self._outcome(prompt, timeout)
+        if isinstance(reply, Exception):
+            await asyncio.sleep(latency)
+            raise reply
+        chunks = stream_chunks(reply)
+        await asyncio.sleep(latency * FIRST_CHUNK_SHARE)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(latency * (1 - FIRST_CHUNK_SHARE) / len(chunks))
+            yield AIMessageChunk(content=chunk)
+
+
+def stream_chunks(text: str, words: int = 8) -> List[str]:
+    """Split text into stream chunks of a few words each, keeping every character."""
+    pieces = re.findall(r'\S+\s*|\s+', text)
+    return ["".join(pieces[i:i + words]) for i in range(0, len(pieces), words)] or [""]
+
+
+def fake_search_response(query: str, max_results: int = 5) -> Dict:
+    """A Tavily-shaped search response built from the query."""
+    seed = _digest("search", query)
+    slug = re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-')
+    results = []
+    for rank in range(1, max_results + 1):
+        results.append({
+            'title': f"{query.split(' trending')[0].title()}: report {rank}",
+            'url': f"https://news.example.com/{slug}/{(seed + rank) % 1000}",
+            'content': f"Coverage of {query} with new data, expert opinions and reader reactions (source {rank}).",
+            'score': round(1.0 - rank * 0.1, 2)
+        })
+    return {'query': query, 'answer': f"Recent discussion of {query} centres on a few surprising findings.", 'results': results}
+
+
+def _search_outcome(query: str, max_results: int) -> Tuple[float, Union[Dict, Exception]]:
+    latency, throttled = get_latency_model("tavily").sample()
+    if throttled:
+        return latency, UsageLimitExceededError("Too many requests")
+    return latency, fake_search_response(query, max_results)
+
+
+class FakeTavilyClient:
+    """Offline stand-in for TavilyClient.search."""
+    
+    def __init__(self, api_key: Optional[str] = None):
+        pass
+    
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict:
+        latency, response = _search_outcome(query, max_results)
+        time.sleep(latency)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class FakeAsyncTavilyClient:
+    """Offline stand-in for AsyncTavilyClient.search."""
+    
+    def __init__(self, api_key: Optional[str] = None):
+        pass
+    
+    async def search(self, query: str, max_results: int = 5, **kwargs) -> Dict:
+        latency, response = _search_outcome(query, max_results)
+        await asyncio.sleep(latency)
+        if isinstance(response, Exception):
+            raise response
+        return response
@@ -0,0 +1,204 @@
+"""Topic research cache for the Trend Scout, with stale-while-revalidate."""
+
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def normalize_topic(topic: str) -> str:
+    """Casefold a topic and normalize its punctuation and whitespace."""
+    text = unicodedata.normalize("NFKC", topic).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def research_key(topic: str, settings: Sequence = ()) -> str:
+    """
+    Cache key for a topic's research.
+    
+    Args:
+        topic: The topic, normalized so equivalent spellings share research
+        settings: Request settings the research depends on (the Trend Scout
+            passes its model, scout temperature and research fan-out)
+    """
+    return json.dumps([normalize_topic(topic), *settings])
+
+
+class ResearchCache:
+    """
+    Search results and parsed angles per normalized topic and research settings.
+    
+    An entry is fresh for ttl seconds. After that it is stale: still served
+    (so the request does not wait on Tavily and the LLM) while one
+    background refresh replaces it. Entries older than max_stale are
+    treated as misses.
+    
+    Like the LLM cache, entries live in memory and, when a path is given,
+    in a SQLite file shared by every process on the host. clock returns the
+    current time in seconds (time.time unless a test passes its own).
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 3600,
+        max_stale: float = 86400,
+        max_entries: int = 1000,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.clock = clock
+        
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._refreshing = set()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        if path:
+            self._db = self._open(path)
+    
+    def get(self, topic: str, settings: Sequence = ()) -> Optional[Tuple[Dict, bool]]:
+        """
+        Look up a topic's research made with these settings (see research_key).
+        
+        Returns:
+            Tuple of (entry, is_fresh), or None on a miss. The entry has
+            'search_results', 'angles' and 'fetched_at'.
+        """
+        key = research_key(topic, settings)
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM research_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = json.loads(row[0])
+                    self._remember(key, entry)
+            
+            age = now - entry['fetched_at'] if entry is not None else None
+            if entry is None or age > self.max_stale:
+                self.misses += 1
+                return None
+            
+            self._memory.move_to_end(key)
+            if age <= self.ttl:
+                self.fresh_hits += 1
+                return entry, True
+            
+            self.stale_hits += 1
+            return entry, False
+    
+    def set(self, topic: str, search_results: List[Dict], angles: List[Dict], settings: Sequence = ()) -> None:
+        """Store fresh research for a topic and the settings that produced it."""
+        key = research_key(topic, settings)
+        entry = {
+            'search_results': search_results,
+            'angles': angles,
+            'fetched_at': self.clock()
+        }
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO research_cache (key, value, fetched_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(entry), entry['fetched_at'])
+                )
+                self._db.execute(
+                    "DELETE FROM research_cache WHERE fetched_at < ?",
+                    (entry['fetched_at'] - self.max_stale,)
+                )
+    
+    def start_refresh(self, topic: str, settings: Sequence = ()) -> bool:
+        """Claim the background refresh for a topic; False if one is already running."""
+        key = research_key(topic, settings)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+    
+    def finish_refresh(self, topic: str, settings: Sequence = ()) -> None:
+        """Release the claim taken by start_refresh."""
+        with self._lock:
+            self._refreshing.discard(research_key(topic, settings))
+    
+    def stats(self) -> Dict:
+        """Return hit/miss counters."""
+        with self._lock:
+            lookups = self.fresh_hits + self.stale_hits + self.misses
+            return {
+                'fresh_hits': self.fresh_hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'hit_rate': (self.fresh_hits + self.stale_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)
+            }
+    
+    def _remember(self, key: str, entry: Dict) -> None:
+        """Put an entry in the memory LRU (caller holds the lock)."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS research_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        return db
+
+
+_cache: Optional[ResearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_research_cache() -> ResearchCache:
+    """Return the process-wide research cache, configured from config."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = config.RESEARCH_CACHE_PATH
+                if path is None:
+                    path = os.path.join(tempfile.gettempdir(), "viral_content_agent", "research_cache.sqlite")
+                settings = {
+                    'ttl': config.RESEARCH_CACHE_TTL,
+                    'max_stale': config.RESEARCH_CACHE_MAX_STALE,
+                    'max_entries': config.RESEARCH_CACHE_MAX_ENTRIES
+                }
+                try:
+                    _cache = ResearchCache(path=path or None, **settings)
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"⚠️ Research disk cache unavailable ({e}), using memory only")
+                    _cache = ResearchCache(path=None, **settings)
+    return _cache
@@ -1,54 +1,263 @@
 """Tavily API integration for trend research."""
 
-from typing import List, Dict
-from tavily import TavilyClient
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from tavily import TavilyClient, AsyncTavilyClient
 import config
+from tools.cassettes import (
+    RecordingAsyncTavilyClient,
+    RecordingTavilyClient,
+    ReplayAsyncTavilyClient,
+    ReplayTavilyClient
+)
+from tools.fake_backends import FakeAsyncTavilyClient, FakeTavilyClient
+from tools.rate_limiter import acall_with_limits, call_with_limits, tavily_limits
+from utils.timings import begin_call
+from utils.tracing import traced
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Angle-specific queries, in fan-out order. The first one is the original
+# single query, so a fan-out width of 1 behaves as before.
+QUERY_TEMPLATES = [
+    ("news", "{topic} trending news viral discussions latest"),
+    ("contrarian", "{topic} controversial opinion debate myths"),
+    ("statistics", "{topic} surprising statistics data study"),
+    ("pop_culture", "{topic} pop culture meme reference"),
+]
 
-def search_trending_content(topic: str, max_results: int = 5) -> List[Dict]:
+# Reciprocal-rank fusion constant (the usual value from the RRF paper)
+RRF_K = 60
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src")
+
+
+def _client():
+    """Tavily client: the offline fake with FAKE_TAVILY, recording or replaying with CASSETTE_MODE."""
+    if config.CASSETTE_MODE == "replay":
+        return ReplayTavilyClient()
+    client = FakeTavilyClient() if config.FAKE_TAVILY else TavilyClient(api_key=config.TAVILY_API_KEY)
+    if config.CASSETTE_MODE == "record":
+        return RecordingTavilyClient(client)
+    return client
+
+
+def _async_client():
+    """Async version of _client."""
+    if config.CASSETTE_MODE == "replay":
+        return ReplayAsyncTavilyClient()
+    client = FakeAsyncTavilyClient() if config.FAKE_TAVILY else AsyncTavilyClient(api_key=config.TAVILY_API_KEY)
+    if config.CASSETTE_MODE == "record":
+        return RecordingAsyncTavilyClient(client)
+    return client
+
+
+def _call_options(timeout: Optional[float]) -> Dict:
+    """Per-search Tavily options; the time left becomes the HTTP timeout."""
+    return {} if timeout is None else {'timeout': timeout}
+
+
+def build_query(topic: str) -> str:
+    """Build the Tavily query used to find trending content for a topic."""
+    return QUERY_TEMPLATES[0][1].format(topic=topic)
+
+
+def build_queries(topic: str, width: int = 1) -> List[str]:
+    """Build up to `width` angle-specific queries for a topic."""
+    width = max(1, min(width, len(QUERY_TEMPLATES)))
+    return [template.format(topic=topic) for _, template in QUERY_TEMPLATES[:width]]
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so the same page found by different queries dedupes."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ))
+    return urlunsplit((parts.scheme.lower() or "https", host, parts.path.rstrip("/"), query, ""))
+
+
+def fuse_results(result_lists: List[List[Dict]], max_results: int) -> List[Dict]:
+    """
+    Merge ranked result lists with reciprocal-rank fusion.
+    
+    Results are deduplicated by canonical URL; each one scores
+    sum(1 / (RRF_K + rank)) over the lists it appears in, so pages found
+    by several queries rise to the top.
+    
+    Returns:
+        The best `max_results` results, each with an added 'fused_score'
+    """
+    fused: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, 1):
+            key = canonical_url(item['url'])
+            if key not in fused:
+                fused[key] = {**item, 'fused_score': 0.0}
+            fused[key]['fused_score'] += 1.0 / (RRF_K + rank)
+    
+    ranked = sorted(fused.values(), key=lambda item: item['fused_score'], reverse=True)
+    return ranked[:max_results]
+
+
+def parse_response(response: Dict, topic: str) -> List[Dict]:
+    """Convert a raw Tavily response into our search result format."""
+    results = []
+    for item in response.get('results', []):
+        results.append({
+            'title': item.get('title', ''),
+            'url': item.get('url', ''),
+            'content': item.get('content', ''),
+            'score': item.get('score', 0)
+        })
+    
+    # Add the AI-generated answer if available
+    if response.get('answer'):
+        logger.info(f"Tavily answer: {response['answer'][:100]}...")
+    
+    logger.info(f"Found {len(results)} results for topic: {topic}")
+    return results
+
+
+def merge_query_results(outcomes: List, queries: List[str], topic: str, max_results: int) -> List[Dict]:
+    """
+    Fuse the per-query outcomes, tolerating failed queries.
+    
+    Raises the first error only when every query failed.
+    """
+    result_lists = []
+    for query, outcome in zip(queries, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.warning(f"⚠️ Tavily query failed ({query}): {str(outcome)}")
+        else:
+            result_lists.append(outcome)
+    
+    if not result_lists:
+        raise outcomes[0]
+    
+    results = fuse_results(result_lists, max_results)
+    logger.info(f"Fused {len(results)} results from {len(result_lists)}/{len(queries)} queries for topic: {topic}")
+    return results
+
+
+@traced("search_trending_content")
+def search_trending_content(
+    topic: str,
+    max_results: int = 5,
+    width: int = None,
+    timeout: Optional[float] = None
+) -> List[Dict]:
     """
     Search for trending content, news, and angles related to a topic.
     
+    Sends `width` angle-specific queries in parallel and merges them with
+    reciprocal-rank fusion, so wall-clock time stays close to one search.
+    
     Args:
         topic: The topic to research
-        max_results: Maximum number of results to return
+        max_results: Maximum number of results to return, across all queries
+        width: Number of parallel queries (defaults to config.RESEARCH_FANOUT)
+        timeout: Seconds to wait for the queries; those still running are
+            abandoned and count as failed. None waits for all of them.
         
     Returns:
         List of search results with title, url, and content
     """
     try:
-        client = TavilyClient(api_key=config.TAVILY_API_KEY)
-        
-        # Search for trending and recent content
-        query = f"{topic} trending news viral discussions latest"
-        
-        logger.info(f"Searching Tavily for: {query}")
-        
-        response = client.search(
-            query=query,
-            max_results=max_results,
-            search_depth="advanced",
-            include_answer=True
-        )
-        
-        results = []
-        for item in response.get('results', []):
-            results.append({
-                'title': item.get('title', ''),
-                'url': item.get('url', ''),
-                'content': item.get('content', ''),
-                'score': item.get('score', 0)
-            })
-        
-        # Add the AI-generated answer if available
-        if response.get('answer'):
-            logger.info(f"Tavily answer: {response['answer'][:100]}...")
-        
-        logger.info(f"Found {len(results)} results for topic: {topic}")
-        return results
+        client = _client()
+        
+        # Search for trending and recent content from several angles
+        queries = build_queries(topic, width or config.RESEARCH_FANOUT)
+        
+        def run_query(query: str):
+            logger.info(f"Searching Tavily for: {query}")
+            try:
+                # Queued behind the shared rate limit, retried on 429s
+                response = call_with_limits(
+                    # The client gives up when the deadline does, so a query
+                    # abandoned below stops spending time and quota
+                    lambda left: client.search(
+                        query=query,
+                        max_results=max_results,
+                        search_depth="advanced",
+                        include_answer=True,
+                        **_call_options(left)
+                    ),
+                    tavily_limits(), timeout, what="Tavily search", tool="tavily",
+                    timing=begin_call("tavily")
+                )
+                return parse_response(response, topic)
+            except Exception as e:
+                return e
+        
+        if len(queries) == 1 and timeout is None:
+            outcomes = [run_query(queries[0])]
+        else:
+            executor = ThreadPoolExecutor(max_workers=len(queries))
+            try:
+                # Each query runs in a copy of this context so its timing
+                # reaches the caller's request
+                futures = [executor.submit(contextvars.copy_context().run, run_query, query) for query in queries]
+                done, _ = wait(futures, timeout=timeout)
+                outcomes = [
+                    future.result() if future in done
+                    else TimeoutError(f"Tavily search timed out after {timeout:.1f}s")
+                    for future in futures
+                ]
+            finally:
+                # Don't wait for queries that missed the timeout
+                executor.shutdown(wait=False)
+        
+        return merge_query_results(outcomes, queries, topic, max_results)
+        
+    except Exception as e:
+        logger.error(f"Error searching Tavily: {str(e)}")
+        raise
+
+
+@traced("asearch_trending_content")
+async def asearch_trending_content(
+    topic: str,
+    max_results: int = 5,
+    width: int = None,
+    timeout: Optional[float] = None
+) -> List[Dict]:
+    """
+    Async version of search_trending_content using AsyncTavilyClient.
+    
+    Arguments and return value match search_trending_content.
+    """
+    try:
+        client = _async_client()
+        
+        queries = build_queries(topic, width or config.RESEARCH_FANOUT)
+        
+        async def run_query(query: str):
+            logger.info(f"Searching Tavily (async) for: {query}")
+            response = await acall_with_limits(
+                lambda left: asyncio.wait_for(client.search(
+                    query=query,
+                    max_results=max_results,
+                    search_depth="advanced",
+                    include_answer=True,
+                    **_call_options(left)
+                ), left),
+                tavily_limits(), timeout, what="Tavily search", tool="tavily",
+                timing=begin_call("tavily")
+            )
+            return parse_response(response, topic)
+        
+        outcomes = await asyncio.gather(*(run_query(q) for q in queries), return_exceptions=True)
+        
+        return merge_query_results(outcomes, queries, topic, max_results)
         
     except Exception as e:
         logger.error(f"Error searching Tavily: {str(e)}")
@@ -0,0 +1,60 @@
+"""Per-request latency budgets (deadline_ms) for the workflow."""
+
+import time
+from typing import Dict, Optional
+import config
+
+# Never start an upstream call with less time than this left
+MIN_CALL_TIMEOUT = 0.5
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's latency budget ran out before a call could start."""
+
+
+def deadline_from_ms(deadline_ms: Optional[int]) -> Optional[float]:
+    """Turn a budget in milliseconds into an absolute deadline (epoch seconds)."""
+    if deadline_ms is None:
+        return None
+    return time.time() + deadline_ms / 1000
+
+
+def time_left(state: Dict) -> Optional[float]:
+    """Seconds until the run's deadline (negative once passed), None without one."""
+    deadline = state.get('deadline_at')
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def call_timeout(state: Dict) -> Optional[float]:
+    """
+    Timeout for the next Groq or Tavily call: whatever budget is left.
+    
+    Raises:
+        DeadlineExceeded: If too little time is left to start a call
+    """
+    remaining = time_left(state)
+    if remaining is None:
+        return None
+    if remaining <= MIN_CALL_TIMEOUT:
+        raise DeadlineExceeded(f"Deadline reached ({remaining:.1f}s left)")
+    return remaining
+
+
+def deadline_passed(state: Dict) -> bool:
+    """True once the run has less time left than any call needs."""
+    remaining = time_left(state)
+    return remaining is not None and remaining <= MIN_CALL_TIMEOUT
+
+
+def skip_revision(state: Dict) -> bool:
+    """True when there is no longer time for another draft + review round."""
+    remaining = time_left(state)
+    return remaining is not None and remaining * 1000 < config.DEADLINE_REVISION_RESERVE_MS
+
+
+def skip_polish(state: Dict) -> bool:
+    """True when there is no longer time for the Chief Editor's polish call."""
+    remaining = time_left(state)
+    return remaining is not None and remaining * 1000 < config.DEADLINE_POLISH_RESERVE_MS
@@ -1,33 +1,78 @@
 """LangGraph workflow orchestration for viral content generation."""
 
-from typing import Literal
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from difflib import SequenceMatcher
+from functools import wraps
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Literal, Optional, Tuple
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send, StateSnapshot
+from workflow.checkpoints import get_checkpointer
 from workflow.state import ContentState
-from agents.trend_scout import trend_scout_agent
-from agents.ghostwriter import ghostwriter_agent
-from agents.chief_editor import chief_editor_agent
+from agents.trend_scout import trend_scout_agent, atrend_scout_agent
+from agents.ghostwriter import ghostwriter_agent, aghostwriter_agent
+from agents.chief_editor import chief_editor_agent, achief_editor_agent, polish_agent, apolish_agent
+from agents.candidates import (
+    candidate_inputs,
+    candidate_agent,
+    acandidate_agent,
+    select_candidate_agent,
+    aselect_candidate_agent
+)
+from utils.deadline import deadline_from_ms, deadline_passed, skip_revision
 from utils.logger import setup_logger
+from utils.metrics import (
+    FINAL_SCORES,
+    ITERATIONS,
+    NODE_SECONDS,
+    RERUNS,
+    WORKFLOWS,
+    WORKFLOWS_IN_FLIGHT,
+    WORKFLOW_SECONDS
+)
+from utils.streaming import DRAFT_DELTA_EVENT
+from utils.timings import RunTimings, collect_timings, node_timing
+from utils.tracing import span
 import config
 
 logger = setup_logger(__name__)
 
+WORKFLOW_VARIANTS = ("default", "best_of_n")
 
-def should_continue(state: ContentState) -> Literal["revise", "end"]:
+# Nodes a partial re-run can start at (see arerun_workflow)
+RERUN_NODES = ("ghostwriter", "chief_editor", "polish")
+
+# Compiled graphs are stateless and safe to share, so each variant is built
+# once per process and reused across requests, reruns and warm invocations.
+_compiled_workflows: Dict[str, object] = {}
+_compile_lock = threading.Lock()
+
+
+def should_continue(state: ContentState) -> Literal["revise", "converged", "deadline", "end"]:
     """
     Determine if content needs revision or is approved.
     
     Args:
         state: Current workflow state
-        
+    
     Returns:
-        "revise" if needs more work, "end" if approved or max iterations reached
+        "revise" if needs more work, "converged" if more revisions are
+        unlikely to help (see has_converged), "deadline" if the request's
+        deadline leaves no time for another round (or ran out mid-round),
+        "end" if approved or max iterations reached
     """
     status = state.get('status', '')
     iteration_count = state.get('iteration_count', 0)
     
+    max_iterations = state['max_iterations']
+    
     # Check if we hit max iterations
-    if iteration_count >= config.MAX_ITERATIONS:
-        logger.warning(f"⚠️ Max iterations ({config.MAX_ITERATIONS}) reached")
+    if iteration_count >= max_iterations:
+        logger.warning(f"⚠️ Max iterations ({max_iterations}) reached")
         return "end"
     
     # Check if content is approved
@@ -36,102 +81,749 @@ def should_continue(state: ContentState) -> Literal["revise", "end"]:
     
     # Check if we need revision
     if status == 'needs_revision':
+        if has_converged(state):
+            return "converged"
+        if skip_revision(state):
+            logger.warning("⏱️ Not enough time left for another revision")
+            return "deadline"
         return "revise"
     
     # Check for errors
     if status == 'failed' or 'error' in state:
+        if deadline_passed(state):
+            return "deadline"
         return "end"
     
     return "end"
 
 
+def has_converged(state: ContentState) -> bool:
+    """
+    Check whether the revision loop has stopped making progress.
+    
+    Converged when the last convergence_window scores failed to beat the
+    best earlier score by convergence_min_improvement points (e.g. 78, 79, 78
+    with a window of 2 and a minimum of 2), or when the two latest drafts
+    are at least convergence_similarity alike. A convergence_window of 0
+    turns both checks off, so the loop runs until approval or max_iterations.
+    """
+    window = state['convergence_window']
+    if window <= 0:
+        return False
+    
+    scores = state.get('scores', [])
+    if len(scores) > window:
+        improvement = max(scores[-window:]) - max(scores[:-window])
+        if improvement < state['convergence_min_improvement']:
+            logger.info(f"📉 Scores plateaued ({scores[-window - 1:]}), stopping revisions")
+            return True
+    
+    drafts = state.get('drafts', [])
+    if len(drafts) >= 2:
+        similarity = draft_similarity(drafts[-2], drafts[-1])
+        if similarity >= state['convergence_similarity']:
+            logger.info(f"📉 Drafts stopped changing ({similarity:.0%} similar), stopping revisions")
+            return True
+    
+    return False
+
+
+def draft_similarity(previous: str, current: str) -> float:
+    """Similarity of two drafts from 0.0 (nothing shared) to 1.0 (identical)."""
+    matcher = SequenceMatcher(None, previous, current)
+    # quick_ratio is an upper bound on ratio and much cheaper
+    if matcher.quick_ratio() < 0.5:
+        return matcher.quick_ratio()
+    return matcher.ratio()
+
+
+def best_draft_update(state: ContentState, status: str) -> ContentState:
+    """
+    End the run with the best-scoring draft so far, not the last one.
+    
+    A draft the editor never got to review is kept (with score 0) only if
+    no draft was reviewed at all.
+    """
+    scores = state.get('scores', [])
+    drafts = state.get('drafts', [])
+    reviewed = min(len(scores), len(drafts))
+    
+    if reviewed:
+        # Latest draft wins ties: it has had the most feedback applied
+        best = max(range(reviewed), key=lambda i: (scores[i], i))
+        draft, score = drafts[best], scores[best]
+        logger.info(f"🏁 Run {status}; keeping draft {best + 1} (score {score})")
+    else:
+        draft, score = (drafts[-1] if drafts else ''), 0
+        logger.info(f"🏁 Run {status} before any review")
+    
+    return {
+        'draft_content': draft,
+        'final_content': draft,
+        'virality_score': score,
+        'status': status
+    }
+
+
+def finish_converged(state: ContentState) -> ContentState:
+    """End a converged run with its best-scoring draft."""
+    return best_draft_update(state, 'converged')
+
+
+def finish_deadline(state: ContentState) -> ContentState:
+    """End a run whose deadline is (nearly) up with its best draft so far."""
+    return best_draft_update(state, 'deadline_reached')
+
+
+def route_start(state: ContentState) -> str:
+    """Entry node: research for a fresh run, start_node for a partial re-run."""
+    return state.get('start_node') or "trend_scout"
+
+
 def increment_iteration(state: ContentState) -> ContentState:
     """Increment iteration counter before revision."""
     current = state.get('iteration_count', 0)
-    logger.info(f"🔄 Starting iteration {current + 1}/{config.MAX_ITERATIONS}")
-    return {
-        **state,
-        'iteration_count': current + 1
-    }
+    logger.info(f"🔄 Starting iteration {current + 1}/{state['max_iterations']}")
+    return {'iteration_count': current + 1}
 
 
-def create_workflow():
+def fan_out_candidates(state: ContentState) -> List[Send]:
+    """Start one candidate branch per draft; LangGraph runs them in parallel."""
+    logger.info(f"🔀 Writing {state['candidates']} candidate drafts")
+    return [Send("candidate", candidate) for candidate in candidate_inputs(state)]
+
+
+def timed_node(name: str, func: Callable, afunc: Callable) -> RunnableLambda:
+    """
+    Wrap an agent node's sync and async implementations to record
+    node_seconds, the invocation in the request's timings and a trace span.
+    """
+    
+    @wraps(func)
+    def run(state):
+        started = time.perf_counter()
+        try:
+            iteration = state.get('iteration_count', 0)
+            with node_timing(name, iteration), span(f"node {name}", node=name, iteration=iteration):
+                return func(state)
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - started, name)
+    
+    @wraps(afunc)
+    async def arun(state):
+        started = time.perf_counter()
+        try:
+            iteration = state.get('iteration_count', 0)
+            with node_timing(name, iteration), span(f"node {name}", node=name, iteration=iteration):
+                return await afunc(state)
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - started, name)
+    
+    return RunnableLambda(run, afunc=arun)
+
+
+def create_workflow(variant: str = "default", checkpointer: Optional[BaseCheckpointSaver] = None):
     """
     Create and compile the LangGraph workflow.
     
+    Prefer get_workflow(), which caches the compiled graph per process.
+    
+    The "default" variant writes and reviews one draft per iteration, and
+    can start past the research for a partial re-run (state['start_node']).
+    The "best_of_n" variant fans out state['candidates'] branches that each
+    write and score a draft in parallel, then keeps the best one.
+    
+    Args:
+        variant: Graph variant to build (see WORKFLOW_VARIANTS)
+        checkpointer: LangGraph checkpoint saver that records the state
+            after every node (see workflow.checkpoints); runs then need a
+            thread_id in their config, and can resume from it
+    
     Returns:
         Compiled workflow graph
     """
+    if variant not in WORKFLOW_VARIANTS:
+        raise ValueError(f"Unknown workflow variant: {variant}")
+    
     # Initialize the graph
     workflow = StateGraph(ContentState)
     
-    # Add nodes
-    workflow.add_node("trend_scout", trend_scout_agent)
-    workflow.add_node("ghostwriter", ghostwriter_agent)
-    workflow.add_node("chief_editor", chief_editor_agent)
+    # Add nodes (each node has a sync and an async implementation so the
+    # same graph serves both app.invoke and app.ainvoke)
+    workflow.add_node("trend_scout", timed_node("trend_scout", trend_scout_agent, atrend_scout_agent))
     workflow.add_node("increment", increment_iteration)
+    workflow.add_node("converge", finish_converged)
+    workflow.add_node("deadline", finish_deadline)
     
-    # Define the flow
-    workflow.set_entry_point("trend_scout")
-    
-    # Sequential flow: research -> draft -> review
-    workflow.add_edge("trend_scout", "ghostwriter")
-    workflow.add_edge("ghostwriter", "chief_editor")
+    if variant == "best_of_n":
+        workflow.set_entry_point("trend_scout")
+        workflow.add_node("candidate", timed_node("candidate", candidate_agent, acandidate_agent))
+        workflow.add_node("select_best", timed_node("select_best", select_candidate_agent, aselect_candidate_agent))
+        
+        # research -> N x (draft + review) in parallel -> keep the best
+        workflow.add_conditional_edges("trend_scout", fan_out_candidates, ["candidate"])
+        workflow.add_edge("candidate", "select_best")
+        reviewer = "select_best"
+        
+        # After incrementing, fan out a fresh set of candidates
+        workflow.add_conditional_edges("increment", fan_out_candidates, ["candidate"])
+    else:
+        workflow.add_node("ghostwriter", timed_node("ghostwriter", ghostwriter_agent, aghostwriter_agent))
+        workflow.add_node("chief_editor", timed_node("chief_editor", chief_editor_agent, achief_editor_agent))
+        workflow.add_node("polish", timed_node("polish", polish_agent, apolish_agent))
+        
+        # Fresh runs start with research; partial re-runs reuse a stored
+        # run's research (and draft) and start further down
+        workflow.set_conditional_entry_point(route_start, ["trend_scout", *RERUN_NODES])
+        
+        # Sequential flow: research -> draft -> review
+        workflow.add_edge("trend_scout", "ghostwriter")
+        workflow.add_edge("ghostwriter", "chief_editor")
+        reviewer = "chief_editor"
+        
+        # After incrementing, go back to ghostwriter
+        workflow.add_edge("increment", "ghostwriter")
+        
+        # A polish-only re-run ends after the polish
+        workflow.add_edge("polish", END)
     
     # Conditional edge: review -> revise or end
     workflow.add_conditional_edges(
-        "chief_editor",
+        reviewer,
         should_continue,
         {
             "revise": "increment",
+            "converged": "converge",
+            "deadline": "deadline",
             "end": END
         }
     )
-    
-    # After incrementing, go back to ghostwriter
-    workflow.add_edge("increment", "ghostwriter")
+    workflow.add_edge("converge", END)
+    workflow.add_edge("deadline", END)
     
     # Compile the workflow
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     
-    logger.info("✅ Workflow compiled successfully")
+    logger.info(f"✅ Workflow compiled successfully ({variant}{', checkpointed' if checkpointer else ''})")
     return app
 
 
-def run_workflow(topic: str, platform: str = "twitter"):
+def get_workflow(variant: str = "default", checkpointed: bool = False):
     """
-    Run the complete viral content generation workflow.
+    Return the compiled workflow for a variant, compiling it on first use.
+    
+    Per-request settings travel in the workflow state, so one compiled
+    graph serves every request. Checkpointed graphs (for runs with a
+    run_id) use the checkpointer from get_checkpointer().
+    """
+    key = f"{variant}+checkpoints" if checkpointed else variant
+    app = _compiled_workflows.get(key)
+    if app is None:
+        with _compile_lock:
+            app = _compiled_workflows.get(key)
+            if app is None:
+                checkpointer = None
+                if checkpointed:
+                    checkpointer = get_checkpointer()
+                    if checkpointer is None:
+                        raise ValueError("run_id needs checkpointing, which is off (CHECKPOINT_BACKEND)")
+                app = create_workflow(variant, checkpointer)
+                _compiled_workflows[key] = app
+    return app
+
+
+NODE_NAMES = (
+    "trend_scout", "ghostwriter", "chief_editor", "polish", "candidate", "select_best", "increment", "converge", "deadline"
+)
+
+
+def workflow_variant(state: ContentState) -> str:
+    """Pick the graph variant for a run: best-of-N when several candidates are asked for."""
+    return "best_of_n" if state['candidates'] > 1 else "default"
+
+
+# A run that ended with one of these is resumed from its last good checkpoint
+# rather than returned as it is
+RESUMABLE_STATUSES = ("failed", "deadline_reached")
+
+# Request-scoped state that a resumed run takes from the new request
+RESUME_OVERRIDES = ("deadline_at", "stream_tokens")
+
+
+def resume_point(history: List[StateSnapshot], initial_state: ContentState) -> Tuple[Optional[StateSnapshot], bool]:
+    """
+    Pick the checkpoint a run with a run_id continues from.
+    
+    Args:
+        history: The run's checkpoints, newest first
+        initial_state: State built from the new request
+    
+    Returns:
+        (snapshot, finished): the latest checkpoint and True if the run
+        already finished; the last checkpoint before an unfinished, failed
+        or deadline-cut node and False; or (None, False) to start afresh.
+    
+    Raises:
+        ValueError: If the run_id belongs to a different topic, platform or
+            workflow variant
+    """
+    if not history:
+        return None, False
+    
+    latest = history[0]
+    for key in ('topic', 'platform'):
+        if latest.values.get(key) != initial_state[key]:
+            raise ValueError(f"run_id belongs to a run with a different {key}")
+    if workflow_variant(latest.values) != workflow_variant(initial_state):
+        raise ValueError("run_id belongs to a run with a different number of candidates")
+    
+    if not latest.next and latest.values.get('status') not in RESUMABLE_STATUSES:
+        return latest, True
+    
+    for snapshot in history:
+        if snapshot.next and snapshot.metadata.get('source') == "loop" and snapshot.values.get('status') != "failed":
+            return snapshot, False
+    return None, False
+
+
+def run_config(run_id: str) -> Dict:
+    """LangGraph config for a checkpointed run."""
+    return {'configurable': {'thread_id': run_id}}
+
+
+def _resume_changes(snapshot: StateSnapshot, initial_state: ContentState) -> Dict[str, Any]:
+    """Request-scoped values that differ between a checkpoint and the new request."""
+    return {
+        key: initial_state[key] for key in RESUME_OVERRIDES
+        if snapshot.values.get(key) != initial_state[key]
+    }
+
+
+def start_run(app, initial_state: ContentState, run_id: Optional[str]) -> Tuple[Optional[Dict], Optional[Dict], Dict, bool]:
+    """
+    Work out how to invoke the graph for a run, resuming it from its checkpoints.
+    
+    Returns:
+        (graph_input, config, state, finished): pass graph_input and config
+        to invoke; state is the state so far (the final state if finished,
+        and then there is nothing to run)
+    """
+    if run_id is None:
+        return initial_state, None, initial_state, False
+    
+    config_ = run_config(run_id)
+    snapshot, finished = resume_point(list(app.get_state_history(config_)), initial_state)
+    if snapshot is None:
+        return initial_state, config_, initial_state, False
+    if finished:
+        logger.info(f"♻️ Run {run_id} already finished, returning its result")
+        return None, snapshot.config, snapshot.values, True
+    
+    logger.info(f"⏯️ Resuming run {run_id} at {', '.join(snapshot.next)}")
+    changes = _resume_changes(snapshot, initial_state)
+    resume_config = app.update_state(snapshot.config, changes) if changes else snapshot.config
+    return None, resume_config, {**snapshot.values, **changes}, False
+
+
+async def astart_run(app, initial_state: ContentState, run_id: Optional[str]) -> Tuple[Optional[Dict], Optional[Dict], Dict, bool]:
+    """Async version of start_run."""
+    if run_id is None:
+        return initial_state, None, initial_state, False
+    
+    config_ = run_config(run_id)
+    history = [snapshot async for snapshot in app.aget_state_history(config_)]
+    snapshot, finished = resume_point(history, initial_state)
+    if snapshot is None:
+        return initial_state, config_, initial_state, False
+    if finished:
+        logger.info(f"♻️ Run {run_id} already finished, returning its result")
+        return None, snapshot.config, snapshot.values, True
+    
+    logger.info(f"⏯️ Resuming run {run_id} at {', '.join(snapshot.next)}")
+    changes = _resume_changes(snapshot, initial_state)
+    resume_config = await app.aupdate_state(snapshot.config, changes) if changes else snapshot.config
+    return None, resume_config, {**snapshot.values, **changes}, False
+
+
+@contextmanager
+def tracked_run() -> Iterator[Dict]:
+    """
+    Count a workflow run as in flight and record its outcome metrics.
+    
+    The caller stores the final state under 'state' in the yielded dict;
+    a run that never gets there (an exception, or a streaming client that
+    disconnected) is counted with status "aborted".
+    """
+    WORKFLOWS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    run = {}
+    try:
+        yield run
+    finally:
+        WORKFLOWS_IN_FLIGHT.dec()
+        WORKFLOW_SECONDS.observe(time.perf_counter() - started)
+        final_state = run.get('state')
+        if final_state is None:
+            WORKFLOWS.inc("aborted")
+        else:
+            WORKFLOWS.inc(final_state.get('status') or "unknown")
+            ITERATIONS.observe(final_state.get('iteration_count', 0))
+            FINAL_SCORES.observe(final_state.get('virality_score', 0))
+
+
+def default_settings() -> Dict:
+    """Per-request settings and their defaults, read from config at call time."""
+    return {
+        'model': config.GROQ_MODEL,
+        'scout_temperature': config.SCOUT_TEMPERATURE,
+        'draft_temperature': config.DRAFT_TEMPERATURE,
+        'editor_temperature': config.EDITOR_TEMPERATURE,
+        'max_tokens': config.MAX_TOKENS,
+        'draft_max_tokens': config.DRAFT_MAX_TOKENS,
+        'research_fanout': config.RESEARCH_FANOUT,
+        'candidates': config.CANDIDATES,
+        'speculative_polish': config.SPECULATIVE_POLISH,
+        'editor_mode': config.EDITOR_MODE,
+        'convergence_window': config.CONVERGENCE_WINDOW,
+        'convergence_min_improvement': config.CONVERGENCE_MIN_IMPROVEMENT,
+        'convergence_similarity': config.CONVERGENCE_SIMILARITY,
+        'max_iterations': config.MAX_ITERATIONS,
+        'virality_threshold': config.VIRALITY_THRESHOLD
+    }
+
+
+def build_initial_state(
+    topic: str,
+    platform: str = "twitter",
+    settings: Optional[Dict] = None,
+    stream_tokens: bool = False,
+    deadline_ms: Optional[int] = None
+) -> ContentState:
+    """
+    Build the initial workflow state for a topic.
     
     Args:
         topic: The topic to create content about
         platform: "twitter" or "linkedin"
-        
+        settings: Per-request overrides for default_settings(); None values
+            keep the default
+        stream_tokens: Forward draft/polish tokens as draft_delta events
+        deadline_ms: Latency budget for the run, counted from now; None for
+            no deadline
+    
     Returns:
-        Final state with generated content
+        Initial ContentState. Nodes read every model/threshold setting from
+        here, never from the global config, so concurrent runs can't interfere.
     """
-    logger.info(f"🚀 Starting workflow for topic: '{topic}' on {platform}")
+    run_settings = default_settings()
+    for key, value in (settings or {}).items():
+        if key not in run_settings:
+            raise ValueError(f"Unknown setting: {key}")
+        if value is not None:
+            run_settings[key] = value
     
-    # Initialize state
-    initial_state: ContentState = {
+    return {
         'topic': topic,
         'platform': platform.lower(),
+        **run_settings,
+        'stream_tokens': stream_tokens,
+        'deadline_at': deadline_from_ms(deadline_ms),
+        'start_node': "trend_scout",
         'research_angles': [],
         'draft_content': '',
         'drafts': [],
+        'candidate_results': [],
         'virality_score': 0,
         'scores': [],
         'editor_feedback': '',
         'feedbacks': [],
+        'speculations': [],
         'iteration_count': 0,
         'final_content': '',
         'status': 'initialized',
         'error': None
     }
+
+
+def build_rerun_state(
+    source: ContentState,
+    start_node: str,
+    platform: Optional[str] = None,
+    settings: Optional[Dict] = None,
+    feedback: Optional[str] = None,
+    draft: Optional[str] = None,
+    stream_tokens: bool = False,
+    deadline_ms: Optional[int] = None
+) -> ContentState:
+    """
+    Build the initial state of a partial re-run from a stored run's state.
+    
+    The research (and, from chief_editor on, the draft) is taken from the
+    stored run, so the new run skips the Trend Scout. The revision loop
+    starts over: no scores, feedback or iterations are carried across.
+    
+    Args:
+        source: Latest state of the stored run
+        start_node: "ghostwriter" writes a new draft from the stored
+            research, "chief_editor" reviews the stored draft (and revises
+            it as usual), "polish" only polishes it
+        platform: New platform; None keeps the stored one
+        settings: Settings to change; the rest keep their stored values.
+            Re-runs write one draft at a time, so candidates must be 1.
+        feedback: Revision notes for the Ghostwriter, or what the polish
+            should change (default: the stored run's last review feedback)
+        draft: Draft to use instead of the stored one (chief_editor, polish)
+        stream_tokens: Forward draft/polish tokens as draft_delta events
+        deadline_ms: Latency budget for the re-run, counted from now
+    
+    Raises:
+        ValueError: For an unknown start node, an override that does not
+            apply to it, or a stored run without the research or draft the
+            start node needs
+    """
+    if start_node not in RERUN_NODES:
+        raise ValueError(f"Unknown start node: {start_node} (expected one of {', '.join(RERUN_NODES)})")
+    if feedback and start_node == "chief_editor":
+        raise ValueError("feedback applies to re-runs starting at ghostwriter or polish")
+    if draft and start_node == "ghostwriter":
+        raise ValueError("draft applies to re-runs starting at chief_editor or polish")
+    if (settings or {}).get('candidates') not in (None, 1):
+        raise ValueError("Re-runs write one draft at a time (candidates must be 1)")
+    if not source.get('research_angles'):
+        raise ValueError("The run has no research to reuse")
+    
+    stored_settings = {key: source[key] for key in default_settings() if key in source}
+    changes = {key: value for key, value in (settings or {}).items() if value is not None}
+    state = build_initial_state(
+        source['topic'],
+        platform or source['platform'],
+        {**stored_settings, **changes, 'candidates': 1},
+        stream_tokens=stream_tokens,
+        deadline_ms=deadline_ms
+    )
+    state['start_node'] = start_node
+    state['research_angles'] = source['research_angles']
+    
+    if start_node == "ghostwriter":
+        state['editor_feedback'] = feedback or ''
+        return state
+    
+    # What the editor saw last: the polished content if there is one
+    current = draft or source.get('final_content') or source.get('draft_content')
+    if not current:
+        raise ValueError("The run has no draft to reuse")
+    state['draft_content'] = current
+    state['drafts'] = [current]
+    
+    if start_node == "polish":
+        notes = [feedback or source.get('editor_feedback', '')]
+        if state['platform'] != source['platform']:
+            notes.append(f"Adapt it into a {state['platform']} post.")
+        state['editor_feedback'] = "\n".join(note for note in notes if note)
+        if draft is None and source.get('virality_score'):
+            # The polish keeps the stored draft's review
+            state['virality_score'] = source['virality_score']
+            state['scores'] = [source['virality_score']]
+    return state
+
+
+class RunNotFound(Exception):
+    """No checkpoints are stored under a run_id."""
+
+
+async def arerun_workflow(
+    source_run_id: str,
+    start_node: str,
+    run_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    settings: Optional[Dict] = None,
+    feedback: Optional[str] = None,
+    draft: Optional[str] = None,
+    deadline_ms: Optional[int] = None,
+    timings: Optional[RunTimings] = None
+) -> Tuple[str, ContentState]:
+    """
+    Re-run a checkpointed run from start_node on, reusing its stored state.
+    
+    Editing a run (a new draft, a different platform or threshold, another
+    polish) then costs only the nodes from start_node on, not the Trend
+    Scout's searches and summaries. The re-run is checkpointed under a new
+    run_id, so it can be resumed or re-run in turn; the source run is left
+    as it was.
+    
+    Args:
+        source_run_id: run_id of the stored run
+        start_node: Node to start at (see RERUN_NODES and build_rerun_state)
+        run_id: ID for the new run; a fresh one when None
+        platform, settings, feedback, draft: Overrides, as for build_rerun_state
+        deadline_ms: Latency budget, as for run_workflow
+        timings: Timing collector, as for run_workflow
+    
+    Returns:
+        (run_id, final_state) of the new run
+    
+    Raises:
+        RunNotFound: If nothing is stored under source_run_id
+        ValueError: For bad overrides (see build_rerun_state), a run_id
+            already in use, or checkpointing switched off
+    """
+    app = get_workflow("default", checkpointed=True)
+    source = (await app.aget_state(run_config(source_run_id))).values
+    if not source:
+        raise RunNotFound(source_run_id)
     
-    # Create and run workflow
-    app = create_workflow()
-    final_state = app.invoke(initial_state)
+    run_id = run_id or uuid.uuid4().hex
+    if (await app.aget_state(run_config(run_id))).values:
+        raise ValueError(f"run_id {run_id} is already in use")
+    
+    initial_state = build_rerun_state(
+        source, start_node, platform, settings, feedback, draft, deadline_ms=deadline_ms
+    )
+    logger.info(f"🔁 Re-running {source_run_id} from {start_node} as {run_id}")
+    RERUNS.inc(start_node)
+    
+    with tracked_run() as run, collect_timings(timings):
+        final_state = run['state'] = await app.ainvoke(initial_state, run_config(run_id))
+    
+    logger.info(f"✅ Re-run complete with status: {final_state.get('status')}")
+    
+    return run_id, final_state
+
+
+def run_workflow(
+    topic: str,
+    platform: str = "twitter",
+    settings: Optional[Dict] = None,
+    deadline_ms: Optional[int] = None,
+    timings: Optional[RunTimings] = None,
+    run_id: Optional[str] = None
+):
+    """
+    Run the complete viral content generation workflow.
+    
+    Args:
+        topic: The topic to create content about
+        platform: "twitter" or "linkedin"
+        settings: Per-request overrides (model, temperatures, max_tokens,
+            max_iterations, virality_threshold, candidates, ...); more than
+            one candidate runs the best-of-N variant
+        deadline_ms: Latency budget. Upstream calls get what is left of it
+            as their timeout, revisions and polish are skipped when it runs
+            low, and the run ends with status "deadline_reached" and its
+            best draft so far instead of overrunning.
+        run_id: Checkpoint the run under this ID after every node. Running
+            it again with the same ID continues an interrupted, failed or
+            deadline-cut run from its last finished node (with the stored
+            settings, and the new deadline), and returns a finished run's
+            result without running it again.
+    
+    Returns:
+        Final state with generated content
+    """
+    logger.info(f"🚀 Starting workflow for topic: '{topic}' on {platform}")
+    
+    # Initialize state
+    initial_state = build_initial_state(topic, platform, settings, deadline_ms=deadline_ms)
+    
+    # Run the shared compiled workflow
+    app = get_workflow(workflow_variant(initial_state), checkpointed=run_id is not None)
+    graph_input, run_config_, state, finished = start_run(app, initial_state, run_id)
+    if finished:
+        return state
+    with tracked_run() as run, collect_timings(timings):
+        final_state = run['state'] = app.invoke(graph_input, run_config_)
+    
+    logger.info(f"✅ Workflow complete with status: {final_state.get('status')}")
+    
+    return final_state
+
+
+async def arun_workflow(
+    topic: str,
+    platform: str = "twitter",
+    settings: Optional[Dict] = None,
+    deadline_ms: Optional[int] = None,
+    timings: Optional[RunTimings] = None,
+    run_id: Optional[str] = None
+):
+    """
+    Async version of run_workflow.
+    
+    Runs the graph with app.ainvoke so every Groq and Tavily call is awaited
+    instead of blocking the event loop. Use this from async code (FastAPI);
+    run_workflow stays available for sync callers such as the Streamlit UI.
+    """
+    logger.info(f"🚀 Starting workflow for topic: '{topic}' on {platform}")
+    
+    initial_state = build_initial_state(topic, platform, settings, deadline_ms=deadline_ms)
+    
+    app = get_workflow(workflow_variant(initial_state), checkpointed=run_id is not None)
+    graph_input, run_config_, state, finished = await astart_run(app, initial_state, run_id)
+    if finished:
+        return state
+    with tracked_run() as run, collect_timings(timings):
+        final_state = run['state'] = await app.ainvoke(graph_input, run_config_)
     
     logger.info(f"✅ Workflow complete with status: {final_state.get('status')}")
     
     return final_state
+
+
+async def astream_workflow(
+    topic: str,
+    platform: str = "twitter",
+    settings: Optional[Dict] = None,
+    deadline_ms: Optional[int] = None,
+    timings: Optional[RunTimings] = None,
+    run_id: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Run the workflow and yield progress as it happens.
+    
+    Args:
+        topic: The topic to create content about
+        platform: "twitter" or "linkedin"
+        settings: Per-request overrides, as for run_workflow
+        deadline_ms: Latency budget, as for run_workflow
+        timings: Timing collector, as for run_workflow
+        run_id: Checkpoint and resume key, as for run_workflow
+    
+    Yields:
+        ("node", {'node', 'update', 'state'}) each time a node finishes, where
+        update is what the node returned and state is the merged state so far
+        (the last one is the final state), and
+        ("draft_delta", {'node', 'iteration', 'delta'}) for each token chunk of
+        a Ghostwriter draft or Chief Editor polish. A run restored from its
+        checkpoints first yields node "checkpoint" with the restored state.
+    """
+    logger.info(f"🚀 Starting streamed workflow for topic: '{topic}' on {platform}")
+    
+    initial_state = build_initial_state(topic, platform, settings, stream_tokens=True, deadline_ms=deadline_ms)
+    
+    app = get_workflow(workflow_variant(initial_state), checkpointed=run_id is not None)
+    graph_input, run_config_, state, finished = await astart_run(app, initial_state, run_id)
+    if graph_input is None:
+        yield "node", {'node': "checkpoint", 'update': {}, 'state': state}
+    if finished:
+        return
+    with tracked_run() as run, collect_timings(timings):
+        async for event in app.astream_events(graph_input, run_config_, version="v2"):
+            kind = event['event']
+            name = event['name']
+            
+            if kind == "on_custom_event" and name == DRAFT_DELTA_EVENT:
+                yield DRAFT_DELTA_EVENT, event['data']
+            
+            # The node itself (not the agent function inside it) has finished
+            elif (kind == "on_chain_end" and name in NODE_NAMES
+                  and event.get('metadata', {}).get('langgraph_node') == name):
+                update = event['data'].get('output') or {}
+                # Parallel candidate branches append to candidate_results
+                # (its reducer) rather than overwriting it
+                candidates = state['candidate_results'] + update.get('candidate_results', [])
+                state = {**state, **update, 'candidate_results': candidates}
+                yield "node", {'node': name, 'update': update, 'state': state}
+        
+        run['state'] = state
+    
+    logger.info(f"✅ Workflow complete with status: {state.get('status')}")
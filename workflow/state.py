@@ -1,6 +1,7 @@
 """Shared state schema for the viral content workflow."""
 
-from typing import TypedDict, List, Dict, Optional
+import operator
+from typing import Annotated, TypedDict, List, Dict, Optional
 
 
 class ContentState(TypedDict):
@@ -10,23 +11,47 @@ class ContentState(TypedDict):
     topic: str
     platform: str  # "twitter" or "linkedin"
     
+    # Configuration (per request, see workflow.graph.default_settings)
+    model: str
+    scout_temperature: float
+    draft_temperature: float
+    editor_temperature: float
+    max_tokens: int
+    draft_max_tokens: int
+    research_fanout: int  # Parallel Tavily queries for the Trend Scout
+    candidates: int  # Drafts written and scored side by side per iteration
+    speculative_polish: bool  # Polish alongside the review instead of after it
+    editor_mode: str  # "classic" (review, then polish) or "structured" (one JSON call)
+    convergence_window: int  # Reviews that must beat the earlier best score
+    convergence_min_improvement: int  # ...by at least this many points
+    convergence_similarity: float  # Consecutive drafts this similar have converged
+    max_iterations: int
+    virality_threshold: int
+    stream_tokens: bool  # Forward draft/polish tokens as draft_delta events
+    deadline_at: Optional[float]  # Epoch seconds the run must finish by (None: no deadline)
+    start_node: str  # First node: "trend_scout", or where a partial re-run starts
+    
     # Research phase
     research_angles: List[Dict]
     
     # Drafting phase
     draft_content: str
     drafts: List[str]  # History of all drafts created
+    # Best-of-N candidates ({'iteration', 'index', 'draft', 'score', ...});
+    # parallel candidate branches append to this list
+    candidate_results: Annotated[List[Dict], operator.add]
     
     # Review phase
     virality_score: int
     scores: List[int]  # History of scores
     editor_feedback: str
     feedbacks: List[str]  # History of feedback
+    speculations: List[str]  # Speculative polish outcome per review ("used", ...)
     
     # Control flow
     iteration_count: int
     final_content: str
-    status: str  # "researching", "drafting", "reviewing", "approved", "failed"
+    status: str  # "researching", "drafting", "reviewing", "approved", "polished", "converged", "deadline_reached", "failed"
     
     # Error handling
     error: Optional[str]